@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 from services.db_client import supabase
+from services.profile_cache import get_profile, get_profiles
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -20,15 +21,18 @@ def list_users():
         users_resp = supabase.table("users").select("id, name, email").execute()
         users = users_resp.data or []
 
+        try:
+            profiles = get_profiles(u["id"] for u in users)
+        except Exception:
+            profiles = {}
+
         enriched = []
         for u in users:
             entry = {"id": u["id"], "name": u.get("name", ""), "email": u.get("email", "")}
             try:
-                profile_resp = supabase.rpc(
-                    "get_full_candidate_profile", {"p_user_id": u["id"]}
-                ).execute()
-                if profile_resp.data:
-                    row = profile_resp.data[0] if isinstance(profile_resp.data, list) else profile_resp.data
+                profile = profiles.get(str(u["id"]))
+                if profile:
+                    row = profile[0] if isinstance(profile, list) else profile
                     # Extract skills
                     skills_raw = row.get("skills") or []
                     if isinstance(skills_raw, str):
@@ -76,12 +80,10 @@ def list_users():
 def get_user_profile(user_id: int):
     """Return the full candidate profile for a given user id."""
     try:
-        response = supabase.rpc(
-            "get_full_candidate_profile", {"p_user_id": user_id}
-        ).execute()
-        if not response.data:
+        profile = get_profile(user_id)
+        if not profile:
             raise HTTPException(status_code=404, detail="User not found")
-        return {"success": True, "data": response.data}
+        return {"success": True, "data": profile}
     except HTTPException:
         raise
     except Exception as e:
@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Request,HTTPException
-from langchain_google_genai import ChatGoogleGenerativeAI
+from fastapi import APIRouter, BackgroundTasks, Request,HTTPException
 from services.db_client import supabase
 from services.questions import questions
 from services.redis import redis_client
 from services.round_flow import ensure_round_start_allowed, ensure_round_answer_allowed, set_round_state
+from services.proctoring_timeline import clear_round_timeline, round_summary
+from services.llm import CODE_REVIEW, get_task_structured_model
+from services.round_prefetch import prefetch_next_opening
+from services.llm_calls import call_llm_sync
 from models.coding_round import solution,analysis
 import random 
 import os
 API_KEY = os.getenv("RESUME_API")
 router=APIRouter(prefix="/coding_round",tags=["coding_round"])  
+def warm_up() -> None:
+    get_task_structured_model(CODE_REVIEW, analysis)
 @router.get("/get_question")
 def get_question(request:Request):
     user_id=request.cookies.get("user_id")
@@ -18,6 +23,7 @@ def get_question(request:Request):
         ensure_round_start_allowed(str(user_id), "coding")
         question_id = random.choice(list(questions.keys()))
         redis_client.set(f"user:{user_id}:question", question_id)
+        clear_round_timeline(str(user_id), "coding")
         set_round_state(str(user_id), "coding", "in_progress")
         return {"question": questions[question_id]}
     except HTTPException:
@@ -25,7 +31,7 @@ def get_question(request:Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 @router.post("/submit_solution")
-def submit_solution(request:Request,solution:solution):
+def submit_solution(request:Request,solution:solution,background_tasks:BackgroundTasks):
     user_id=request.cookies.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -36,8 +42,7 @@ def submit_solution(request:Request,solution:solution):
             raise HTTPException(status_code=400, detail="No active question found for the user")
         question_id=int(question_id)
         question=questions.get(question_id)
-        model=ChatGoogleGenerativeAI(model="gemini-2.5-flash",api_key=API_KEY)
-        structured_model=model.with_structured_output(analysis)
+        structured_model=get_task_structured_model(CODE_REVIEW, analysis)
         prompt = f"""
 You are a very strict competitive programming interviewer and senior software engineer at a top product-based company.
 You must evaluate the candidate’s solution harshly and objectively.
@@ -84,10 +89,13 @@ Do NOT return markdown.
 Do NOT add extra commentary.
 Return only structured output.
 """
-        response=structured_model.invoke(prompt)
+        response=call_llm_sync(CODE_REVIEW, structured_model, prompt)
         formatted_response=response.model_dump()
+        proctoring=round_summary(str(user_id), "coding")
         set_round_state(str(user_id), "coding", "completed")
-        return{"analysis": formatted_response}
+        # Open the technical round in the background while the candidate reads this analysis.
+        background_tasks.add_task(prefetch_next_opening, str(user_id), "coding")
+        return{"analysis": formatted_response, "proctoring": proctoring}
     except HTTPException:
         raise
     except Exception as e:
@@ -1,22 +1,20 @@
 from fastapi import APIRouter, Request, HTTPException
-from services.db_client import supabase
+from services.profile_cache import get_profile_async
 from models.domain_switch import DomainSwitchRequest, DomainSwitchAnalysis
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+from services.llm import DOMAIN_SWITCH, get_task_structured_model
+from services.profile_digest import profile_digest
+from services.llm_calls import call_llm
 import os
 
 router = APIRouter(prefix="/domain_switch", tags=["domain_switch"])
 
 api_key = os.getenv("RESUME_API")
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.2, api_key=api_key)
 
-prompt = PromptTemplate(
-    input_variables=["user_info_json", "target_domain"],
-    template="""
+prompt = """
 You are an expert career mentor and hiring strategist.
 
-USER PROFILE (JSON):
-{user_info_json}
+USER PROFILE:
+{user_profile}
 
 TARGET DOMAIN:
 {target_domain}
@@ -31,7 +29,11 @@ Guidelines:
 
 Return the response as valid JSON matching the provided schema.
 """
-)
+
+
+def warm_up() -> None:
+    get_task_structured_model(DOMAIN_SWITCH, DomainSwitchAnalysis)
+
 
 @router.post("/")
 async def domain_switch(data: DomainSwitchRequest, request: Request):
@@ -42,16 +44,15 @@ async def domain_switch(data: DomainSwitchRequest, request: Request):
         if not api_key:
             raise HTTPException(status_code=500, detail="RESUME_API is not configured")
 
-        response = supabase.rpc("get_full_candidate_profile", {"p_user_id": int(user_id)}).execute()
-        if not response.data:
+        profile = await get_profile_async(user_id)
+        if not profile:
             raise HTTPException(status_code=404, detail="User not found")
 
-        structured_model = model.with_structured_output(DomainSwitchAnalysis)
-        structured_chain = prompt | structured_model
-        result = structured_chain.invoke({
-            "user_info_json": response.data,
-            "target_domain": data.target_domain,
-        })
+        structured_model = get_task_structured_model(DOMAIN_SWITCH, DomainSwitchAnalysis)
+        result = await call_llm(DOMAIN_SWITCH, structured_model, prompt.format(
+            user_profile=profile_digest(user_id, profile),
+            target_domain=data.target_domain,
+        ))
         return result
     except HTTPException:
         raise
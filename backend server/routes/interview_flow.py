@@ -1,5 +1,10 @@
 from fastapi import APIRouter, Request, HTTPException
-from services.round_flow import get_flow_state, reset_flow_state
+from services.round_flow import ROUND_ORDER, get_flow_state, reset_flow_state
+from services.analysis_jobs import analysis_queue, get_result
+from services.profile_digest import profile_digest_cache
+from services.llm_admission import admission_stats
+from services.llm_calls import llm_call_stats
+from services.round_prefetch import prefetch_stats
 
 router = APIRouter(prefix="/interview_flow", tags=["interview_flow"])
 
@@ -20,3 +25,47 @@ def reset_status(request: Request):
         raise HTTPException(status_code=401, detail="User not logged in")
 
     return {"status": reset_flow_state(str(user_id))}
+
+
+@router.get("/prefetch-metrics")
+def prefetch_metrics():
+    """Hit rate and waste of the speculative round openings (this worker)."""
+    return prefetch_stats.snapshot()
+
+
+@router.get("/analysis")
+async def get_analysis(request: Request, round: str):
+    """Final analysis of an ended interview round; poll while ``status`` is ``pending``."""
+    user_id = request.cookies.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User not logged in")
+    if round not in ROUND_ORDER:
+        raise HTTPException(status_code=400, detail="Invalid round")
+
+    result = await get_result(str(user_id), round)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No analysis for this round")
+    return result
+
+
+@router.get("/analysis-metrics")
+def analysis_metrics():
+    return analysis_queue.stats()
+
+
+@router.get("/profile-digest-metrics")
+def profile_digest_metrics():
+    """Estimated prompt tokens of the raw profiles vs their digests (this worker)."""
+    return profile_digest_cache.stats()
+
+
+@router.get("/llm-admission-metrics")
+def llm_admission_metrics():
+    """Running model calls and queue depth (all workers); waits and rejections per class (this worker)."""
+    return admission_stats.snapshot()
+
+
+@router.get("/llm-call-metrics")
+def llm_call_metrics():
+    """Outcomes, retries, hedges and latency percentiles per LLM task (this worker)."""
+    return llm_call_stats.snapshot()
@@ -1,9 +1,7 @@
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph.graph import StateGraph, START, END
-from langchain_core.messages import HumanMessage
+from functools import lru_cache
 from typing import Any
 from models.manager_round import (
     manager_model_result,
@@ -11,15 +9,20 @@ from models.manager_round import (
     final_analysis,
     manager_answer_request,
 )
-from services.db_client import supabase
-from services.redis import redis_client
-from services.round_flow import ensure_round_start_allowed, ensure_round_answer_allowed, set_round_state
+from services.profile_cache import get_profile_async
+from services.redis import async_redis_client
+from services.round_flow import ensure_round_start_allowed_async, ensure_round_answer_allowed_async, set_round_state_async
+from services.proctoring_timeline import clear_round_timeline_async, round_summary_async
+from services.llm import EVALUATION, FINAL_ANALYSIS, QUESTION_GENERATION, get_task_model, get_task_structured_model
+from services.interview_stream import event_stream_response, stream_interview_turn
+from services.analysis_jobs import analysis_queue
+from services.llm_calls import call_llm, turn_budget
+from services.profile_digest import profile_digest
+from services.round_prefetch import register_opener, schedule_next_opening, take_opening
 import os
 import json
 
 api_key = os.getenv("RESUME_API")
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=1.0, api_key=api_key)
-structured_model = model.with_structured_output(manager_model_result)
 _STATE_FALLBACK: dict[str, dict[str, Any]] = {}
 MAX_QUESTIONS = 3
 
@@ -41,7 +44,7 @@ def _serialize_state(state: ManagerInterviewState) -> str:
     return json.dumps(jsonable_encoder(state))
 
 
-def _save_state(user_id: str, state: ManagerInterviewState, request: Request) -> None:
+async def _save_state(user_id: str, state: ManagerInterviewState, request: Request) -> None:
     key = _state_key(user_id)
     request.session["manager_interview_state_key"] = key
 
@@ -49,15 +52,15 @@ def _save_state(user_id: str, state: ManagerInterviewState, request: Request) ->
     _STATE_FALLBACK[key] = parsed_state
 
     try:
-        redis_client.set(key, json.dumps(parsed_state), ex=7200)
+        await async_redis_client.set(key, json.dumps(parsed_state), ex=7200)
     except Exception:
         pass
 
 
-def _load_state(user_id: str, request: Request) -> ManagerInterviewState | None:
+async def _load_state(user_id: str, request: Request) -> ManagerInterviewState | None:
     key = _state_key(user_id)
     try:
-        raw = redis_client.get(key)
+        raw = await async_redis_client.get(key)
         if raw:
             return json.loads(raw)
     except Exception:
@@ -74,13 +77,13 @@ def _load_state(user_id: str, request: Request) -> ManagerInterviewState | None:
     return None
 
 
-def _clear_state(user_id: str, request: Request) -> None:
+async def _clear_state(user_id: str, request: Request) -> None:
     key = _state_key(user_id)
     _STATE_FALLBACK.pop(key, None)
     request.session.pop("manager_interview_state_key", None)
     request.session.pop("manager_interview_state", None)
     try:
-        redis_client.delete(key)
+        await async_redis_client.delete(key)
     except Exception:
         pass
 
@@ -93,7 +96,7 @@ def route_turn(state: ManagerInterviewState) -> ManagerInterviewState:
     return state
 
 
-def generate_question(state: ManagerInterviewState) -> ManagerInterviewState:
+async def generate_question(state: ManagerInterviewState) -> ManagerInterviewState:
     qa = state["questiions_and_answers"]
     candidate_profile = state["candidate_profile"]
     question_number = len(qa) + 1
@@ -125,7 +128,7 @@ INSTRUCTIONS:
 6. Do not provide feedback or hints.
 7. Do NOT repeat any question from a previous round or session.
 """
-        response = model.invoke([HumanMessage(content=prompt)])
+        response = await call_llm(QUESTION_GENERATION, get_task_model(QUESTION_GENERATION), prompt)
         state["next_question"] = _single_question_text(response.content)
         state["action"] = "keep_difficulty"
         state["should_end"] = False
@@ -163,7 +166,7 @@ If ending:
 
 Return ONLY structured output matching the schema.
 """
-        response = structured_model.invoke([HumanMessage(content=prompt)])
+        response = await call_llm(EVALUATION, get_task_structured_model(EVALUATION, manager_model_result), prompt)
         state["next_question"] = _single_question_text(response.next_question or "")
         state["should_end"] = response.should_end
         state["action"] = response.action
@@ -181,11 +184,8 @@ def record_answer(state: ManagerInterviewState) -> ManagerInterviewState:
     return state
 
 
-def analysis_of_interview(state: ManagerInterviewState) -> ManagerInterviewState:
-    analysis_model = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash", temperature=1.0, api_key=api_key
-    )
-    structured_analysis = analysis_model.with_structured_output(final_analysis)
+async def analysis_of_interview(state: ManagerInterviewState) -> ManagerInterviewState:
+    structured_analysis = get_task_structured_model(FINAL_ANALYSIS, final_analysis)
 
     qa = state["questiions_and_answers"]
     candidate_profile = state["candidate_profile"]
@@ -201,32 +201,31 @@ CANDIDATE PROFILE:
 QUESTIONS AND ANSWERS:
 {qa}
 
+PROCTORING SUMMARY (webcam checks during this round):
+{state.get("proctoring") or "not available"}
+
 Return ONLY the structured final_analysis schema.
 """
-    result = structured_analysis.invoke([HumanMessage(content=prompt)])
+    result = await call_llm(FINAL_ANALYSIS, structured_analysis, prompt)
     state["analysis"] = result
     return state
 
 
-def should_end_interview(state: ManagerInterviewState) -> str:
-    if state.get("should_end") or state.get("action") == "end_interview":
-        return "end"
-    return "continue"
-
-
 def has_current_answer(state: ManagerInterviewState) -> str:
     if state.get("current_answer", "").strip():
         return "has_answer"
     return "ask_only"
 
 
-def build_interview_graph() -> StateGraph:
+def build_interview_graph():
+    # Imported here so that loading this router does not import LangGraph.
+    from langgraph.graph import StateGraph, START, END
+
     graph = StateGraph(ManagerInterviewState)
     graph.add_node("initialise", initialisation)
     graph.add_node("route_turn", route_turn)
     graph.add_node("generate_question", generate_question)
     graph.add_node("record_answer", record_answer)
-    graph.add_node("analyse", analysis_of_interview)
 
     graph.add_edge(START, "initialise")
     graph.add_edge("initialise", "route_turn")
@@ -237,19 +236,50 @@ def build_interview_graph() -> StateGraph:
         {"has_answer": "record_answer", "ask_only": "generate_question"},
     )
 
-    graph.add_conditional_edges(
-        "generate_question",
-        should_end_interview,
-        {"end": "analyse", "continue": END},
-    )
+    # The final analysis of an ended round is queued by _finish_turn.
+    graph.add_edge("generate_question", END)
 
     graph.add_edge("record_answer", "generate_question")
-    graph.add_edge("analyse", END)
 
     return graph.compile()
 
 
-interview_graph = build_interview_graph()
+@lru_cache(maxsize=None)
+def get_interview_graph():
+    """The compiled graph, built on first use (see warm_up)."""
+    return build_interview_graph()
+
+
+async def _opening_state(user_id: str) -> ManagerInterviewState:
+    """Profile lookup and first graph turn; also run ahead by services.round_prefetch."""
+    profile = await get_profile_async(user_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    initial_state: ManagerInterviewState = {
+        "candidate_profile": profile_digest(user_id, profile),
+        "questiions_and_answers": [],
+        "next_question": "",
+        "should_end": False,
+        "action": "keep_difficulty",
+        "analysis": None,
+        "current_answer": "",
+        "proctoring": None,
+    }
+
+    return await get_interview_graph().ainvoke(initial_state)
+
+
+register_opener("manager", _opening_state)
+
+
+def warm_up() -> None:
+    """Build the graph and the chat client ahead of the first request."""
+    get_interview_graph()
+    get_task_model(QUESTION_GENERATION)
+    get_task_model(EVALUATION)
+
+
 router = APIRouter(prefix="/manager_round", tags=["manager_round"])
 
 
@@ -260,30 +290,18 @@ async def start_interview(request: Request):
         raise HTTPException(status_code=401, detail="User not logged in")
 
     try:
-        ensure_round_start_allowed(str(user_id), "manager")
+        await ensure_round_start_allowed_async(str(user_id), "manager")
 
         if not api_key:
             raise HTTPException(status_code=500, detail="RESUME_API is not configured")
 
-        response = supabase.rpc(
-            "get_full_candidate_profile", {"p_user_id": int(user_id)}
-        ).execute()
-        if not response.data:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        initial_state: ManagerInterviewState = {
-            "candidate_profile": response.data,
-            "questiions_and_answers": [],
-            "next_question": "",
-            "should_end": False,
-            "action": "keep_difficulty",
-            "analysis": None,
-            "current_answer": "",
-        }
-
-        result_state = interview_graph.invoke(initial_state)
-        _save_state(user_id, result_state, request)
-        set_round_state(str(user_id), "manager", "in_progress")
+        result_state = await take_opening(str(user_id), "manager")
+        if result_state is None:
+            with turn_budget():
+                result_state = await _opening_state(user_id)
+        await _save_state(user_id, result_state, request)
+        await clear_round_timeline_async(str(user_id), "manager")
+        await set_round_state_async(str(user_id), "manager", "in_progress")
 
         return JSONResponse(
             {
@@ -298,6 +316,57 @@ async def start_interview(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _prepare_turn(user_id: str, answer_payload: manager_answer_request, request: Request) -> ManagerInterviewState:
+    await ensure_round_answer_allowed_async(str(user_id), "manager")
+
+    if not api_key:
+        raise HTTPException(status_code=500, detail="RESUME_API is not configured")
+
+    answer = answer_payload.answer.strip()
+    if not answer:
+        raise HTTPException(status_code=400, detail="Answer cannot be empty")
+
+    state = await _load_state(user_id, request)
+    if not state:
+        raise HTTPException(
+            status_code=400,
+            detail="No active manager-round session. Call /manager_round/start first.",
+        )
+
+    state["current_answer"] = answer
+    state["proctoring"] = await round_summary_async(str(user_id), "manager")
+    return state
+
+
+async def _finish_turn(user_id: str, result_state: ManagerInterviewState, request: Request) -> dict:
+    await _save_state(user_id, result_state, request)
+
+    question_number = len(result_state["questiions_and_answers"]) + 1
+
+    if result_state.get("should_end") or result_state.get("action") == "end_interview":
+        await _clear_state(user_id, request)
+        await set_round_state_async(str(user_id), "manager", "completed")
+        schedule_next_opening(str(user_id), "manager")
+        analysis = await analysis_queue.submit(str(user_id), "manager", result_state, analysis_of_interview)
+        return {
+            "should_end": True,
+            "closing_note": result_state.get(
+                "next_question",
+                "Thank you for completing the manager round.",
+            ),
+            "analysis": analysis["analysis"],
+            "analysis_status": analysis["status"],
+            "proctoring": result_state.get("proctoring"),
+        }
+
+    return {
+        "question": result_state.get("next_question", ""),
+        "question_number": question_number,
+        "should_end": False,
+        "difficulty": result_state.get("action"),
+    }
+
+
 @router.post("/answer")
 async def submit_answer(answer_payload: manager_answer_request, request: Request):
     user_id = request.cookies.get("user_id")
@@ -305,51 +374,34 @@ async def submit_answer(answer_payload: manager_answer_request, request: Request
         raise HTTPException(status_code=401, detail="User not logged in")
 
     try:
-        ensure_round_answer_allowed(str(user_id), "manager")
+        state = await _prepare_turn(user_id, answer_payload, request)
+        with turn_budget():
+            result_state = await get_interview_graph().ainvoke(state)
+        return JSONResponse(await _finish_turn(user_id, result_state, request))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if not api_key:
-            raise HTTPException(status_code=500, detail="RESUME_API is not configured")
 
-        answer = answer_payload.answer.strip()
-        if not answer:
-            raise HTTPException(status_code=400, detail="Answer cannot be empty")
-
-        state: ManagerInterviewState = _load_state(user_id, request)
-        if not state:
-            raise HTTPException(
-                status_code=400,
-                detail="No active manager-round session. Call /manager_round/start first.",
-            )
-
-        state["current_answer"] = answer
-        result_state = interview_graph.invoke(state)
-        _save_state(user_id, result_state, request)
-
-        question_number = len(result_state["questiions_and_answers"]) + 1
-
-        if result_state.get("should_end") or result_state.get("action") == "end_interview":
-            _clear_state(user_id, request)
-            set_round_state(str(user_id), "manager", "completed")
-            return JSONResponse(
-                {
-                    "should_end": True,
-                    "closing_note": result_state.get(
-                        "next_question",
-                        "Thank you for completing the manager round.",
-                    ),
-                    "analysis": jsonable_encoder(result_state.get("analysis")),
-                }
-            )
+@router.post("/answer/stream")
+async def submit_answer_stream(answer_payload: manager_answer_request, request: Request):
+    """Same turn as /answer, streamed as server-sent events (see services.interview_stream)."""
+    user_id = request.cookies.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User not logged in")
 
-        return JSONResponse(
-            {
-                "question": result_state.get("next_question", ""),
-                "question_number": question_number,
-                "should_end": False,
-                "difficulty": result_state.get("action"),
-            }
-        )
+    try:
+        state = await _prepare_turn(user_id, answer_payload, request)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    return event_stream_response(
+        stream_interview_turn(
+            get_interview_graph(),
+            state,
+            lambda result_state: _finish_turn(user_id, result_state, request),
+        )
+    )
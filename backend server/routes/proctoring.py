@@ -1,15 +1,30 @@
+import asyncio
 import base64
-import threading
+import json
+import os
+import time
+from collections import Counter, deque
+from typing import Any
 
-import cv2
-import numpy as np
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, status
 from pydantic import BaseModel
 
-try:
-    import mediapipe as mp
-except Exception:
-    mp = None
+from services.cors import allowed_origins
+from services.detector_pool import get_detector_pool
+from services.face_detection import FaceCheckError
+from services.face_tracking import next_track
+from services.frame_cache import (
+    CACHE_TTL_SECONDS,
+    FRAME_CACHE_ENABLED,
+    cache_entry,
+    cached_verdict,
+    frame_cache_stats,
+    frame_hash,
+)
+from services.proctoring_cadence import next_cadence_state, plan_next_check
+from services.proctoring_timeline import active_round, recent_events, record_verdicts_async, round_summary
+from services.redis import async_redis_client
+from services.round_flow import ROUND_ORDER
 
 router = APIRouter(prefix="/proctoring", tags=["proctoring"])
 
@@ -18,273 +33,395 @@ class FaceCheckPayload(BaseModel):
     image: str
 
 
-face_cascade = cv2.CascadeClassifier(
-    cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-)
+class BatchFrame(BaseModel):
+    image: str
+    captured_at: float | None = None
+
+
+class FaceCheckBatchPayload(BaseModel):
+    frames: list[BatchFrame]
+
+
+QUALITY_HISTORY_SIZE = 30
+MAX_BATCH_FRAMES = int(os.getenv("PROCTORING_MAX_BATCH_FRAMES", "8"))
+STATUS_SEVERITY = {"single_face": 0, "no_face": 1, "multiple_faces": 2}
+TRACK_TTL_SECONDS = 60
+CADENCE_TTL_SECONDS = 300
+_USER_STATE_FALLBACK: dict[str, dict[str, Any]] = {}
 
-face_cascade_profile = cv2.CascadeClassifier(
-    cv2.data.haarcascades + "haarcascade_profileface.xml"
-)
 
-face_detector = None
-if mp is not None:
+def _data_url_to_bytes(data_url: str) -> bytes:
+    if not data_url or not isinstance(data_url, str):
+        raise HTTPException(status_code=400, detail="Invalid image payload")
+
+    encoded = data_url.split(",", 1)[1] if "," in data_url else data_url
+
     try:
-        face_detector = mp.solutions.face_detection.FaceDetection(
-            model_selection=1,
-            min_detection_confidence=0.4,
-        )
+        return base64.b64decode(encoded)
     except Exception:
-        face_detector = None
+        raise HTTPException(status_code=400, detail="Invalid base64 image")
+
+
+def _track_key(user_id: str) -> str:
+    return f"proctoring:track:{user_id}"
 
-face_detector_strict = None
-if mp is not None:
+
+def _frame_cache_key(user_id: str) -> str:
+    return f"proctoring:frame_cache:{user_id}"
+
+
+def _cadence_key(user_id: str) -> str:
+    return f"proctoring:cadence:{user_id}"
+
+
+async def _load_user_states(keys: list[str]) -> list[dict | None]:
+    # One MGET for all per-user proctoring state a check needs.
     try:
-        face_detector_strict = mp.solutions.face_detection.FaceDetection(
-            model_selection=1,
-            min_detection_confidence=0.3,
-        )
+        return [json.loads(raw) if raw else None for raw in await async_redis_client.mget(keys)]
     except Exception:
-        face_detector_strict = None
+        return [_USER_STATE_FALLBACK.get(key) for key in keys]
 
-face_detector_lock = threading.Lock()
 
-MIN_FACE_CONFIDENCE_LENIENT = 0.4
-MIN_FACE_AREA_RATIO_LENIENT = 0.002
+async def _save_user_states(updates: dict[str, tuple[dict | None, int]]) -> None:
+    for key, (value, _) in updates.items():
+        if value is None:
+            _USER_STATE_FALLBACK.pop(key, None)
+        else:
+            _USER_STATE_FALLBACK[key] = value
 
-MIN_FACE_CONFIDENCE_STRICT = 0.25
-MIN_FACE_AREA_RATIO_STRICT = 0.001
-LOW_LIGHT_THRESHOLD = 50.0
-BLUR_THRESHOLD = 45.0
+    try:
+        pipe = async_redis_client.pipeline(transaction=False)
+        for key, (value, ttl) in updates.items():
+            if value is None:
+                pipe.delete(key)
+            else:
+                pipe.set(key, json.dumps(value), ex=ttl)
+        await pipe.execute()
+    except Exception:
+        pass
 
 
-def _decode_data_url_to_image(data_url: str) -> np.ndarray:
-    if not data_url or not isinstance(data_url, str):
-        raise HTTPException(status_code=400, detail="Invalid image payload")
+async def _frame_hash(raw_bytes) -> int | None:
+    if not FRAME_CACHE_ENABLED:
+        return None
+    # Off the event loop, but on the default executor rather than the detector
+    # pool so a cache hit never waits behind queued detections.
+    return await asyncio.get_running_loop().run_in_executor(None, frame_hash, raw_bytes)
 
-    encoded = data_url.split(",", 1)[1] if "," in data_url else data_url
 
+async def _run_face_check(raw_bytes, track: dict | None = None) -> tuple[dict, list]:
+    pool = get_detector_pool()
     try:
-        raw_bytes = base64.b64decode(encoded)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid base64 image")
+        result, boxes = await pool.analyse(raw_bytes, track)
+    except FaceCheckError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+    result["debug"]["queue_depth"] = pool.queue_depth
+    return result, boxes
 
-    np_buffer = np.frombuffer(raw_bytes, dtype=np.uint8)
-    frame = cv2.imdecode(np_buffer, cv2.IMREAD_COLOR)
-    if frame is None:
-        raise HTTPException(status_code=400, detail="Unable to decode image")
-    return frame
-
-
-def _count_mediapipe_faces(
-    frame: np.ndarray,
-    detector,
-    min_confidence: float,
-    min_area_ratio: float,
-) -> int:
-    if detector is None:
-        return 0
-
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-    with face_detector_lock:
-        results = detector.process(rgb_frame)
-
-    detections = results.detections if results and results.detections else []
-    valid_count = 0
-
-    for detection in detections:
-        score_list = detection.score or []
-        confidence = float(score_list[0]) if score_list else 0.0
-        if confidence < min_confidence:
-            continue
-
-        bbox = detection.location_data.relative_bounding_box
-        area_ratio = max(0.0, float(bbox.width * bbox.height))
-        if area_ratio < min_area_ratio:
-            continue
-
-        valid_count += 1
-
-    return valid_count
-
-
-def _count_opencv_faces_lenient(frame: np.ndarray) -> int:
-    if face_cascade.empty():
-        raise HTTPException(status_code=500, detail="Face detector is not initialized")
-
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    gray = cv2.equalizeHist(gray)
-
-    faces = face_cascade.detectMultiScale(
-        gray,
-        scaleFactor=1.1,
-        minNeighbors=4,
-        minSize=(30, 30),
-    )
-
-    height, width = frame.shape[:2]
-    frame_area = float(max(1, width * height))
-    return sum(
-        1 for _, _, w, h in faces
-        if float(w * h) / frame_area >= MIN_FACE_AREA_RATIO_LENIENT
-    )
-
-
-def _count_opencv_faces_strict(frame: np.ndarray) -> int:
-    if face_cascade.empty():
-        return 0
-
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    gray = cv2.equalizeHist(gray)
-
-    height, width = frame.shape[:2]
-    frame_area = float(max(1, width * height))
-    detected_boxes = []
-
-    frontal = face_cascade.detectMultiScale(
-        gray,
-        scaleFactor=1.05,
-        minNeighbors=3,
-        minSize=(25, 25),
-    )
-    if len(frontal):
-        detected_boxes.extend(frontal.tolist())
-
-    if not face_cascade_profile.empty():
-        profile = face_cascade_profile.detectMultiScale(
-            gray,
-            scaleFactor=1.05,
-            minNeighbors=3,
-            minSize=(25, 25),
-        )
-        if len(profile):
-            detected_boxes.extend(profile.tolist())
-
-        flipped = cv2.flip(gray, 1)
-        profile_flipped = face_cascade_profile.detectMultiScale(
-            flipped,
-            scaleFactor=1.05,
-            minNeighbors=3,
-            minSize=(25, 25),
-        )
-        if len(profile_flipped):
-            for x, y, w, h in profile_flipped:
-                detected_boxes.append([width - x - w, y, w, h])
-
-    valid_boxes = [
-        box for box in detected_boxes
-        if float(box[2] * box[3]) / frame_area >= MIN_FACE_AREA_RATIO_STRICT
-    ]
-
-    return _deduplicate_boxes(valid_boxes)
-
-
-def _deduplicate_boxes(boxes: list, iou_threshold: float = 0.3) -> int:
-    if not boxes:
-        return 0
-
-    boxes = sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)
-    kept = []
-
-    for box in boxes:
-        x1, y1, w1, h1 = box
-        merged = False
-        for kx, ky, kw, kh in kept:
-            ix = max(x1, kx)
-            iy = max(y1, ky)
-            ix2 = min(x1 + w1, kx + kw)
-            iy2 = min(y1 + h1, ky + kh)
-            inter = max(0, ix2 - ix) * max(0, iy2 - iy)
-            union = w1 * h1 + kw * kh - inter
-            if union > 0 and inter / union > iou_threshold:
-                merged = True
-                break
-        if not merged:
-            kept.append(box)
 
-    return len(kept)
+def _apply_cadence(result: dict, cadence: dict) -> dict:
+    result.update(plan_next_check(cadence, result, get_detector_pool().stats()))
+    result.setdefault("debug", {})["cadence"] = cadence
+    return result
 
 
-def _analyze_frame_quality(frame: np.ndarray) -> dict:
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    brightness = float(np.mean(gray))
-    blur_score = float(cv2.Laplacian(gray, cv2.CV_64F).var())
-    low_light = brightness < LOW_LIGHT_THRESHOLD
-    blurry = blur_score < BLUR_THRESHOLD
+async def _face_check_for_user(user_id: str, raw_bytes) -> dict:
+    digest = await _frame_hash(raw_bytes)
+    track_key, cache_key, cadence_key = _track_key(user_id), _frame_cache_key(user_id), _cadence_key(user_id)
+    track, cache, cadence = await _load_user_states([track_key, cache_key, cadence_key])
 
+    result = cached_verdict(cache, digest)
+    if result is not None:
+        updates = {cache_key: (cache, CACHE_TTL_SECONDS)}
+    else:
+        result, boxes = await _run_face_check(raw_bytes, track)
+        result["cached"] = False
+        updates = {
+            track_key: (next_track(result, boxes), TRACK_TTL_SECONDS),
+            cache_key: (cache_entry(digest, dict(result)), CACHE_TTL_SECONDS),
+        }
+
+    cadence = next_cadence_state(cadence, result)
+    updates[cadence_key] = (cadence, CADENCE_TTL_SECONDS)
+    await _save_user_states(updates)
+
+    await record_verdicts_async(user_id, [(result, None)])
+    return _apply_cadence(result, cadence)
+
+
+def _server_timestamps(captured: list[float | None]) -> list[int | None]:
+    # Client clocks are not trusted; only the spacing between captures is
+    # kept, anchored so the newest frame lands at the server's "now".
+    known = [c for c in captured if c is not None]
+    if not known:
+        return [None] * len(captured)
+    now_ms = int(time.time() * 1000)
+    newest = max(known)
+    return [None if c is None else int(now_ms - (newest - c)) for c in captured]
+
+
+def _check_batch_size(count: int) -> None:
+    # Checked on the count alone, before any frame is read or decoded.
+    if not count:
+        raise HTTPException(status_code=400, detail="No frames provided")
+    if count > MAX_BATCH_FRAMES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FRAMES} frames per batch")
+
+
+def _aggregate_verdicts(results: list[dict]) -> dict:
+    """Worst verdict across a batch, shaped like a single face-check response."""
+    if not results:
+        raise HTTPException(status_code=400, detail="No frame in the batch could be decoded")
+
+    worst = max(results, key=lambda r: (STATUS_SEVERITY.get(r["status"], 0), r["face_count"]))
+    latest = results[-1]
     return {
-        "brightness": round(brightness, 2),
-        "blur_score": round(blur_score, 2),
-        "low_light": low_light,
-        "blurry": blurry,
+        "face_count": worst["face_count"],
+        "status": worst["status"],
+        "multiple_faces": worst["status"] == "multiple_faces",
+        "engine": latest["engine"],
+        "quality": latest["quality"],
+        "frames": len(results),
+        "status_counts": dict(Counter(r["status"] for r in results)),
     }
 
 
+class ProctoringSession:
+    """Per-connection state for the /proctoring/ws channel."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.frames = 0
+        self.last_boxes: list = []
+        self.last_face_count = 0
+        self.track: dict | None = None
+        self.frame_cache: dict | None = None
+        self.cadence: dict | None = None
+        self.status_counts: Counter = Counter()
+        self.quality_history: deque = deque(maxlen=QUALITY_HISTORY_SIZE)
+
+    def record(self, result: dict, boxes: list) -> None:
+        self.frames += 1
+        self.last_face_count = result["face_count"]
+        if not result.get("cached"):
+            self.last_boxes = boxes
+            self.track = next_track(result, boxes)
+        self.cadence = next_cadence_state(self.cadence, result)
+        self.status_counts[result["status"]] += 1
+        self.quality_history.append(result["quality"])
+
+    def summary(self) -> dict:
+        history = list(self.quality_history)
+        count = max(1, len(history))
+        return {
+            "frames": self.frames,
+            "status_counts": dict(self.status_counts),
+            "last_boxes": self.last_boxes,
+            "avg_brightness": round(sum(q["brightness"] for q in history) / count, 2),
+            "low_light_ratio": round(sum(1 for q in history if q["low_light"]) / count, 2),
+            "blurry_ratio": round(sum(1 for q in history if q["blurry"]) / count, 2),
+        }
+
+
+def _origin_allowed(websocket: WebSocket) -> bool:
+    # Browsers send the user's cookies with a WebSocket handshake from any
+    # site and CORS does not apply to it, so check the Origin here. Clients
+    # without an Origin header are not browsers and carry no ambient cookies.
+    origin = websocket.headers.get("origin")
+    if origin is None:
+        return True
+    host = websocket.headers.get("host")
+    return origin in allowed_origins or origin in (f"http://{host}", f"https://{host}")
+
+
+def warm_up() -> None:
+    """Start the detector pool and load one worker's models ahead of the first frame."""
+    get_detector_pool().warm_up()
+
+
 @router.post("/face-check")
-def face_check(payload: FaceCheckPayload, request: Request):
+async def face_check(payload: FaceCheckPayload, request: Request):
     user_id = request.cookies.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="User not logged in")
 
-    frame = _decode_data_url_to_image(payload.image)
-    quality = _analyze_frame_quality(frame)
+    return await _face_check_for_user(str(user_id), _data_url_to_bytes(payload.image))
 
-    lenient_count = 0
-    engine = "opencv"
 
-    if face_detector is not None:
-        lenient_count = _count_mediapipe_faces(
-            frame, face_detector,
-            MIN_FACE_CONFIDENCE_LENIENT,
-            MIN_FACE_AREA_RATIO_LENIENT,
-        )
-        engine = "mediapipe"
+@router.post("/face-check/frame")
+async def face_check_frame(request: Request):
+    """Binary variant of /face-check.
 
-        if lenient_count == 0:
-            try:
-                fallback = _count_opencv_faces_lenient(frame)
-            except Exception:
-                fallback = 0
-            if fallback > 0:
-                lenient_count = fallback
-                engine = "opencv_fallback"
+    Accepts the raw JPEG either as the request body (Content-Type: image/jpeg)
+    or as the ``image`` field of a multipart form. Returns the same schema.
+    """
+    user_id = request.cookies.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User not logged in")
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("image")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing image file")
+        raw_bytes = await upload.read()
     else:
-        lenient_count = _count_opencv_faces_lenient(frame)
+        raw_bytes = await request.body()
 
-    strict_count = 0
+    return await _face_check_for_user(str(user_id), raw_bytes)
 
-    if face_detector_strict is not None:
-        strict_count = _count_mediapipe_faces(
-            frame, face_detector_strict,
-            MIN_FACE_CONFIDENCE_STRICT,
-            MIN_FACE_AREA_RATIO_STRICT,
-        )
 
-    try:
-        opencv_strict_count = _count_opencv_faces_strict(frame)
-    except Exception:
-        opencv_strict_count = 0
+@router.post("/face-check/batch")
+async def face_check_batch(request: Request):
+    """Check several buffered frames in one request.
 
-    strict_count = max(strict_count, opencv_strict_count)
+    Accepts JSON ``{"frames": [{"image": "<data url>", "captured_at": <ms>}]}``
+    or a multipart form with repeated ``frames`` files and matching
+    ``captured_at`` fields. Frames are analysed in capture order on a single
+    pool worker; the response has a verdict per frame plus an ``aggregate``
+    verdict (the most severe one) in the usual face-check shape.
+    """
+    user_id = request.cookies.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User not logged in")
 
-    if strict_count >= 2:
-        face_count = strict_count
-        status = "multiple_faces"
-    elif lenient_count == 0:
-        face_count = 0
-        status = "no_face"
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        uploads = [item for item in form.getlist("frames") if not isinstance(item, str)]
+        _check_batch_size(len(uploads))
+        captured = form.getlist("captured_at")
+        frames = []
+        for index, upload in enumerate(uploads):
+            try:
+                captured_at = float(captured[index]) if index < len(captured) else None
+            except (TypeError, ValueError):
+                captured_at = None
+            frames.append((captured_at, await upload.read()))
     else:
-        face_count = lenient_count
-        status = "single_face"
+        try:
+            payload = FaceCheckBatchPayload.model_validate(await request.json())
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid batch payload")
+        _check_batch_size(len(payload.frames))
+        frames = [(frame.captured_at, _data_url_to_bytes(frame.image)) for frame in payload.frames]
+
+    order = sorted(range(len(frames)), key=lambda i: (frames[i][0] is None, frames[i][0] or 0, i))
+    track_key, cadence_key = _track_key(str(user_id)), _cadence_key(str(user_id))
+    track, cadence = await _load_user_states([track_key, cadence_key])
+    pool = get_detector_pool()
+    entries, track = await pool.analyse_batch([frames[i][1] for i in order], track)
+
+    queue_depth = pool.queue_depth
+    verdicts = []
+    results = []
+    for index, entry in zip(order, entries):
+        if "result" in entry:
+            verdict = entry["result"]
+            verdict["cached"] = False
+            verdict["debug"]["queue_depth"] = queue_depth
+            results.append(verdict)
+        else:
+            verdict = {"error": entry["error"], "status_code": entry["status_code"]}
+        verdict["index"] = index
+        verdict["captured_at"] = frames[index][0]
+        verdicts.append(verdict)
+
+    aggregate = _aggregate_verdicts(results)
+
+    recorded = [(verdict, verdict["captured_at"]) for verdict in verdicts if "status" in verdict]
+    timestamps = _server_timestamps([captured_at for _, captured_at in recorded])
+    await record_verdicts_async(str(user_id), [(verdict, ts) for (verdict, _), ts in zip(recorded, timestamps)])
+
+    for result in results:
+        cadence = next_cadence_state(cadence, result)
+    await _save_user_states({track_key: (track, TRACK_TTL_SECONDS), cadence_key: (cadence, CADENCE_TTL_SECONDS)})
+
+    aggregate["failed"] = len(verdicts) - len(results)
+    _apply_cadence(aggregate, cadence)
+    return {"frames": verdicts, "aggregate": aggregate}
+
+
+@router.get("/summary")
+def proctoring_summary(request: Request, round: str | None = None, recent: int = 0):
+    """Running proctoring counters for a round (the active one by default).
+
+    ``recent`` additionally returns up to that many of the newest timeline
+    entries.
+    """
+    user_id = request.cookies.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User not logged in")
 
-    return {
-        "face_count": face_count,
-        "status": status,
-        "multiple_faces": status == "multiple_faces",
-        "engine": engine,
-        "quality": quality,
-        "debug": {
-            "lenient_count": int(lenient_count),
-            "strict_count": int(strict_count),
-        },
-    }
+    round_name = round or active_round(str(user_id))
+    if round_name is None:
+        raise HTTPException(status_code=400, detail="No round in progress; pass ?round=")
+    if round_name not in ROUND_ORDER:
+        raise HTTPException(status_code=400, detail="Invalid round")
+
+    summary = round_summary(str(user_id), round_name)
+    if recent > 0:
+        summary["recent"] = recent_events(str(user_id), round_name, min(recent, 200))
+    return summary
+
+
+@router.get("/metrics")
+def proctoring_metrics():
+    return {"detector_pool": get_detector_pool().stats(), "frame_cache": frame_cache_stats.snapshot()}
+
+
+@router.websocket("/ws")
+async def proctoring_ws(websocket: WebSocket):
+    """Streaming face-check channel.
+
+    The client sends frames as binary messages (raw JPEG) or as text messages
+    carrying ``{"image": "<data url>"}``; every frame gets a verdict with the
+    same schema as /face-check plus a running ``session`` summary.
+    """
+    if not _origin_allowed(websocket):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Origin not allowed")
+        return
+    user_id = websocket.cookies.get("user_id")
+    if not user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="User not logged in")
+        return
+
+    await websocket.accept()
+    session = ProctoringSession(str(user_id))
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            try:
+                if message.get("bytes") is not None:
+                    raw_bytes = message["bytes"]
+                else:
+                    try:
+                        payload = FaceCheckPayload.model_validate(json.loads(message.get("text") or ""))
+                    except Exception:
+                        raise HTTPException(status_code=400, detail="Invalid image payload")
+                    raw_bytes = _data_url_to_bytes(payload.image)
+
+                digest = await _frame_hash(raw_bytes)
+                result = cached_verdict(session.frame_cache, digest)
+                boxes = session.last_boxes
+                if result is None:
+                    result, boxes = await _run_face_check(raw_bytes, session.track)
+                    result["cached"] = False
+                    session.frame_cache = cache_entry(digest, dict(result))
+            except HTTPException as exc:
+                await websocket.send_json({"error": exc.detail, "status_code": exc.status_code})
+                continue
+
+            session.record(result, boxes)
+            await record_verdicts_async(session.user_id, [(result, None)])
+            _apply_cadence(result, session.cadence)
+            result["sequence"] = session.frames
+            result["session"] = session.summary()
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        pass
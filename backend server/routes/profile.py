@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Request, HTTPException
-from  services.db_client import supabase
+from services.profile_cache import get_profile_async, profile_cache_stats
 
 router = APIRouter(tags=["profile"])
 
@@ -10,14 +10,18 @@ async def get_profile(request: Request):
     if not user_id:
         raise HTTPException(status_code=401, detail="User not logged in")
     try:
-        response = supabase.rpc("get_full_candidate_profile", {"p_user_id": int(user_id)}).execute()
-        if not response.data:
+        profile = await get_profile_async(user_id)
+        if not profile:
             raise HTTPException(status_code=404, detail="User not found")
         return {
             "success": True,
-            "data": response.data
+            "data": profile
         }
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/profile/cache-metrics")
+def profile_cache_metrics():
+    return profile_cache_stats.snapshot()
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, File, UploadFile, Request, HTTPException
 from pydantic import BaseModel
 from models.upload_resume import resume_upload
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_core.prompts import ChatPromptTemplate
 from services.db_client import supabase
+from services.llm import RESUME_PARSING, get_task_structured_model
+from services.profile_cache import invalidate_profile
+from services.llm_calls import call_llm_sync
+from services.round_prefetch import discard_openings
 import tempfile
 import os
 import re
@@ -33,9 +34,6 @@ DOMAINS = {
 domain_text = "\n".join([f"{k} - {v}" for k, v in DOMAINS.items()])
 ##------------------------------------------------------------------------------------------------------------------
 ##------------------------------------------------------------------------------------------------------------------
-api_key=os.getenv("RESUME_API")
-model=ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.1, google_api_key=api_key)
-structured_model=model.with_structured_output(resume_upload)
 prompt = f"""
 You are an expert resume parsing and evaluation system.
 Your task is to extract structured information from the given resume text.
@@ -131,6 +129,12 @@ def clean_resume_text(text: str) -> str:
 router = APIRouter(prefix="/resume", tags=["Resume Upload"])
 
 
+def warm_up() -> None:
+    from langchain_community.document_loaders import PyPDFLoader  # noqa: F401
+
+    get_task_structured_model(RESUME_PARSING, resume_upload)
+
+
 class ManualResumePayload(BaseModel):
     basic: dict
     skills: list[str] | None = None
@@ -227,6 +231,9 @@ def build_resume(payload: ManualResumePayload, request: Request):
                 "data": final_payload,
             },
         ).execute()
+        invalidate_profile(user_id)
+        # Prefetched interview openings were generated from the old profile.
+        discard_openings(str(user_id))
         return {
             "message": "Resume details saved successfully",
             "data": final_payload,
@@ -245,11 +252,15 @@ def upload_resume(request:Request,file: UploadFile = File(...)):
         tmp.write(file.file.read())
         tmp_path = tmp.name
     try:
+        # Imported per request: langchain_community is slow to import and
+        # only this endpoint needs it.
+        from langchain_community.document_loaders import PyPDFLoader
+
         loader = PyPDFLoader(tmp_path)
         pages = loader.load()
         full_text = "\n".join(page.page_content for page in pages)
         cleaned_text = clean_resume_text(full_text)
-        response=structured_model.invoke(f"{prompt}\n\n resume_text:{cleaned_text}")
+        response=call_llm_sync(RESUME_PARSING, get_task_structured_model(RESUME_PARSING, resume_upload), f"{prompt}\n\n resume_text:{cleaned_text}")
         json_response=response.model_dump()
         result = supabase.rpc(
             "upsert_full_resume",
@@ -258,6 +269,8 @@ def upload_resume(request:Request,file: UploadFile = File(...)):
                 "data": json_response
             }
         ).execute()
+        invalidate_profile(user_id)
+        discard_openings(str(user_id))
         #return {"message": "Resume uploaded and processed successfully", "data": json_response}
         list=["analysis","resume_score","skill_analysis","suggested_projects"]
         ai_analysis={}
@@ -268,6 +281,9 @@ def upload_resume(request:Request,file: UploadFile = File(...)):
         latency=end_time-start_time
         #print(json_response)
         return {"message": "Resume uploaded and processed successfully", "data": ai_analysis, "processing_time": latency}
+    except HTTPException:
+        # Admission control and time budgets (503/504) must reach the client as-is.
+        raise
     except Exception as e:
         return {"error": str(e)}
     finally:
@@ -1,29 +1,64 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from dotenv import load_dotenv
+import importlib
 import os
 load_dotenv()
-from services.db_client import supabase
+from services.cors import allowed_origins  # noqa: E402 (reads the .env loaded above)
+from services.analysis_jobs import analysis_queue  # noqa: E402
 #from services.redis import redis_client
 
-from routes import login,register,logout,resume_upload,profile,domain_switch,technical_round,manager_round,hr_round,coding_round,interview_flow,proctoring,jobs,admin
+# Routers by deployment role. ROUTER_GROUPS (comma separated, default "all")
+# picks the groups this process mounts, so a proctoring-only worker never
+# imports LangChain and an interview worker never loads MediaPipe.
+ROUTER_GROUPS = {
+    "auth": ["login", "register", "logout"],
+    "profile": ["resume_upload", "domain_switch", "profile", "jobs"],
+    "interview": ["coding_round", "technical_round", "manager_round", "hr_round", "interview_flow"],
+    "proctoring": ["proctoring"],
+    "admin": ["admin"],
+}
+# Mount order; kept as it was when every router was imported unconditionally.
+ROUTER_ORDER = [
+    "login", "register", "logout", "resume_upload", "coding_round", "technical_round", "manager_round",
+    "hr_round", "domain_switch", "profile", "interview_flow", "proctoring", "jobs", "admin",
+]
+# Build LLM clients, interview graphs and face detectors at startup instead
+# of on the first request that needs them.
+PRELOAD_ON_STARTUP = os.getenv("PRELOAD_ON_STARTUP", "").strip().lower() in ("1", "true", "yes")
+
+
+def selected_routers(groups: str) -> list[str]:
+    names = [g.strip() for g in groups.split(",") if g.strip()]
+    if not names or "all" in names:
+        names = list(ROUTER_GROUPS)
+    unknown = [g for g in names if g not in ROUTER_GROUPS]
+    if unknown:
+        raise RuntimeError(f"Unknown ROUTER_GROUPS entries: {', '.join(unknown)}")
+    wanted = {module for g in names for module in ROUTER_GROUPS[g]}
+    return [module for module in ROUTER_ORDER if module in wanted]
 
-app=FastAPI()
-allowed_origins = [
-    origin.strip()
-    for origin in os.getenv(
-        "CORS_ALLOW_ORIGINS",
-        "http://localhost:3000,http://127.0.0.1:3000,http://localhost:5173,http://127.0.0.1:5173,http://localhost:8000,http://127.0.0.1:8000",
-    ).split(",")
-    if origin.strip()
+
+router_modules = [
+    importlib.import_module(f"routes.{name}")
+    for name in selected_routers(os.getenv("ROUTER_GROUPS", "all"))
 ]
 
-required_dev_origins = ["http://localhost:5173", "http://127.0.0.1:5173"]
-for origin in required_dev_origins:
-    if origin not in allowed_origins:
-        allowed_origins.append(origin)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if PRELOAD_ON_STARTUP:
+        for module in router_modules:
+            if hasattr(module, "warm_up"):
+                module.warm_up()
+    yield
+    # Finish or fail queued round analyses so no poller waits on a lost job.
+    await analysis_queue.shutdown()
+
+
+app=FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -37,21 +72,9 @@ app.add_middleware(
     same_site="lax",
     https_only=False,
 )
-app.include_router(login.router)
-app.include_router(register.router)
-app.include_router(logout.router)
-app.include_router(resume_upload.router)
-app.include_router(coding_round.router)
+for module in router_modules:
+    app.include_router(module.router)
 #@app.include_router(mock_interview.router)
-app.include_router(technical_round.router)
-app.include_router(manager_round.router)
-app.include_router(hr_round.router)
-app.include_router(domain_switch.router)
-app.include_router(profile.router)
-app.include_router(interview_flow.router)
-app.include_router(proctoring.router)
-app.include_router(jobs.router)
-app.include_router(admin.router)
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the VidyaMitra API!"}
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""Final round analyses computed off the request path.
+
+The last answer of a round used to run the evaluation call and then the
+final-analysis call in the same request. Now the round returns its closing
+note at once and hands the finished state to this queue; a small pool of
+worker tasks on the event loop runs the analysis and stores the result in
+Redis (in-process dict as fallback), where ``GET
+/interview_flow/analysis?round=`` picks it up.
+
+Stored result per user and round::
+
+    {"status": "pending" | "done" | "failed", "analysis": {...} | None,
+     "proctoring": {...} | None, "error": str | None,
+     "started_at": <epoch s>, "deadline_at": <epoch s>}   # pending only
+
+A pending result past its deadline is reported as failed, so a job lost with
+its worker (crash, kill -9) does not stay "pending" until the key expires.
+On shutdown the queue gets a short grace period to finish; jobs still
+running or queued after it are stored as failed.
+
+``ANALYSIS_WORKERS`` sets the pool size and ``ANALYSIS_QUEUE_DEPTH`` the
+number of waiting jobs. When the queue is full, or with ``ANALYSIS_WORKERS=0``,
+the analysis runs inline in the request as before, so a burst slows the
+closing answers down instead of losing analyses.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Awaitable, Callable
+
+from fastapi.encoders import jsonable_encoder
+
+from services.redis import async_redis_client
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+ANALYSIS_QUEUE_DEPTH = int(os.getenv("ANALYSIS_QUEUE_DEPTH", "100"))
+RESULT_TTL_SECONDS = 86400
+# How long a job may stay pending, queueing included, before it counts as lost.
+ANALYSIS_DEADLINE_SECONDS = int(os.getenv("ANALYSIS_DEADLINE_SECONDS", "600"))
+ANALYSIS_SHUTDOWN_GRACE_SECONDS = float(os.getenv("ANALYSIS_SHUTDOWN_GRACE_SECONDS", "10"))
+
+Analyse = Callable[[dict], Awaitable[dict]]
+
+_RESULT_FALLBACK: dict[str, str] = {}
+
+
+def _key(user_id: str, round_name: str) -> str:
+    return f"user:{user_id}:analysis:{round_name}"
+
+
+async def _store(user_id: str, round_name: str, result: dict) -> None:
+    key = _key(user_id, round_name)
+    payload = json.dumps(jsonable_encoder(result))
+    _RESULT_FALLBACK[key] = payload
+    try:
+        await async_redis_client.set(key, payload, ex=RESULT_TTL_SECONDS)
+    except Exception:
+        pass
+
+
+async def get_result(user_id: str, round_name: str) -> dict | None:
+    key = _key(user_id, round_name)
+    try:
+        raw = await async_redis_client.get(key)
+        if raw:
+            return _expire_pending(json.loads(raw))
+    except Exception:
+        pass
+    raw = _RESULT_FALLBACK.get(key)
+    return _expire_pending(json.loads(raw)) if raw else None
+
+
+def _expire_pending(result: dict) -> dict:
+    if result.get("status") == "pending" and time.time() > float(result.get("deadline_at") or 0):
+        return dict(result, status="failed", error="Analysis did not finish in time")
+    return result
+
+
+def _failed(state: dict, error: str) -> dict:
+    return {"status": "failed", "analysis": None, "proctoring": state.get("proctoring"), "error": error}
+
+
+class AnalysisQueue:
+    def __init__(self, workers: int, depth: int):
+        self.workers = workers
+        self.depth = depth
+        self._queue: asyncio.Queue | None = None
+        self._loop = None
+        self._tasks: list[asyncio.Task] = []
+        self._lock = threading.Lock()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.inline = 0
+
+    def _ensure_started(self) -> asyncio.Queue:
+        # Workers belong to the loop that serves requests; start them there
+        # on first use (and again if that loop was replaced).
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.depth)
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        return self._queue
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            try:
+                await self._run(*job)
+            finally:
+                queue.task_done()
+
+    async def _run(self, user_id: str, round_name: str, state: dict, analyse: Analyse) -> dict:
+        with self._lock:
+            self.running += 1
+        try:
+            analysed = await analyse(state)
+            result = {
+                "status": "done",
+                "analysis": jsonable_encoder(analysed.get("analysis")),
+                "proctoring": state.get("proctoring"),
+                "error": None,
+            }
+            outcome = "completed"
+        except asyncio.CancelledError:
+            with self._lock:
+                self.running -= 1
+                self.failed += 1
+            await _store(user_id, round_name, _failed(state, "Analysis was interrupted by a server restart"))
+            raise
+        except Exception as exc:
+            result = _failed(state, str(exc))
+            outcome = "failed"
+        with self._lock:
+            self.running -= 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+        await _store(user_id, round_name, result)
+        return result
+
+    async def submit(self, user_id: str, round_name: str, state: dict, analyse: Analyse) -> dict:
+        """Queue the analysis of a finished round; returns the stored result so far.
+
+        That is ``pending`` normally, or the finished result when it had to
+        run inline.
+        """
+        if self.workers > 0:
+            now = time.time()
+            pending = {
+                "status": "pending",
+                "analysis": None,
+                "proctoring": state.get("proctoring"),
+                "error": None,
+                "started_at": now,
+                "deadline_at": now + ANALYSIS_DEADLINE_SECONDS,
+            }
+            await _store(user_id, round_name, pending)
+            try:
+                self._ensure_started().put_nowait((user_id, round_name, state, analyse))
+                return pending
+            except asyncio.QueueFull:
+                pass
+        with self._lock:
+            self.inline += 1
+        return await self._run(user_id, round_name, state, analyse)
+
+    async def drain(self) -> None:
+        """Wait until every queued analysis has been stored."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def shutdown(self, grace_seconds: float = ANALYSIS_SHUTDOWN_GRACE_SECONDS) -> None:
+        """Let queued analyses finish for up to ``grace_seconds``, then cancel.
+
+        Cancelled and never-started jobs are stored as failed, so their
+        pollers stop instead of waiting for the deadline.
+        """
+        if self._queue is None or self._loop is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), grace_seconds)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self._queue.empty():
+            user_id, round_name, state, _ = self._queue.get_nowait()
+            with self._lock:
+                self.failed += 1
+            await _store(user_id, round_name, _failed(state, "Analysis was interrupted by a server restart"))
+        self._tasks = []
+        self._loop = None
+        self._queue = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.depth,
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "inline": self.inline,
+            }
+
+
+analysis_queue = AnalysisQueue(ANALYSIS_WORKERS, ANALYSIS_QUEUE_DEPTH)
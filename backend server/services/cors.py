@@ -0,0 +1,18 @@
+import os
+
+# Browser origins allowed to call the API with the user's cookies: CORS for
+# the HTTP routes, and the Origin check of the proctoring WebSocket, which
+# CORS does not cover.
+allowed_origins = [
+    origin.strip()
+    for origin in os.getenv(
+        "CORS_ALLOW_ORIGINS",
+        "http://localhost:3000,http://127.0.0.1:3000,http://localhost:5173,http://127.0.0.1:5173,http://localhost:8000,http://127.0.0.1:8000",
+    ).split(",")
+    if origin.strip()
+]
+
+required_dev_origins = ["http://localhost:5173", "http://127.0.0.1:5173"]
+for origin in required_dev_origins:
+    if origin not in allowed_origins:
+        allowed_origins.append(origin)
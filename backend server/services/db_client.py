@@ -1,8 +1,21 @@
-from supabase import create_client, Client
+from supabase import AsyncClient, Client, acreate_client, create_client
 import os
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_KEY")
 try:
  supabase: Client = create_client(supabase_url, supabase_key)
 except Exception as e:
-    print("Error creating Supabase client:", e)
\ No newline at end of file
+    print("Error creating Supabase client:", e)
+
+_async_supabase: AsyncClient | None = None
+
+
+async def get_async_supabase() -> AsyncClient:
+    """Supabase client for async handlers, so RPCs do not block the event loop.
+
+    Created on first use because acreate_client has to run inside the loop.
+    """
+    global _async_supabase
+    if _async_supabase is None:
+        _async_supabase = await acreate_client(supabase_url, supabase_key)
+    return _async_supabase
@@ -0,0 +1,174 @@
+"""Face-detection worker pool, one per uvicorn worker.
+
+Every uvicorn worker process builds its own pool, and every pool worker
+holds its own detectors (MediaPipe graphs included), so the deployment runs
+``uvicorn workers x PROCTORING_POOL_WORKERS`` of them. The default therefore
+splits the CPUs between the uvicorn workers (``WEB_CONCURRENCY``, the
+variable uvicorn reads for ``--workers``) and caps the result at
+``DEFAULT_MAX_POOL_WORKERS``. Set ``PROCTORING_POOL_WORKERS`` to override.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from services.face_detection import FaceCheckError, FaceDetectors, decode_frame_context
+from services.face_engines import ENGINE_NAME, build_engine
+from services.face_tracking import analyse_with_tracking, next_track
+
+POOL_MODE = os.getenv("PROCTORING_POOL_MODE", "thread").strip().lower()
+DEFAULT_MAX_POOL_WORKERS = 4
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1") or 1))
+POOL_WORKERS = int(os.getenv("PROCTORING_POOL_WORKERS", "0") or 0) or max(
+    1, min(DEFAULT_MAX_POOL_WORKERS, (os.cpu_count() or 1) // WEB_CONCURRENCY)
+)
+
+_worker_state = threading.local()
+
+
+def _init_worker() -> None:
+    # Runs once per worker thread (thread mode) or per worker process
+    # (process mode), so each worker owns its detectors.
+    _worker_state.detectors = FaceDetectors(engine=build_engine(ENGINE_NAME))
+
+
+def _worker_detectors() -> FaceDetectors:
+    detectors = getattr(_worker_state, "detectors", None)
+    if detectors is None:
+        _init_worker()
+        detectors = _worker_state.detectors
+    return detectors
+
+
+def _analyse_frame_bytes(raw_bytes, track: dict | None = None) -> tuple[dict, list]:
+    return analyse_with_tracking(decode_frame_context(raw_bytes), _worker_detectors(), track)
+
+
+def _analyse_frame_batch(frames: list, track: dict | None = None) -> tuple[list, dict | None]:
+    """Analyse buffered frames back to back on one worker, carrying the tracker through them.
+
+    A frame that cannot be decoded yields an error entry instead of failing
+    the whole batch.
+    """
+    detectors = _worker_detectors()
+    entries = []
+    for raw_bytes in frames:
+        try:
+            result, boxes = analyse_with_tracking(decode_frame_context(raw_bytes), detectors, track)
+        except FaceCheckError as exc:
+            entries.append({"error": exc.detail, "status_code": exc.status_code})
+            continue
+        track = next_track(result, boxes)
+        entries.append({"result": result, "boxes": boxes})
+    return entries, track
+
+
+class DetectorPool:
+    """Fixed pool of face-detection workers.
+
+    ``mode="thread"`` runs detectors on threads of this process (OpenCV and
+    MediaPipe release the GIL while they work); ``mode="process"`` runs them in
+    spawned worker processes. Frames are submitted as encoded bytes so decoding
+    happens on the worker too.
+    """
+
+    def __init__(self, mode: str = POOL_MODE, workers: int = POOL_WORKERS):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown detector pool mode: {mode}")
+
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+
+        if mode == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="face-detector",
+                initializer=_init_worker,
+            )
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _picklable(self, raw_bytes):
+        if self.mode == "process" and not isinstance(raw_bytes, bytes):
+            return bytes(raw_bytes)
+        return raw_bytes
+
+    def submit(self, raw_bytes, track: dict | None = None) -> Future:
+        return self._submit(_analyse_frame_bytes, self._picklable(raw_bytes), track)
+
+    def submit_batch(self, frames: list, track: dict | None = None) -> Future:
+        return self._submit(_analyse_frame_batch, [self._picklable(f) for f in frames], track)
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if future.exception() is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    async def analyse(self, raw_bytes, track: dict | None = None) -> tuple[dict, list]:
+        return await asyncio.wrap_future(self.submit(raw_bytes, track))
+
+    def analyse_sync(self, raw_bytes, track: dict | None = None) -> tuple[dict, list]:
+        return self.submit(raw_bytes, track).result()
+
+    async def analyse_batch(self, frames: list, track: dict | None = None) -> tuple[list, dict | None]:
+        return await asyncio.wrap_future(self.submit_batch(frames, track))
+
+    @property
+    def queue_depth(self) -> int:
+        # Frames waiting for a free worker, i.e. how far the pool is saturated.
+        with self._lock:
+            return max(0, self._pending - self.workers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+            completed = self._completed
+            failed = self._failed
+        return {
+            "mode": self.mode,
+            "engine": ENGINE_NAME,
+            "workers": self.workers,
+            "in_flight": min(pending, self.workers),
+            "queue_depth": max(0, pending - self.workers),
+            "completed": completed,
+            "failed": failed,
+        }
+
+    def warm_up(self) -> None:
+        """Build one worker's detectors now instead of on the first frame."""
+        self._executor.submit(_worker_detectors).result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: DetectorPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_detector_pool() -> DetectorPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DetectorPool()
+    return _pool
@@ -0,0 +1,482 @@
+import os
+from functools import cached_property, lru_cache
+
+import cv2
+import numpy as np
+
+from services.head_pose import estimate_gaze
+
+MIN_FACE_CONFIDENCE_LENIENT = 0.4
+MIN_FACE_AREA_RATIO_LENIENT = 0.002
+
+MIN_FACE_CONFIDENCE_STRICT = 0.25
+MIN_FACE_AREA_RATIO_STRICT = 0.001
+LOW_LIGHT_THRESHOLD = 50.0
+BLUR_THRESHOLD = 45.0
+MAX_FRAME_BYTES = 2 * 1024 * 1024
+
+# Early-exit rules for the staged pipeline (see analyse_frame).
+BLACK_FRAME_THRESHOLD = 12.0
+CONFIDENT_FACE_SCORE = 0.8
+# minSize is in pixels of the frame as decoded; haar_params scales it to the
+# analysis size so downscaling does not raise the smallest face Haar reports.
+HAAR_LENIENT_PARAMS = {"scaleFactor": 1.1, "minNeighbors": 4, "minSize": (30, 30)}
+HAAR_STRICT_PARAMS = {"scaleFactor": 1.05, "minNeighbors": 3, "minSize": (25, 25)}
+EXHAUSTIVE_PIPELINE = os.getenv("PROCTORING_EXHAUSTIVE", "").strip().lower() in ("1", "true", "yes")
+
+# Frames wider than this are downscaled once before any analysis runs.
+ANALYSIS_MAX_WIDTH = int(os.getenv("PROCTORING_ANALYSIS_WIDTH", "640"))
+# JPEG DCT-domain downscale applied while decoding: 1, 2, 4 or 8.
+DECODE_REDUCTION = int(os.getenv("PROCTORING_DECODE_REDUCTION", "1"))
+_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+@lru_cache(maxsize=None)
+def _mediapipe():
+    # Imported when the first detector is built, not with this module:
+    # importing MediaPipe takes about a second.
+    try:
+        import mediapipe as mp
+    except Exception:
+        return None
+    return mp
+
+
+class FaceCheckError(Exception):
+    """Picklable error carrying an HTTP status, so it survives a process-pool hop."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class FaceDetectors:
+    """One worker's own set of detectors.
+
+    MediaPipe graphs and cascade classifiers are not safe to share between
+    threads, so every pool worker builds its own instance instead of
+    serialising on a process-wide lock.
+    """
+
+    def __init__(self, engine=None):
+        # Optional single-engine detector (services.face_engines); ``None``
+        # keeps the staged MediaPipe + Haar pipeline below. An engine does its
+        # own detection and tracking, so the staged pipeline's graphs and
+        # cascades are only built without one.
+        self.engine = engine
+        self.face_cascade = None
+        self.face_cascade_profile = None
+        self.face_detector = None
+        self.face_detector_strict = None
+        self.face_detector_roi = None
+        if engine is not None:
+            return
+
+        self.face_cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        )
+        self.face_cascade_profile = cv2.CascadeClassifier(
+            cv2.data.haarcascades + "haarcascade_profileface.xml"
+        )
+        self.face_detector = self._build_mediapipe(0.4)
+        self.face_detector_strict = self._build_mediapipe(0.3)
+        # Short-range model for re-finding a tracked face inside a small crop.
+        self.face_detector_roi = self._build_mediapipe(0.5, model_selection=0)
+
+    @staticmethod
+    def _build_mediapipe(min_detection_confidence: float, model_selection: int = 1):
+        mp = _mediapipe()
+        if mp is None:
+            return None
+        try:
+            return mp.solutions.face_detection.FaceDetection(
+                model_selection=model_selection,
+                min_detection_confidence=min_detection_confidence,
+            )
+        except Exception:
+            return None
+
+
+class FrameContext:
+    """One frame prepared for analysis.
+
+    The downscaled BGR image is built once; the RGB, gray and equalised gray
+    variants are derived on first access and shared by the quality metrics
+    and every detector pass, so a frame is converted at most once per
+    colour space no matter how many stages run. ``source`` keeps the frame as
+    decoded, before downscaling, for the blur metric.
+    """
+
+    def __init__(self, bgr: np.ndarray, source: np.ndarray | None = None):
+        self.bgr = bgr
+        self.source = bgr if source is None else source
+        self.height, self.width = bgr.shape[:2]
+        self.area = float(max(1, self.width * self.height))
+        # Analysis pixels per decoded pixel; 1.0 unless the frame was downscaled.
+        self.scale = self.width / max(1, self.source.shape[1])
+
+    @cached_property
+    def rgb(self) -> np.ndarray:
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def source_gray(self) -> np.ndarray:
+        if self.source is self.bgr:
+            return self.gray
+        return cv2.cvtColor(self.source, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def equalized(self) -> np.ndarray:
+        return cv2.equalizeHist(self.gray)
+
+    @cached_property
+    def equalized_flipped(self) -> np.ndarray:
+        return cv2.flip(self.equalized, 1)
+
+
+def build_frame_context(frame: np.ndarray, max_width: int = ANALYSIS_MAX_WIDTH) -> FrameContext:
+    height, width = frame.shape[:2]
+    if max_width and width > max_width:
+        scaled_height = max(1, round(height * max_width / width))
+        scaled = cv2.resize(frame, (max_width, scaled_height), interpolation=cv2.INTER_AREA)
+        return FrameContext(scaled, source=frame)
+    return FrameContext(frame)
+
+
+def decode_frame_context(raw_bytes, reduction: int = DECODE_REDUCTION) -> FrameContext:
+    return build_frame_context(decode_bytes_to_image(raw_bytes, reduction))
+
+
+def decode_bytes_to_image(raw_bytes, reduction: int = 1) -> np.ndarray:
+    if not raw_bytes:
+        raise FaceCheckError(400, "Empty image payload")
+    if len(raw_bytes) > MAX_FRAME_BYTES:
+        raise FaceCheckError(413, "Image payload too large")
+
+    # frombuffer gives a read-only view over the received bytes, so imdecode
+    # reads straight from the request buffer without another copy.
+    np_buffer = np.frombuffer(raw_bytes, dtype=np.uint8)
+    frame = cv2.imdecode(np_buffer, _DECODE_FLAGS.get(reduction, cv2.IMREAD_COLOR))
+    if frame is None:
+        raise FaceCheckError(400, "Unable to decode image")
+    return frame
+
+
+MEDIAPIPE_KEYPOINTS = ("right_eye", "left_eye", "nose_tip", "mouth_center", "right_ear", "left_ear")
+
+
+def mediapipe_keypoints(detection, width: int, height: int, offset: tuple[int, int] = (0, 0)) -> dict:
+    """Pixel coordinates of a MediaPipe detection's six keypoints."""
+    x0, y0 = offset
+    return {
+        name: [x0 + point.x * width, y0 + point.y * height]
+        for name, point in zip(MEDIAPIPE_KEYPOINTS, detection.location_data.relative_keypoints)
+    }
+
+
+def detect_mediapipe_faces(
+    ctx: FrameContext,
+    detector,
+    min_confidence: float,
+    min_area_ratio: float,
+) -> tuple[list, list]:
+    """Return the pixel boxes of accepted detections and their scores."""
+    boxes, scores, _ = detect_mediapipe_faces_with_keypoints(ctx, detector, min_confidence, min_area_ratio)
+    return boxes, scores
+
+
+def detect_mediapipe_faces_with_keypoints(
+    ctx: FrameContext,
+    detector,
+    min_confidence: float,
+    min_area_ratio: float,
+) -> tuple[list, list, list]:
+    """Like :func:`detect_mediapipe_faces`, plus each face's keypoints from the same pass."""
+    if detector is None:
+        return [], [], []
+
+    results = detector.process(ctx.rgb)
+
+    detections = results.detections if results and results.detections else []
+    height, width = ctx.height, ctx.width
+    boxes = []
+    scores = []
+    keypoints = []
+
+    for detection in detections:
+        score_list = detection.score or []
+        confidence = float(score_list[0]) if score_list else 0.0
+        if confidence < min_confidence:
+            continue
+
+        bbox = detection.location_data.relative_bounding_box
+        area_ratio = max(0.0, float(bbox.width * bbox.height))
+        if area_ratio < min_area_ratio:
+            continue
+
+        boxes.append([
+            int(bbox.xmin * width),
+            int(bbox.ymin * height),
+            int(bbox.width * width),
+            int(bbox.height * height),
+        ])
+        scores.append(confidence)
+        keypoints.append(mediapipe_keypoints(detection, width, height))
+
+    return boxes, scores, keypoints
+
+
+def haar_params(params: dict, ctx: FrameContext) -> dict:
+    """``params`` with ``minSize`` scaled from decoded to analysis pixels.
+
+    Cascades cannot find faces smaller than their training window (24 px
+    frontal, 20 px profile), so on heavily downscaled frames the effective
+    minimum is still somewhat above the configured one.
+    """
+    if ctx.scale >= 1.0:
+        return params
+    min_w, min_h = params["minSize"]
+    return dict(params, minSize=(max(1, round(min_w * ctx.scale)), max(1, round(min_h * ctx.scale))))
+
+
+def detect_opencv_faces_lenient(ctx: FrameContext, detectors: FaceDetectors) -> list:
+    if detectors.face_cascade.empty():
+        raise FaceCheckError(500, "Face detector is not initialized")
+
+    faces = detectors.face_cascade.detectMultiScale(ctx.equalized, **haar_params(HAAR_LENIENT_PARAMS, ctx))
+
+    return [
+        [int(x), int(y), int(w), int(h)] for x, y, w, h in faces
+        if float(w * h) / ctx.area >= MIN_FACE_AREA_RATIO_LENIENT
+    ]
+
+
+def detect_opencv_faces_strict(ctx: FrameContext, detectors: FaceDetectors) -> list:
+    if detectors.face_cascade.empty():
+        return []
+
+    params = haar_params(HAAR_STRICT_PARAMS, ctx)
+    detections = [detectors.face_cascade.detectMultiScale(ctx.equalized, **params)]
+
+    if not detectors.face_cascade_profile.empty():
+        detections.append(detectors.face_cascade_profile.detectMultiScale(ctx.equalized, **params))
+
+        profile_flipped = detectors.face_cascade_profile.detectMultiScale(ctx.equalized_flipped, **params)
+        if len(profile_flipped):
+            profile_flipped = np.asarray(profile_flipped).copy()
+            profile_flipped[:, 0] = ctx.width - profile_flipped[:, 0] - profile_flipped[:, 2]
+            detections.append(profile_flipped)
+
+    boxes = np.concatenate([np.asarray(d).reshape(-1, 4) for d in detections]).astype(np.int64)
+    boxes = boxes[boxes[:, 2] * boxes[:, 3] / ctx.area >= MIN_FACE_AREA_RATIO_STRICT]
+
+    return suppress_overlapping_boxes(boxes).tolist()
+
+
+def suppress_overlapping_boxes(boxes, iou_threshold: float = 0.3) -> np.ndarray:
+    """Greedy non-maximum suppression over ``[x, y, w, h]`` boxes, largest first.
+
+    A box is dropped when its IoU with an already kept, larger box exceeds
+    ``iou_threshold``. The IoU matrix is computed in one NumPy pass; only the
+    greedy sweep over rows stays in Python.
+    """
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    return boxes[overlapping_box_keep_indices(boxes, iou_threshold)]
+
+
+def overlapping_box_keep_indices(boxes, iou_threshold: float = 0.3) -> np.ndarray:
+    """Indices of the boxes :func:`suppress_overlapping_boxes` keeps, largest box first."""
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    count = len(boxes)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    areas = boxes[:, 2] * boxes[:, 3]
+    order = np.argsort(-areas, kind="stable")
+    boxes = boxes[order]
+    areas = areas[order]
+
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    inter_w = np.clip(np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :]), 0, None)
+    inter_h = np.clip(np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :]), 0, None)
+    inter = inter_w * inter_h
+    union = areas[:, None] + areas[None, :] - inter
+
+    iou = np.zeros(inter.shape, dtype=np.float64)
+    np.divide(inter, union, out=iou, where=union > 0)
+    overlaps = iou > iou_threshold
+    np.fill_diagonal(overlaps, False)
+
+    # A kept box never overlaps an earlier kept box, so OR-ing its whole row
+    # only ever suppresses later boxes.
+    suppressed = np.zeros(count, dtype=bool)
+    for i in range(count):
+        if not suppressed[i]:
+            np.logical_or(suppressed, overlaps[i], out=suppressed)
+
+    return order[~suppressed]
+
+
+def analyze_frame_quality(ctx: FrameContext) -> dict:
+    brightness = float(cv2.mean(ctx.gray)[0])
+    # BLUR_THRESHOLD was set against the Laplacian variance of the frame as
+    # decoded; downscaling sharpens edges per pixel and would inflate the score.
+    blur_score = float(cv2.Laplacian(ctx.source_gray, cv2.CV_64F).var())
+    low_light = brightness < LOW_LIGHT_THRESHOLD
+    blurry = blur_score < BLUR_THRESHOLD
+
+    return {
+        "brightness": round(brightness, 2),
+        "blur_score": round(blur_score, 2),
+        "low_light": low_light,
+        "blurry": blurry,
+    }
+
+
+def analyse_frame(
+    ctx: FrameContext,
+    detectors: FaceDetectors,
+    exhaustive: bool = EXHAUSTIVE_PIPELINE,
+) -> tuple[dict, list]:
+    """Run the detection pipeline; returns the response body and the face boxes behind it.
+
+    Stages run cheapest first and stop as soon as the verdict is settled:
+
+    1. quality       -- a black frame is reported as ``no_face`` straight away.
+    2. mediapipe_lenient (+ haar_lenient when MediaPipe sees nothing).
+    3. mediapipe_strict  -- skipped when the lenient pass already found two faces.
+    4. haar_strict       -- skipped when MediaPipe agrees on one confident face,
+       when MediaPipe already found several, or when the frame is blurry
+       (cascades mostly produce false positives there).
+
+    ``exhaustive=True`` runs every stage, which is the reference the offline
+    parity harness compares against.
+
+    What the staged result promises relative to the exhaustive one, for the
+    same verdict: ``status`` and ``multiple_faces`` are the fields clients act
+    on, and ``face_count`` matches too except for ``multiple_faces`` frames.
+    There the staged count comes from MediaPipe alone (``mediapipe_multiple``
+    skips the Haar strict pass, which may count more faces), so it is a lower
+    bound on the exhaustive count. ``engine``, ``quality``, ``gaze`` and
+    ``debug`` are not compared. The skipped Haar passes can still flip a
+    verdict on some frames; test/proctoring_parity.py measures how often.
+    """
+    quality = analyze_frame_quality(ctx)
+    stages = ["quality"]
+    early_exit = None
+
+    lenient_boxes = []
+    lenient_scores = []
+    lenient_keypoints = []
+    strict_boxes = []
+    engine = "opencv"
+
+    if not exhaustive and quality["brightness"] < BLACK_FRAME_THRESHOLD:
+        early_exit = "black_frame"
+    else:
+        if detectors.face_detector is not None:
+            lenient_boxes, lenient_scores, lenient_keypoints = detect_mediapipe_faces_with_keypoints(
+                ctx, detectors.face_detector,
+                MIN_FACE_CONFIDENCE_LENIENT,
+                MIN_FACE_AREA_RATIO_LENIENT,
+            )
+            stages.append("mediapipe_lenient")
+            engine = "mediapipe"
+
+            if not lenient_boxes:
+                try:
+                    fallback = detect_opencv_faces_lenient(ctx, detectors)
+                except Exception:
+                    fallback = []
+                stages.append("haar_lenient")
+                if fallback:
+                    lenient_boxes = fallback
+                    engine = "opencv_fallback"
+        else:
+            lenient_boxes = detect_opencv_faces_lenient(ctx, detectors)
+            stages.append("haar_lenient")
+
+        if not exhaustive and engine == "mediapipe" and len(lenient_boxes) >= 2:
+            # The strict detector only lowers the thresholds, so it cannot
+            # find fewer faces than the lenient one already did.
+            strict_boxes = lenient_boxes
+            early_exit = "mediapipe_multiple"
+        else:
+            strict_scores = []
+            if detectors.face_detector_strict is not None:
+                strict_boxes, strict_scores = detect_mediapipe_faces(
+                    ctx, detectors.face_detector_strict,
+                    MIN_FACE_CONFIDENCE_STRICT,
+                    MIN_FACE_AREA_RATIO_STRICT,
+                )
+                stages.append("mediapipe_strict")
+
+            if not exhaustive and len(strict_boxes) >= 2:
+                early_exit = "mediapipe_multiple"
+            elif (
+                not exhaustive
+                and engine == "mediapipe"
+                and len(lenient_boxes) == 1
+                and len(strict_boxes) == 1
+                and min(lenient_scores + strict_scores) >= CONFIDENT_FACE_SCORE
+            ):
+                early_exit = "mediapipe_confident"
+            elif not exhaustive and quality["blurry"]:
+                early_exit = "blurry_frame"
+            else:
+                try:
+                    opencv_strict_boxes = detect_opencv_faces_strict(ctx, detectors)
+                except Exception:
+                    opencv_strict_boxes = []
+                stages.append("haar_strict")
+
+                if len(opencv_strict_boxes) > len(strict_boxes):
+                    strict_boxes = opencv_strict_boxes
+
+    lenient_count = len(lenient_boxes)
+    strict_count = len(strict_boxes)
+
+    if strict_count >= 2:
+        face_count = strict_count
+        status = "multiple_faces"
+        boxes = strict_boxes
+    elif lenient_count == 0:
+        face_count = 0
+        status = "no_face"
+        boxes = []
+    else:
+        face_count = lenient_count
+        status = "single_face"
+        boxes = lenient_boxes
+
+    # Head orientation reuses the lenient pass's keypoints instead of running
+    # a landmark model; it is only defined when that pass found the one face.
+    single_keypoints = lenient_keypoints[0] if status == "single_face" and len(lenient_keypoints) == 1 else None
+
+    result = {
+        "face_count": face_count,
+        "status": status,
+        "multiple_faces": status == "multiple_faces",
+        "engine": engine,
+        "quality": quality,
+        "gaze": estimate_gaze(single_keypoints),
+        "debug": {
+            "lenient_count": int(lenient_count),
+            "strict_count": int(strict_count),
+            "stages": stages,
+            "early_exit": early_exit,
+            "analysis_size": [ctx.width, ctx.height],
+        },
+    }
+    return result, boxes
@@ -0,0 +1,296 @@
+"""Single-engine face detectors for the proctoring pipeline.
+
+Every engine turns a FrameContext into pixel boxes plus a confidence mapped
+from the engine's raw score through a per-engine table, so one threshold
+(PROCTORING_ENGINE_MIN_CONFIDENCE) applies whichever engine is configured.
+The built-in tables are hand-set priors, not fitted on data: the threshold
+only means the same thing across engines once the tables have been refitted
+on a labelled corpus (see below). PROCTORING_ENGINE selects the engine:
+
+- ``cascade`` (default): the staged MediaPipe + Haar pipeline in
+  services.face_detection; no engine object is built.
+- ``mediapipe``, ``haar``: the detectors already used by that pipeline, run
+  alone.
+- ``yunet``, ``res10``: OpenCV DNN models on the CPU. The weights are not in
+  the repository; download ``face_detection_yunet_2023mar.onnx`` (OpenCV
+  model zoo) or ``deploy.prototxt`` + ``res10_300x300_ssd_iter_140000.caffemodel``
+  (OpenCV dnn face detector sample) into PROCTORING_MODEL_DIR.
+
+test/compare_face_engines.py measures accuracy and latency of every engine
+on the benchmark corpus and can refit the calibration tables; the fit needs
+recorded frames with real faces (--recorded), as the drawn faces it falls
+back to produce no false detections to calibrate against.
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+from services.face_detection import (
+    BLACK_FRAME_THRESHOLD,
+    HAAR_STRICT_PARAMS,
+    MIN_FACE_AREA_RATIO_LENIENT,
+    FaceDetectors,
+    FrameContext,
+    analyze_frame_quality,
+    mediapipe_keypoints,
+    haar_params,
+    overlapping_box_keep_indices,
+)
+from services.head_pose import estimate_gaze
+
+ENGINE_NAME = os.getenv("PROCTORING_ENGINE", "cascade").strip().lower()
+ENGINE_MIN_CONFIDENCE = float(os.getenv("PROCTORING_ENGINE_MIN_CONFIDENCE", "0.5"))
+MODEL_DIR = os.getenv(
+    "PROCTORING_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "face_models"),
+)
+YUNET_MODEL = os.getenv("PROCTORING_YUNET_MODEL", os.path.join(MODEL_DIR, "face_detection_yunet_2023mar.onnx"))
+RES10_PROTOTXT = os.getenv("PROCTORING_RES10_PROTOTXT", os.path.join(MODEL_DIR, "deploy.prototxt"))
+RES10_MODEL = os.getenv(
+    "PROCTORING_RES10_MODEL", os.path.join(MODEL_DIR, "res10_300x300_ssd_iter_140000.caffemodel")
+)
+# JSON file of {engine: [[raw_score, calibrated], ...]} written by
+# test/compare_face_engines.py --fit-calibration.
+CALIBRATION_FILE = os.getenv("PROCTORING_ENGINE_CALIBRATION", "")
+
+# Raw score -> rough likelihood that the box is a real face, as
+# piecewise-linear knots. Hand-set from each engine's documented score range,
+# not fitted; refit them with --fit-calibration on your own recorded frames
+# and point PROCTORING_ENGINE_CALIBRATION at the result.
+DEFAULT_CALIBRATION = {
+    "mediapipe": [[0.0, 0.0], [0.5, 0.45], [0.7, 0.75], [0.9, 0.95], [1.0, 0.99]],
+    # Haar level weights (detectMultiScale3 with outputRejectLevels).
+    "haar": [[-1.0, 0.0], [0.5, 0.1], [1.5, 0.35], [3.0, 0.65], [5.0, 0.9], [8.0, 0.98]],
+    "yunet": [[0.0, 0.0], [0.5, 0.3], [0.7, 0.7], [0.85, 0.92], [1.0, 0.99]],
+    "res10": [[0.0, 0.0], [0.3, 0.15], [0.5, 0.5], [0.8, 0.9], [1.0, 0.99]],
+}
+
+
+def _load_calibration_tables() -> dict:
+    tables = dict(DEFAULT_CALIBRATION)
+    if CALIBRATION_FILE:
+        with open(CALIBRATION_FILE) as handle:
+            tables.update(json.load(handle))
+    return tables
+
+
+class Calibration:
+    def __init__(self, knots: list):
+        knots = sorted((float(raw), float(calibrated)) for raw, calibrated in knots)
+        self.raw = np.array([raw for raw, _ in knots])
+        # Keep the mapping monotone so a higher raw score never means less.
+        self.calibrated = np.maximum.accumulate(np.array([calibrated for _, calibrated in knots]))
+
+    def __call__(self, scores) -> np.ndarray:
+        return np.interp(np.asarray(scores, dtype=np.float64), self.raw, self.calibrated)
+
+
+class FaceEngine(ABC):
+    """Detects faces in a FrameContext, mapping raw scores through a calibration table."""
+
+    name = ""
+
+    def __init__(self, calibration: list | None = None):
+        self.calibration = Calibration(calibration or _load_calibration_tables()[self.name])
+
+    @abstractmethod
+    def detect_raw(self, ctx: FrameContext) -> tuple[np.ndarray, np.ndarray, list]:
+        """Pixel ``[x, y, w, h]`` boxes, the engine's own scores and per-box
+        keypoints (``None`` where the engine has none), unfiltered."""
+
+    def detect(
+        self,
+        ctx: FrameContext,
+        min_confidence: float = ENGINE_MIN_CONFIDENCE,
+        min_area_ratio: float = MIN_FACE_AREA_RATIO_LENIENT,
+    ) -> tuple[list, list, list]:
+        boxes, raw_scores, keypoints = self.detect_raw(ctx)
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        confidences = self.calibration(raw_scores)
+        keep = (confidences >= min_confidence) & (boxes[:, 2] * boxes[:, 3] / ctx.area >= min_area_ratio)
+        return (
+            boxes[keep].tolist(),
+            [round(float(c), 3) for c in confidences[keep]],
+            [points for points, kept in zip(keypoints, keep) if kept],
+        )
+
+
+class MediaPipeEngine(FaceEngine):
+    name = "mediapipe"
+
+    def __init__(self, calibration: list | None = None):
+        super().__init__(calibration)
+        # A low floor so the calibrated threshold, not MediaPipe's, decides.
+        self.detector = FaceDetectors._build_mediapipe(0.2)
+        if self.detector is None:
+            raise RuntimeError("MediaPipe is not available")
+
+    def detect_raw(self, ctx: FrameContext) -> tuple[np.ndarray, np.ndarray, list]:
+        results = self.detector.process(ctx.rgb)
+        detections = results.detections if results and results.detections else []
+        boxes = []
+        scores = []
+        keypoints = []
+        for detection in detections:
+            bbox = detection.location_data.relative_bounding_box
+            boxes.append([
+                int(bbox.xmin * ctx.width),
+                int(bbox.ymin * ctx.height),
+                int(bbox.width * ctx.width),
+                int(bbox.height * ctx.height),
+            ])
+            scores.append(float(detection.score[0]) if detection.score else 0.0)
+            keypoints.append(mediapipe_keypoints(detection, ctx.width, ctx.height))
+        return np.asarray(boxes, dtype=np.int64).reshape(-1, 4), np.asarray(scores, dtype=np.float64), keypoints
+
+
+class HaarEngine(FaceEngine):
+    name = "haar"
+
+    def __init__(self, calibration: list | None = None):
+        super().__init__(calibration)
+        self.frontal = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        self.profile = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_profileface.xml")
+        if self.frontal.empty():
+            raise RuntimeError("Haar frontal-face cascade could not be loaded")
+
+    @staticmethod
+    def _scored(cascade, image: np.ndarray, params: dict) -> tuple[np.ndarray, np.ndarray]:
+        boxes, _, weights = cascade.detectMultiScale3(image, outputRejectLevels=True, **params)
+        return (
+            np.asarray(boxes, dtype=np.int64).reshape(-1, 4),
+            np.asarray(weights, dtype=np.float64).reshape(-1),
+        )
+
+    def detect_raw(self, ctx: FrameContext) -> tuple[np.ndarray, np.ndarray, list]:
+        params = haar_params(HAAR_STRICT_PARAMS, ctx)
+        passes = [self._scored(self.frontal, ctx.equalized, params)]
+        if not self.profile.empty():
+            passes.append(self._scored(self.profile, ctx.equalized, params))
+            flipped, flipped_scores = self._scored(self.profile, ctx.equalized_flipped, params)
+            flipped[:, 0] = ctx.width - flipped[:, 0] - flipped[:, 2]
+            passes.append((flipped, flipped_scores))
+
+        boxes = np.concatenate([b for b, _ in passes])
+        scores = np.concatenate([s for _, s in passes])
+        keep = overlapping_box_keep_indices(boxes)
+        return boxes[keep], scores[keep], [None] * len(keep)
+
+
+class YuNetEngine(FaceEngine):
+    name = "yunet"
+
+    def __init__(self, calibration: list | None = None, model_path: str = YUNET_MODEL):
+        super().__init__(calibration)
+        if not os.path.exists(model_path):
+            raise RuntimeError(f"YuNet model not found at {model_path}")
+        self.detector = cv2.FaceDetectorYN.create(
+            model_path, "", (320, 320), 0.3, 0.3, 50,
+            cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU,
+        )
+        self._input_size = None
+
+    def detect_raw(self, ctx: FrameContext) -> tuple[np.ndarray, np.ndarray, list]:
+        if self._input_size != (ctx.width, ctx.height):
+            self._input_size = (ctx.width, ctx.height)
+            self.detector.setInputSize(self._input_size)
+        _, faces = self.detector.detect(ctx.bgr)
+        if faces is None:
+            return np.zeros((0, 4), dtype=np.int64), np.zeros(0), []
+        # Rows are x, y, w, h, then right eye, left eye, nose tip, right and
+        # left mouth corner as x/y pairs, then the score.
+        keypoints = [
+            {
+                "right_eye": [row[4], row[5]],
+                "left_eye": [row[6], row[7]],
+                "nose_tip": [row[8], row[9]],
+                "mouth_center": [(row[10] + row[12]) / 2, (row[11] + row[13]) / 2],
+            }
+            for row in faces.tolist()
+        ]
+        return faces[:, :4].astype(np.int64), faces[:, 14].astype(np.float64), keypoints
+
+
+class Res10Engine(FaceEngine):
+    name = "res10"
+    INPUT_SIZE = (300, 300)
+    MEAN = (104.0, 177.0, 123.0)
+
+    def __init__(self, calibration: list | None = None, prototxt: str = RES10_PROTOTXT, model_path: str = RES10_MODEL):
+        super().__init__(calibration)
+        if not (os.path.exists(prototxt) and os.path.exists(model_path)):
+            raise RuntimeError(f"res10 SSD files not found ({prototxt}, {model_path})")
+        self.net = cv2.dnn.readNetFromCaffe(prototxt, model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def detect_raw(self, ctx: FrameContext) -> tuple[np.ndarray, np.ndarray, list]:
+        blob = cv2.dnn.blobFromImage(
+            cv2.resize(ctx.bgr, self.INPUT_SIZE, interpolation=cv2.INTER_AREA), 1.0, self.INPUT_SIZE, self.MEAN
+        )
+        self.net.setInput(blob)
+        # Shape (1, 1, N, 7): image id, label, score, x1, y1, x2, y2 (relative).
+        detections = self.net.forward()[0, 0]
+        detections = detections[detections[:, 2] >= 0.05]
+        corners = np.clip(detections[:, 3:7], 0.0, 1.0) * [ctx.width, ctx.height, ctx.width, ctx.height]
+        boxes = np.column_stack([corners[:, :2], corners[:, 2:] - corners[:, :2]]).astype(np.int64)
+        return boxes.reshape(-1, 4), detections[:, 2].astype(np.float64), [None] * len(detections)
+
+
+ENGINES = {
+    engine.name: engine for engine in (MediaPipeEngine, HaarEngine, YuNetEngine, Res10Engine)
+}
+
+
+def build_engine(name: str = ENGINE_NAME) -> FaceEngine | None:
+    """The configured engine, or ``None`` for the staged ``cascade`` pipeline."""
+    if name == "cascade":
+        return None
+    if name not in ENGINES:
+        raise ValueError(f"Unknown proctoring engine: {name}")
+    return ENGINES[name]()
+
+
+def analyse_frame_with_engine(ctx: FrameContext, engine: FaceEngine) -> tuple[dict, list]:
+    """Single-engine counterpart of face_detection.analyse_frame, same response schema."""
+    quality = analyze_frame_quality(ctx)
+    stages = ["quality"]
+    early_exit = None
+    boxes = []
+    confidences = []
+    keypoints = []
+
+    if quality["brightness"] < BLACK_FRAME_THRESHOLD:
+        early_exit = "black_frame"
+    else:
+        boxes, confidences, keypoints = engine.detect(ctx)
+        stages.append(engine.name)
+
+    face_count = len(boxes)
+    if face_count >= 2:
+        status = "multiple_faces"
+    elif face_count == 0:
+        status = "no_face"
+    else:
+        status = "single_face"
+
+    result = {
+        "face_count": face_count,
+        "status": status,
+        "multiple_faces": status == "multiple_faces",
+        "engine": engine.name,
+        "quality": quality,
+        "gaze": estimate_gaze(keypoints[0] if face_count == 1 else None),
+        "debug": {
+            "lenient_count": face_count,
+            "strict_count": face_count,
+            "stages": stages,
+            "early_exit": early_exit,
+            "analysis_size": [ctx.width, ctx.height],
+            "confidences": confidences,
+        },
+    }
+    return result, boxes
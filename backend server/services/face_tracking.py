@@ -0,0 +1,146 @@
+import os
+
+import numpy as np
+
+from services.face_detection import (
+    BLACK_FRAME_THRESHOLD,
+    MIN_FACE_AREA_RATIO_LENIENT,
+    FaceDetectors,
+    FrameContext,
+    analyse_frame,
+    analyze_frame_quality,
+    mediapipe_keypoints,
+)
+from services.face_engines import analyse_frame_with_engine
+from services.head_pose import estimate_gaze
+
+# A full-frame detection runs at least once every FULL_DETECT_EVERY frames so a
+# second person entering outside the tracked region is still caught.
+FULL_DETECT_EVERY = max(1, int(os.getenv("PROCTORING_FULL_DETECT_EVERY", "5")))
+# Search region around the previous box, as a fraction of the box size per side.
+ROI_MARGIN = float(os.getenv("PROCTORING_TRACK_MARGIN", "0.6"))
+ROI_MIN_CONFIDENCE = 0.5
+TRACKING_ENABLED = os.getenv("PROCTORING_TRACKING", "1").strip().lower() not in ("0", "false", "no")
+
+
+def _search_region(box: list, width: int, height: int) -> tuple[int, int, int, int]:
+    x, y, w, h = box
+    pad_x = int(w * ROI_MARGIN)
+    pad_y = int(h * ROI_MARGIN)
+    return (
+        max(0, x - pad_x),
+        max(0, y - pad_y),
+        min(width, x + w + pad_x),
+        min(height, y + h + pad_y),
+    )
+
+
+def _roi_mediapipe_boxes(ctx: FrameContext, detector, region: tuple[int, int, int, int]) -> tuple[list, list]:
+    x0, y0, x1, y1 = region
+    crop = np.ascontiguousarray(ctx.rgb[y0:y1, x0:x1])
+    results = detector.process(crop)
+    detections = results.detections if results and results.detections else []
+
+    boxes = []
+    keypoints = []
+    crop_w, crop_h = x1 - x0, y1 - y0
+    for detection in detections:
+        score_list = detection.score or []
+        if not score_list or float(score_list[0]) < ROI_MIN_CONFIDENCE:
+            continue
+        bbox = detection.location_data.relative_bounding_box
+        box = [
+            x0 + int(bbox.xmin * crop_w),
+            y0 + int(bbox.ymin * crop_h),
+            int(bbox.width * crop_w),
+            int(bbox.height * crop_h),
+        ]
+        if float(box[2] * box[3]) / ctx.area >= MIN_FACE_AREA_RATIO_LENIENT:
+            boxes.append(box)
+            keypoints.append(mediapipe_keypoints(detection, crop_w, crop_h, offset=(x0, y0)))
+    return boxes, keypoints
+
+
+def track_face(ctx: FrameContext, detectors: FaceDetectors, track: dict | None) -> tuple[dict, list] | None:
+    """Re-find the tracked face inside a region around its previous box.
+
+    Returns ``None`` whenever a full-frame detection is needed instead: no
+    track yet, the periodic refresh is due, the analysis size changed, the
+    frame is black, or the region does not contain exactly one face.
+    """
+    engine = detectors.engine
+    detector = detectors.face_detector_roi
+    if not TRACKING_ENABLED or not track or (engine is None and detector is None):
+        return None
+    if list(track.get("size") or []) != [ctx.width, ctx.height]:
+        return None
+
+    frames_since_full = int(track.get("frames_since_full", 0))
+    if frames_since_full + 1 >= FULL_DETECT_EVERY:
+        return None
+
+    quality = analyze_frame_quality(ctx)
+    if quality["brightness"] < BLACK_FRAME_THRESHOLD:
+        return None
+
+    x0, y0, x1, y1 = _search_region(track["box"], ctx.width, ctx.height)
+    if x1 - x0 < 16 or y1 - y0 < 16:
+        return None
+
+    if engine is not None:
+        crop = FrameContext(np.ascontiguousarray(ctx.bgr[y0:y1, x0:x1]))
+        crop_boxes, _, crop_keypoints = engine.detect(crop, ROI_MIN_CONFIDENCE, 0.0)
+        boxes = []
+        keypoints = []
+        for (x, y, w, h), points in zip(crop_boxes, crop_keypoints):
+            if float(w * h) / ctx.area >= MIN_FACE_AREA_RATIO_LENIENT:
+                boxes.append([x0 + x, y0 + y, w, h])
+                keypoints.append({name: [px + x0, py + y0] for name, (px, py) in (points or {}).items()})
+    else:
+        boxes, keypoints = _roi_mediapipe_boxes(ctx, detector, (x0, y0, x1, y1))
+
+    if len(boxes) != 1:
+        return None
+
+    result = {
+        "face_count": 1,
+        "status": "single_face",
+        "multiple_faces": False,
+        "engine": engine.name if engine is not None else "mediapipe",
+        "quality": quality,
+        "gaze": estimate_gaze(keypoints[0]),
+        "debug": {
+            "lenient_count": 1,
+            "strict_count": 1,
+            "stages": ["quality", "roi_track"],
+            "early_exit": "tracked",
+            "analysis_size": [ctx.width, ctx.height],
+            "tracking": {"mode": "roi", "frames_since_full": frames_since_full + 1},
+        },
+    }
+    return result, boxes
+
+
+def analyse_with_tracking(ctx: FrameContext, detectors: FaceDetectors, track: dict | None) -> tuple[dict, list]:
+    tracked = track_face(ctx, detectors, track)
+    if tracked is not None:
+        return tracked
+
+    if detectors.engine is not None:
+        result, boxes = analyse_frame_with_engine(ctx, detectors.engine)
+    else:
+        result, boxes = analyse_frame(ctx, detectors)
+    result["debug"]["tracking"] = {"mode": "full", "frames_since_full": 0}
+    return result, boxes
+
+
+def next_track(result: dict, boxes: list) -> dict | None:
+    """Tracker state to keep after a verdict; only a single face is tracked."""
+    if result.get("status") != "single_face" or len(boxes) != 1:
+        return None
+    debug = result.get("debug") or {}
+    return {
+        "box": boxes[0],
+        "size": debug.get("analysis_size"),
+        "frames_since_full": (debug.get("tracking") or {}).get("frames_since_full", 0),
+    }
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from services.face_detection import MAX_FRAME_BYTES
+
+# A frame whose difference hash is within this many bits (of 64) of the last
+# analysed frame reuses that frame's verdict.
+HASH_DISTANCE_THRESHOLD = int(os.getenv("PROCTORING_PHASH_THRESHOLD", "4"))
+# A verdict is reused for at most this many seconds after the frame it came
+# from was analysed, or this many consecutive times, whichever comes first,
+# so a slowly drifting scene cannot hold on to a stale verdict. The age bound
+# matters when the check cadence slows down and hits arrive seconds apart.
+MAX_VERDICT_AGE_SECONDS = float(os.getenv("PROCTORING_PHASH_MAX_AGE_SECONDS", "10"))
+MAX_CONSECUTIVE_HITS = int(os.getenv("PROCTORING_PHASH_MAX_HITS", "10"))
+CACHE_TTL_SECONDS = 30
+FRAME_CACHE_ENABLED = os.getenv("PROCTORING_PHASH_CACHE", "1").strip().lower() not in ("0", "false", "no")
+
+
+def frame_hash(raw_bytes) -> int | None:
+    """64-bit difference hash of an encoded frame, or ``None`` if it cannot be decoded.
+
+    JPEG decoding at 1/8 scale only runs the DC part of the IDCT, so this
+    costs about a millisecond for a 640x480 frame.
+    """
+    if not raw_bytes or len(raw_bytes) > MAX_FRAME_BYTES:
+        return None
+    thumb = cv2.imdecode(np.frombuffer(raw_bytes, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if thumb is None:
+        return None
+    small = cv2.resize(thumb, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def hash_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class FrameCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "refresh":
+                self.refreshes += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hits, misses, refreshes = self.hits, self.misses, self.refreshes
+        lookups = hits + misses + refreshes
+        return {
+            "enabled": FRAME_CACHE_ENABLED,
+            "hits": hits,
+            "misses": misses,
+            "refreshes": refreshes,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+frame_cache_stats = FrameCacheStats()
+
+
+def cached_verdict(entry: dict | None, frame_hash_value: int | None) -> dict | None:
+    """The verdict to reuse for this frame, or ``None`` if it must be analysed.
+
+    ``entry`` is the per-user cache record written by :func:`cache_entry`.
+    Returns a copy of the stored verdict marked ``cached: true``.
+    """
+    if not FRAME_CACHE_ENABLED or frame_hash_value is None:
+        return None
+    if not entry or entry.get("hash") is None:
+        frame_cache_stats.record("miss")
+        return None
+
+    distance = hash_distance(int(entry["hash"]), frame_hash_value)
+    if distance > HASH_DISTANCE_THRESHOLD:
+        frame_cache_stats.record("miss")
+        return None
+    hits = int(entry.get("hits", 0))
+    age = time.time() - float(entry.get("analysed_at") or 0)
+    if hits >= MAX_CONSECUTIVE_HITS or age > MAX_VERDICT_AGE_SECONDS:
+        frame_cache_stats.record("refresh")
+        return None
+
+    frame_cache_stats.record("hit")
+    entry["hits"] = hits + 1
+    result = dict(entry["result"])
+    result["cached"] = True
+    result["debug"] = dict(
+        result.get("debug") or {}, cache={"distance": distance, "hits": hits + 1, "age_seconds": round(age, 1)}
+    )
+    return result
+
+
+def cache_entry(frame_hash_value: int | None, result: dict) -> dict | None:
+    if frame_hash_value is None:
+        return None
+    return {"hash": frame_hash_value, "result": result, "hits": 0, "analysed_at": time.time()}
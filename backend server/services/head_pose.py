@@ -0,0 +1,63 @@
+import os
+
+# Nose offset from the eye midpoint, as a fraction of the eye distance, past
+# which the head counts as turned sideways.
+GAZE_YAW_LIMIT = float(os.getenv("PROCTORING_GAZE_YAW_LIMIT", "0.35"))
+# Nose height between the eye line (0) and the mouth (1); outside this range
+# the head counts as tilted up or down.
+GAZE_PITCH_MIN = float(os.getenv("PROCTORING_GAZE_PITCH_MIN", "0.25"))
+GAZE_PITCH_MAX = float(os.getenv("PROCTORING_GAZE_PITCH_MAX", "0.85"))
+# Per-frame budget for the gaze signal on top of detection. It only reads the
+# keypoints the detector already returned, and test/bench_proctoring.py fails
+# when its p95 exceeds this.
+GAZE_BUDGET_MS = 0.5
+
+REQUIRED_KEYPOINTS = ("right_eye", "left_eye", "nose_tip", "mouth_center")
+
+
+def _unknown() -> dict:
+    return {"direction": "unknown", "looking_away": False, "yaw": None, "pitch": None}
+
+
+def estimate_gaze(keypoints: dict | None) -> dict:
+    """Coarse head orientation from face-detection keypoints.
+
+    ``keypoints`` maps names to pixel ``[x, y]``. ``direction`` is one of
+    center/left/right/up/down/unknown; left and right are as seen in the
+    (unmirrored) camera image.
+    """
+    if not keypoints or any(name not in keypoints for name in REQUIRED_KEYPOINTS):
+        return _unknown()
+
+    right_eye = keypoints["right_eye"]
+    left_eye = keypoints["left_eye"]
+    nose = keypoints["nose_tip"]
+    mouth = keypoints["mouth_center"]
+
+    eye_mid_x = (right_eye[0] + left_eye[0]) / 2
+    eye_mid_y = (right_eye[1] + left_eye[1]) / 2
+    eye_distance = ((right_eye[0] - left_eye[0]) ** 2 + (right_eye[1] - left_eye[1]) ** 2) ** 0.5
+    face_height = mouth[1] - eye_mid_y
+    if eye_distance < 1 or face_height < 1:
+        return _unknown()
+
+    yaw = (nose[0] - eye_mid_x) / eye_distance
+    pitch = (nose[1] - eye_mid_y) / face_height
+
+    if yaw > GAZE_YAW_LIMIT:
+        direction = "right"
+    elif yaw < -GAZE_YAW_LIMIT:
+        direction = "left"
+    elif pitch < GAZE_PITCH_MIN:
+        direction = "up"
+    elif pitch > GAZE_PITCH_MAX:
+        direction = "down"
+    else:
+        direction = "center"
+
+    return {
+        "direction": direction,
+        "looking_away": direction != "center",
+        "yaw": round(yaw, 3),
+        "pitch": round(pitch, 3),
+    }
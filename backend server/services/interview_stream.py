@@ -0,0 +1,180 @@
+"""Server-sent events for one interview turn.
+
+The ``/answer/stream`` endpoints of the interview rounds run the same graph
+as ``/answer`` but stream it, so the next question shows up token by token
+instead of after the whole model call. Events, in order:
+
+- ``status`` ``{"stage": "evaluating"}`` as soon as the answer is accepted;
+  later ``"reset"`` (discard the question preview, a new one follows) and
+  ``"saving"``.
+- ``token`` ``{"text": ...}`` for every new piece of the question text.
+- ``done`` with exactly the body ``/answer`` would have returned, sent after
+  the state is persisted. Its ``question`` is authoritative; the streamed
+  preview may differ in whitespace.
+- ``error`` ``{"status_code": ..., "detail": ...}`` instead of ``done``, with
+  ``retry_after`` (seconds) when the model service was too busy (503); 504
+  when the turn ran out of its time budget (``services.llm_calls``).
+
+The turn runs in its own task and feeds the response through a queue, so a
+client that disconnects mid-stream only stops receiving events: the turn is
+still evaluated and persisted, exactly as with ``/answer``.
+"""
+import asyncio
+import json
+import re
+from typing import AsyncIterator, Awaitable, Callable
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from services.llm_calls import turn_budget
+
+QUESTION_NODE = "generate_question"
+_QUESTION_FIELD = re.compile(r'"next_question"\s*:\s*"')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+# create_task keeps only a weak reference to its task.
+_TURNS: set[asyncio.Task] = set()
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _partial_json_string(text: str) -> str:
+    """Decode the complete prefix of a JSON string body that may still be arriving."""
+    out = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            break
+        if char != "\\":
+            out.append(char)
+            i += 1
+            continue
+        if i + 1 >= len(text):
+            break
+        code = text[i + 1]
+        if code == "u":
+            if i + 6 > len(text):
+                break
+            try:
+                out.append(chr(int(text[i + 2:i + 6], 16)))
+            except ValueError:
+                break
+            i += 6
+        else:
+            out.append(_ESCAPES.get(code, code))
+            i += 2
+    return "".join(out)
+
+
+class QuestionPreview:
+    """Visible question text of one streamed model reply.
+
+    Plain replies are shown as they are. Structured replies arrive as JSON;
+    only the ``next_question`` value is shown, decoded as far as it has
+    arrived.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.sent = 0
+
+    def _visible(self) -> str:
+        stripped = self.raw.lstrip()
+        if not stripped.startswith(("{", "`")):
+            text = self.raw
+        else:
+            match = _QUESTION_FIELD.search(self.raw)
+            text = _partial_json_string(self.raw[match.end():]) if match else ""
+        # The rounds keep only the first question (_single_question_text).
+        return text[:text.index("?") + 1] if "?" in text else text
+
+    def feed(self, text: str) -> str:
+        """Add a chunk and return the newly visible text."""
+        self.raw += text
+        visible = self._visible()
+        delta = visible[self.sent:]
+        self.sent = len(visible)
+        return delta
+
+
+def _chunk_text(chunk) -> str:
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content or []
+    )
+
+
+async def _run_turn(
+    graph,
+    state: dict,
+    finish: Callable[[dict], Awaitable[dict]],
+    events: asyncio.Queue,
+) -> None:
+    """Run the graph and ``finish``, putting SSE events on ``events`` and ``None`` last."""
+    preview = None
+    message_id = None
+    final_state = state
+    try:
+        with turn_budget():
+            async for mode, payload in graph.astream(state, stream_mode=["messages", "values"]):
+                if mode == "messages":
+                    chunk, metadata = payload
+                    if metadata.get("langgraph_node") != QUESTION_NODE:
+                        continue
+                    if preview is None or chunk.id != message_id:
+                        if preview is not None and preview.sent:
+                            events.put_nowait(sse_event("status", {"stage": "reset"}))
+                        preview = QuestionPreview()
+                        message_id = chunk.id
+                    delta = preview.feed(_chunk_text(chunk))
+                    if delta:
+                        events.put_nowait(sse_event("token", {"text": delta}))
+                elif mode == "values":
+                    final_state = payload
+
+        events.put_nowait(sse_event("status", {"stage": "saving"}))
+        events.put_nowait(sse_event("done", await finish(final_state)))
+    except HTTPException as exc:
+        error = {"status_code": exc.status_code, "detail": exc.detail}
+        if exc.headers and "Retry-After" in exc.headers:
+            error["retry_after"] = int(exc.headers["Retry-After"])
+        events.put_nowait(sse_event("error", error))
+    except Exception as exc:
+        events.put_nowait(sse_event("error", {"status_code": 500, "detail": str(exc)}))
+    finally:
+        events.put_nowait(None)
+
+
+async def stream_interview_turn(
+    graph,
+    state: dict,
+    finish: Callable[[dict], Awaitable[dict]],
+) -> AsyncIterator[str]:
+    """Run one graph turn and yield it as SSE; ``finish`` persists the final
+    state and returns the ``/answer`` response body.
+
+    Starlette cancels this generator when the client goes away; the turn task
+    is not tied to it and runs to the end regardless.
+    """
+    yield sse_event("status", {"stage": "evaluating"})
+    events: asyncio.Queue = asyncio.Queue()
+    task = asyncio.get_running_loop().create_task(_run_turn(graph, state, finish, events))
+    _TURNS.add(task)
+    task.add_done_callback(_TURNS.discard)
+    while (event := await events.get()) is not None:
+        yield event
+
+
+def event_stream_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Keep proxies (nginx) from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
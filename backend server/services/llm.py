@@ -0,0 +1,88 @@
+import os
+from functools import lru_cache
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Kinds of LLM work and the model tier each one gets. Every setting can be
+# overridden per task from the environment, e.g. LLM_QUESTION_GENERATION_MODEL,
+# LLM_EVALUATION_TEMPERATURE or LLM_FINAL_ANALYSIS_MAX_OUTPUT_TOKENS
+# (temperature "default" keeps the client library's default). The defaults
+# reproduce what each call site used before tiers existed.
+QUESTION_GENERATION = "question_generation"
+EVALUATION = "evaluation"
+FINAL_ANALYSIS = "final_analysis"
+RESUME_PARSING = "resume_parsing"
+DOMAIN_SWITCH = "domain_switch"
+CODE_REVIEW = "code_review"
+
+TASK_TIERS = {
+    # One-line opening or follow-up questions.
+    QUESTION_GENERATION: {"model": DEFAULT_MODEL, "temperature": 1.0, "max_output_tokens": None},
+    # Per-turn structured evaluation that also picks the next question.
+    EVALUATION: {"model": DEFAULT_MODEL, "temperature": 1.0, "max_output_tokens": None},
+    FINAL_ANALYSIS: {"model": DEFAULT_MODEL, "temperature": 1.0, "max_output_tokens": None},
+    RESUME_PARSING: {"model": DEFAULT_MODEL, "temperature": 0.1, "max_output_tokens": None},
+    DOMAIN_SWITCH: {"model": DEFAULT_MODEL, "temperature": 0.2, "max_output_tokens": None},
+    CODE_REVIEW: {"model": DEFAULT_MODEL, "temperature": None, "max_output_tokens": None},
+}
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(temperature: float | None = 1.0, model: str = DEFAULT_MODEL, max_output_tokens: int | None = None):
+    """Shared Gemini chat client for one model and temperature, built on first use.
+
+    ``temperature=None`` keeps the client library's default. The instance is
+    long-lived, so its HTTP connections are reused across requests.
+
+    LangChain is imported here rather than at module level: importing it takes
+    over a second, and a worker that only serves auth or proctoring routes
+    should not pay for it.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    options = {} if temperature is None else {"temperature": temperature}
+    if max_output_tokens is not None:
+        options["max_output_tokens"] = max_output_tokens
+    return ChatGoogleGenerativeAI(model=model, api_key=os.getenv("RESUME_API"), **options)
+
+
+@lru_cache(maxsize=None)
+def get_structured_model(
+    schema,
+    temperature: float | None = 1.0,
+    model: str = DEFAULT_MODEL,
+    max_output_tokens: int | None = None,
+):
+    """``get_chat_model(...).with_structured_output(schema)``, cached per schema."""
+    return get_chat_model(temperature, model, max_output_tokens).with_structured_output(schema)
+
+
+@lru_cache(maxsize=None)
+def task_tier(task: str) -> dict:
+    """Model, temperature and output-token cap for a task, with env overrides."""
+    if task not in TASK_TIERS:
+        raise ValueError(f"Unknown LLM task: {task}")
+    tier = dict(TASK_TIERS[task])
+    prefix = f"LLM_{task.upper()}_"
+
+    model = os.getenv(prefix + "MODEL")
+    if model:
+        tier["model"] = model
+    temperature = os.getenv(prefix + "TEMPERATURE")
+    if temperature:
+        tier["temperature"] = None if temperature == "default" else float(temperature)
+    max_output_tokens = os.getenv(prefix + "MAX_OUTPUT_TOKENS")
+    if max_output_tokens:
+        tier["max_output_tokens"] = int(max_output_tokens) or None
+    return tier
+
+
+def get_task_model(task: str):
+    """Chat client for a task; tasks with the same tier share one client."""
+    tier = task_tier(task)
+    return get_chat_model(tier["temperature"], tier["model"], tier["max_output_tokens"])
+
+
+def get_task_structured_model(task: str, schema):
+    tier = task_tier(task)
+    return get_structured_model(schema, tier["temperature"], tier["model"], tier["max_output_tokens"])
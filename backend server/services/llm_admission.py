@@ -0,0 +1,344 @@
+"""Admission control for Gemini calls, shared by all workers through Redis.
+
+At most ``LLM_MAX_CONCURRENCY`` model calls run at once across the
+deployment. Every call holds a slot for its duration (``services.llm_calls``
+takes it for each attempt)::
+
+    async with llm_slot(INTERVIEW):
+        response = await model.ainvoke(prompt)
+
+Callers wait in one queue ordered by priority class, then arrival:
+
+- ``interview``: live interview turns (a candidate is waiting on the page);
+- ``analysis``: final round analyses, computed in the background;
+- ``resume``: resume parsing;
+- ``report``: domain-switch reports and speculative work (round prefetch).
+
+Lower classes may only fill part of the pool (``CLASS_CAPACITY``), so a burst
+of uploads or reports always leaves headroom for interviews. A caller whose
+admission deadline passes, or who clearly cannot be admitted before it (too
+deep in the queue, or the expected wait is longer than the time left), gets
+503 with ``Retry-After`` immediately instead of piling up.
+
+State lives in three sorted sets: running leases (scored by expiry, so a
+crashed worker's slots free themselves), the wait queue and the waiters'
+expiries. One Lua script takes a slot atomically. When Redis is unreachable
+the same policy runs per process.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from fastapi import HTTPException
+
+from services.redis import async_redis_client, redis_client
+
+ADMISSION_ENABLED = os.getenv("LLM_ADMISSION", "1").strip().lower() not in ("0", "false", "no")
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "200"))
+# A lease outlives any sane model call; it only matters when a worker dies.
+LEASE_SECONDS = 180
+
+INTERVIEW = "interview"
+ANALYSIS = "analysis"
+RESUME = "resume"
+REPORT = "report"
+
+PRIORITY_CLASSES = [INTERVIEW, ANALYSIS, RESUME, REPORT]
+# Share of the pool a class may occupy.
+CLASS_CAPACITY = {INTERVIEW: 1.0, ANALYSIS: 0.75, RESUME: 0.6, REPORT: 0.4}
+# How long a class may wait for a slot, in seconds.
+DEFAULT_DEADLINES = {
+    INTERVIEW: float(os.getenv("LLM_DEADLINE_INTERVIEW", "8")),
+    ANALYSIS: float(os.getenv("LLM_DEADLINE_ANALYSIS", "60")),
+    RESUME: float(os.getenv("LLM_DEADLINE_RESUME", "10")),
+    REPORT: float(os.getenv("LLM_DEADLINE_REPORT", "5")),
+}
+
+_LEASES_KEY = "llm:admission:leases"
+_QUEUE_KEY = "llm:admission:queue"
+_WAITERS_KEY = "llm:admission:waiters"
+
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+for _, stale in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)) do
+    redis.call('ZREM', KEYS[2], stale)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+redis.call('ZADD', KEYS[2], 'NX', ARGV[3], ARGV[2])
+redis.call('ZADD', KEYS[3], ARGV[4], ARGV[2])
+local active = redis.call('ZCARD', KEYS[1])
+local rank = redis.call('ZRANK', KEYS[2], ARGV[2])
+if active < tonumber(ARGV[5]) and rank < tonumber(ARGV[6]) - active then
+    redis.call('ZREM', KEYS[2], ARGV[2])
+    redis.call('ZREM', KEYS[3], ARGV[2])
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[7]), ARGV[2])
+    return {1, rank, active + 1}
+end
+return {0, rank, active}
+"""
+
+_priority_override: ContextVar[str | None] = ContextVar("llm_priority_override", default=None)
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """Run every ``llm_slot`` inside this block at ``priority`` instead."""
+    token = _priority_override.set(priority)
+    try:
+        yield
+    finally:
+        _priority_override.reset(token)
+
+
+def admission_deadline(priority: str, budget_s: float) -> float:
+    """How long a call may wait for a slot when ``budget_s`` is all it has left."""
+    return min(DEFAULT_DEADLINES[_priority_override.get() or priority], budget_s)
+
+
+class _LocalAdmission:
+    """The Lua script's bookkeeping, for when Redis is unreachable."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.leases: dict[str, float] = {}
+        self.queue: dict[str, float] = {}
+        self.waiters: dict[str, float] = {}
+
+    def try_acquire(self, now_ms, ticket, score, waiter_expiry_ms, capacity, limit, lease_ms):
+        with self._lock:
+            self.leases = {t: exp for t, exp in self.leases.items() if exp > now_ms}
+            for stale in [t for t, exp in self.waiters.items() if exp <= now_ms]:
+                self.waiters.pop(stale)
+                self.queue.pop(stale, None)
+            self.queue.setdefault(ticket, score)
+            self.waiters[ticket] = waiter_expiry_ms
+            active = len(self.leases)
+            rank = sorted(self.queue, key=lambda t: (self.queue[t], t)).index(ticket)
+            if active < capacity and rank < limit - active:
+                self.queue.pop(ticket)
+                self.waiters.pop(ticket)
+                self.leases[ticket] = now_ms + lease_ms
+                return [1, rank, active + 1]
+            return [0, rank, active]
+
+    def forget(self, ticket: str) -> None:
+        with self._lock:
+            self.leases.pop(ticket, None)
+            self.queue.pop(ticket, None)
+            self.waiters.pop(ticket, None)
+
+    def sizes(self) -> tuple[int, int]:
+        with self._lock:
+            return len(self.leases), len(self.queue)
+
+
+_local = _LocalAdmission()
+
+
+class AdmissionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.classes = {
+            name: {"admitted": 0, "rejected": 0, "wait_s_total": 0.0, "wait_s_max": 0.0}
+            for name in PRIORITY_CLASSES
+        }
+        # Moving average of how long a slot is held, for wait estimates.
+        self.hold_s = 0.0
+
+    def admitted(self, priority: str, waited: float) -> None:
+        with self._lock:
+            entry = self.classes[priority]
+            entry["admitted"] += 1
+            entry["wait_s_total"] += waited
+            entry["wait_s_max"] = max(entry["wait_s_max"], waited)
+
+    def rejected(self, priority: str) -> None:
+        with self._lock:
+            self.classes[priority]["rejected"] += 1
+
+    def held(self, seconds: float) -> None:
+        with self._lock:
+            self.hold_s = seconds if not self.hold_s else 0.9 * self.hold_s + 0.1 * seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            classes = {
+                name: {
+                    "admitted": entry["admitted"],
+                    "rejected": entry["rejected"],
+                    "wait_s_mean": round(entry["wait_s_total"] / entry["admitted"], 3) if entry["admitted"] else None,
+                    "wait_s_max": round(entry["wait_s_max"], 3),
+                }
+                for name, entry in self.classes.items()
+            }
+            hold_s = round(self.hold_s, 3)
+        try:
+            running = redis_client.zcard(_LEASES_KEY)
+            queued = redis_client.zcard(_QUEUE_KEY)
+        except Exception:
+            running, queued = _local.sizes()
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "max_concurrency": MAX_CONCURRENCY,
+            "running": running,
+            "queue_depth": queued,
+            "hold_s_avg": hold_s,
+            "classes": classes,
+        }
+
+
+admission_stats = AdmissionStats()
+
+
+class _Attempt:
+    """One caller's place in the queue."""
+
+    def __init__(self, priority: str, deadline_s: float | None):
+        self.priority = _priority_override.get() or priority
+        if self.priority not in CLASS_CAPACITY:
+            raise ValueError(f"Unknown priority class: {self.priority}")
+        self.ticket = uuid.uuid4().hex
+        self.started = time.monotonic()
+        self.deadline = self.started + (DEFAULT_DEADLINES[self.priority] if deadline_s is None else deadline_s)
+        self.capacity = max(1, math.floor(MAX_CONCURRENCY * CLASS_CAPACITY[self.priority]))
+        self.score = PRIORITY_CLASSES.index(self.priority) * 10**13 + int(time.time() * 1000)
+        self.local = False
+        self.polls = 0
+        self.admitted_at = self.started
+
+    def args(self) -> list:
+        now_ms = int(time.time() * 1000)
+        waiter_expiry_ms = now_ms + int((self.deadline - time.monotonic()) * 1000) + 1000
+        return [now_ms, self.ticket, self.score, waiter_expiry_ms, self.capacity, MAX_CONCURRENCY, LEASE_SECONDS * 1000]
+
+    def check(self, result) -> bool:
+        """``True`` once admitted; raises 503 when the deadline cannot be met."""
+        admitted, rank, _ = (int(value) for value in result)
+        if admitted:
+            self.admitted_at = time.monotonic()
+            admission_stats.admitted(self.priority, self.admitted_at - self.started)
+            return True
+
+        remaining = self.deadline - time.monotonic()
+        hold_s = admission_stats.hold_s
+        # Slots free up about every hold_s / MAX_CONCURRENCY seconds.
+        expected_wait = hold_s * (rank + 1) / MAX_CONCURRENCY
+        if remaining <= 0 or rank >= MAX_QUEUE or expected_wait > remaining:
+            admission_stats.rejected(self.priority)
+            retry_after = max(1, math.ceil(expected_wait or hold_s or 1))
+            raise HTTPException(
+                status_code=503,
+                detail="The AI service is busy. Please retry shortly.",
+                headers={"Retry-After": str(retry_after)},
+            )
+        return False
+
+    def next_poll(self) -> float:
+        self.polls += 1
+        return min(0.05 * self.polls, 0.25, max(0.0, self.deadline - time.monotonic()))
+
+    def forget(self) -> None:
+        _local.forget(self.ticket)
+        if not self.local:
+            try:
+                redis_client.pipeline().zrem(_QUEUE_KEY, self.ticket).zrem(_WAITERS_KEY, self.ticket).zrem(
+                    _LEASES_KEY, self.ticket
+                ).execute()
+            except Exception:
+                pass
+
+    async def forget_async(self) -> None:
+        _local.forget(self.ticket)
+        if not self.local:
+            try:
+                await async_redis_client.pipeline().zrem(_QUEUE_KEY, self.ticket).zrem(
+                    _WAITERS_KEY, self.ticket
+                ).zrem(_LEASES_KEY, self.ticket).execute()
+            except Exception:
+                pass
+
+    def held(self) -> None:
+        admission_stats.held(time.monotonic() - self.admitted_at)
+
+
+_KEYS = [_LEASES_KEY, _QUEUE_KEY, _WAITERS_KEY]
+# After a Redis error, stay on the local policy for a while instead of paying
+# a connection timeout on every poll.
+REDIS_RETRY_SECONDS = 30
+_redis_down_until = 0.0
+
+
+def _redis_failed() -> None:
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+async def _try_async(attempt: _Attempt):
+    if not attempt.local and time.monotonic() >= _redis_down_until:
+        try:
+            return await async_redis_client.eval(_ACQUIRE_SCRIPT, len(_KEYS), *_KEYS, *attempt.args())
+        except Exception:
+            _redis_failed()
+    attempt.local = True
+    return _local.try_acquire(*attempt.args())
+
+
+def _try_sync(attempt: _Attempt):
+    if not attempt.local and time.monotonic() >= _redis_down_until:
+        try:
+            return redis_client.eval(_ACQUIRE_SCRIPT, len(_KEYS), *_KEYS, *attempt.args())
+        except Exception:
+            _redis_failed()
+    attempt.local = True
+    return _local.try_acquire(*attempt.args())
+
+
+@asynccontextmanager
+async def llm_slot(priority: str, deadline_s: float | None = None):
+    """Hold one of the global model-call slots; 503 if none frees up in time.
+
+    ``deadline_s`` is how long to wait for a slot (the class default if
+    omitted).
+    """
+    if not ADMISSION_ENABLED:
+        yield
+        return
+    attempt = _Attempt(priority, deadline_s)
+    try:
+        while not attempt.check(await _try_async(attempt)):
+            await asyncio.sleep(attempt.next_poll())
+    except BaseException:
+        await attempt.forget_async()
+        raise
+    try:
+        yield
+    finally:
+        attempt.held()
+        await attempt.forget_async()
+
+
+@contextmanager
+def llm_slot_sync(priority: str, deadline_s: float | None = None):
+    """``llm_slot`` for synchronous handlers (FastAPI runs them in a thread)."""
+    if not ADMISSION_ENABLED:
+        yield
+        return
+    attempt = _Attempt(priority, deadline_s)
+    try:
+        while not attempt.check(_try_sync(attempt)):
+            time.sleep(attempt.next_poll())
+    except BaseException:
+        attempt.forget()
+        raise
+    try:
+        yield
+    finally:
+        attempt.held()
+        attempt.forget()
@@ -0,0 +1,346 @@
+"""Timeout budgets, retries and hedging for Gemini calls.
+
+Every model call goes through ``call_llm`` (or ``call_llm_sync`` in sync
+handlers), which takes the admission slot for the task's priority class::
+
+    response = await call_llm(QUESTION_GENERATION, model, prompt)
+
+Budgets. An interview turn should answer within ``LLM_TURN_SLO`` seconds
+(default 20). ``turn_budget()`` starts that clock; calls inside it never run
+past the turn's deadline. Each attempt is further capped by its task's
+timeout (``TASK_TIMEOUTS``, shares of the SLO for the per-turn tasks;
+override with ``LLM_<TASK>_TIMEOUT``). Calls outside a turn get
+``TASK_BUDGETS`` for all their attempts. Time spent waiting for admission
+counts against the budget.
+
+Retries. Rate limits, server errors, connection errors and attempt timeouts
+are retried up to ``LLM_MAX_RETRIES`` times with full-jitter backoff while
+the budget lasts. The client library's own retries are switched off so they
+cannot overrun it. What is left when the budget runs out surfaces as 504
+(too slow) or 503 with ``Retry-After`` (model service failing) instead of a
+generic 500; other errors are raised unchanged.
+
+Hedging (``LLM_HEDGE=1``, question generation only). If the first request
+has not answered by the task's p90 latency, a second one is sent and the
+first to answer wins; the other is cancelled. The second request holds its
+own admission slot and is not streamed to the client.
+
+Outcomes and latencies per task are in ``llm_call_stats``.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import HTTPException
+
+from services.llm import (
+    CODE_REVIEW,
+    DOMAIN_SWITCH,
+    EVALUATION,
+    FINAL_ANALYSIS,
+    QUESTION_GENERATION,
+    RESUME_PARSING,
+    TASK_TIERS,
+)
+from services.llm_admission import ANALYSIS, INTERVIEW, REPORT, RESUME, admission_deadline, llm_slot, llm_slot_sync
+
+TURN_SLO_SECONDS = float(os.getenv("LLM_TURN_SLO", "20"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "0").strip().lower() in ("1", "true", "yes")
+# Hedge delay until enough latencies are recorded for a p90.
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "2"))
+HEDGE_MIN_SAMPLES = 20
+HEDGED_TASKS = {QUESTION_GENERATION}
+
+BACKOFF_BASE_SECONDS = 0.25
+BACKOFF_CAP_SECONDS = 2.0
+# Not worth starting an attempt with less time than this left.
+MIN_ATTEMPT_SECONDS = 1.0
+LATENCY_SAMPLES = 500
+
+TASK_PRIORITIES = {
+    QUESTION_GENERATION: INTERVIEW,
+    EVALUATION: INTERVIEW,
+    CODE_REVIEW: INTERVIEW,
+    FINAL_ANALYSIS: ANALYSIS,
+    RESUME_PARSING: RESUME,
+    DOMAIN_SWITCH: REPORT,
+}
+
+# One attempt, in seconds. A turn is at most an evaluation plus a short
+# question, so those two split the SLO.
+_DEFAULT_TIMEOUTS = {
+    QUESTION_GENERATION: 0.3 * TURN_SLO_SECONDS,
+    EVALUATION: 0.6 * TURN_SLO_SECONDS,
+    CODE_REVIEW: 45.0,
+    FINAL_ANALYSIS: 90.0,
+    RESUME_PARSING: 45.0,
+    DOMAIN_SWITCH: 30.0,
+}
+TASK_TIMEOUTS = {
+    task: float(os.getenv(f"LLM_{task.upper()}_TIMEOUT") or seconds)
+    for task, seconds in _DEFAULT_TIMEOUTS.items()
+}
+# All attempts of a call made outside a turn.
+TASK_BUDGETS = {
+    QUESTION_GENERATION: TURN_SLO_SECONDS,
+    EVALUATION: TURN_SLO_SECONDS,
+    CODE_REVIEW: 60.0,
+    FINAL_ANALYSIS: 150.0,
+    RESUME_PARSING: 60.0,
+    DOMAIN_SWITCH: 40.0,
+}
+
+_TRANSIENT_ERRORS = {
+    "ModelRateLimitError",
+    "ModelConnectionError",
+    "ModelTimeoutError",
+    "ServerError",
+    "ConnectError",
+    "RemoteProtocolError",
+}
+
+_turn_deadline: ContextVar[float | None] = ContextVar("llm_turn_deadline", default=None)
+
+
+@contextmanager
+def turn_budget(slo_s: float | None = None):
+    """Every ``call_llm`` inside this block finishes within the turn SLO."""
+    deadline = time.monotonic() + (TURN_SLO_SECONDS if slo_s is None else slo_s)
+    outer = _turn_deadline.get()
+    token = _turn_deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _turn_deadline.reset(token)
+
+
+def _percentile(samples: list[float], fraction: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LLMCallStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {
+            task: {"calls": 0, "ok": 0, "timeouts": 0, "errors": 0, "rejected": 0, "retries": 0, "hedged": 0, "hedge_wins": 0}
+            for task in TASK_TIERS
+        }
+        # Successful attempts (model time only) and whole calls.
+        self.attempt_s = {task: deque(maxlen=LATENCY_SAMPLES) for task in TASK_TIERS}
+        self.call_s = {task: deque(maxlen=LATENCY_SAMPLES) for task in TASK_TIERS}
+
+    def record(self, task: str, outcome: str) -> None:
+        with self._lock:
+            self.counts[task][outcome] += 1
+
+    def attempt(self, task: str, seconds: float) -> None:
+        with self._lock:
+            self.attempt_s[task].append(seconds)
+
+    def finished(self, task: str, seconds: float) -> None:
+        with self._lock:
+            self.counts[task]["ok"] += 1
+            self.call_s[task].append(seconds)
+
+    def hedge_delay(self, task: str) -> float:
+        with self._lock:
+            samples = list(self.attempt_s[task])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return _percentile(samples, 0.9)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = {task: dict(entry) for task, entry in self.counts.items()}
+            attempts = {task: list(samples) for task, samples in self.attempt_s.items()}
+            calls = {task: list(samples) for task, samples in self.call_s.items()}
+
+        def latency(samples):
+            return {
+                f"p{int(q * 100)}": round(value, 3) if (value := _percentile(samples, q)) is not None else None
+                for q in (0.5, 0.9, 0.99)
+            }
+
+        return {
+            "turn_slo_s": TURN_SLO_SECONDS,
+            "max_retries": MAX_RETRIES,
+            "hedge_enabled": HEDGE_ENABLED,
+            "tasks": {
+                task: {
+                    **counts[task],
+                    "timeout_s": TASK_TIMEOUTS[task],
+                    "budget_s": TASK_BUDGETS[task],
+                    "attempt_s": latency(attempts[task]),
+                    "call_s": latency(calls[task]),
+                }
+                for task in counts
+            },
+        }
+
+
+llm_call_stats = LLMCallStats()
+
+
+def _is_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, TimeoutError) or any("Timeout" in cls.__name__ for cls in type(exc).__mro__)
+
+
+def _is_transient(exc: BaseException) -> bool:
+    if _is_timeout(exc) or isinstance(exc, ConnectionError):
+        return True
+    if any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(exc).__mro__):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+class _Call:
+    """Budget and retry bookkeeping of one ``call_llm``."""
+
+    def __init__(self, task: str):
+        if task not in TASK_PRIORITIES:
+            raise ValueError(f"Unknown LLM task: {task}")
+        self.task = task
+        self.priority = TASK_PRIORITIES[task]
+        self.started = time.monotonic()
+        turn_deadline = _turn_deadline.get()
+        self.deadline = turn_deadline if turn_deadline is not None else self.started + TASK_BUDGETS[task]
+        self.retries = 0
+        llm_call_stats.record(task, "calls")
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def admission_wait(self) -> float:
+        return admission_deadline(self.priority, max(0.0, self.remaining()))
+
+    def attempt_timeout(self) -> float:
+        """Timeout for an attempt starting now; raises if the budget is spent."""
+        timeout = min(TASK_TIMEOUTS[self.task], self.remaining())
+        if timeout <= 0:
+            raise TimeoutError(f"{self.task} call budget exhausted")
+        return timeout
+
+    def backoff(self, exc: Exception) -> float | None:
+        """Seconds to sleep before retrying after ``exc``, or ``None`` to give up."""
+        if not _is_transient(exc) or self.retries >= MAX_RETRIES:
+            return None
+        delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2**self.retries))
+        if self.remaining() - delay < MIN_ATTEMPT_SECONDS:
+            return None
+        self.retries += 1
+        llm_call_stats.record(self.task, "retries")
+        return delay
+
+    def failed(self, exc: Exception) -> Exception:
+        """The exception to raise once ``exc`` is final."""
+        if isinstance(exc, HTTPException):
+            llm_call_stats.record(self.task, "rejected")
+            return exc
+        if _is_timeout(exc):
+            llm_call_stats.record(self.task, "timeouts")
+            return HTTPException(status_code=504, detail="The AI service took too long to respond. Please retry.")
+        llm_call_stats.record(self.task, "errors")
+        if _is_transient(exc):
+            return HTTPException(
+                status_code=503,
+                detail="The AI service is unavailable. Please retry shortly.",
+                headers={"Retry-After": str(max(1, round(BACKOFF_CAP_SECONDS)))},
+            )
+        return exc
+
+    def succeeded(self) -> None:
+        llm_call_stats.finished(self.task, time.monotonic() - self.started)
+
+
+async def _attempt(call: _Call, model, prompt):
+    async with llm_slot(call.priority, deadline_s=call.admission_wait()):
+        timeout = call.attempt_timeout()
+        started = time.monotonic()
+        # max_retries=1 is a single request in the Google SDK.
+        result = await asyncio.wait_for(model.ainvoke(prompt, timeout=timeout, max_retries=1), timeout)
+    llm_call_stats.attempt(call.task, time.monotonic() - started)
+    return result
+
+
+async def _unstreamed_attempt(call: _Call, model, prompt):
+    # Runs in its own task, so this only hides the hedge from the callbacks
+    # (LangGraph's message stream) that the primary request reports to.
+    from langchain_core.runnables.config import var_child_runnable_config
+
+    var_child_runnable_config.set(None)
+    return await _attempt(call, model, prompt)
+
+
+async def _hedged_attempt(call: _Call, model, prompt):
+    primary = asyncio.ensure_future(_attempt(call, model, prompt))
+    running = [primary]
+    try:
+        done, _ = await asyncio.wait(running, timeout=llm_call_stats.hedge_delay(call.task))
+        if done or call.remaining() < MIN_ATTEMPT_SECONDS:
+            return await primary
+
+        llm_call_stats.record(call.task, "hedged")
+        hedge = asyncio.ensure_future(_unstreamed_attempt(call, model, prompt))
+        running.append(hedge)
+        pending = set(running)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                if finished.exception() is None:
+                    if finished is hedge:
+                        llm_call_stats.record(call.task, "hedge_wins")
+                    return finished.result()
+        # Both failed; the primary's error is the one worth reporting.
+        hedge.exception()
+        return primary.result()
+    finally:
+        for task in running:
+            if not task.done():
+                task.cancel()
+
+
+async def call_llm(task: str, model, prompt):
+    """``model.ainvoke(prompt)`` under the task's admission class, budget and retries."""
+    call = _Call(task)
+    attempt = _hedged_attempt if HEDGE_ENABLED and task in HEDGED_TASKS else _attempt
+    while True:
+        try:
+            result = await attempt(call, model, prompt)
+        except Exception as exc:
+            delay = call.backoff(exc)
+            if delay is None:
+                raise call.failed(exc) from exc
+            await asyncio.sleep(delay)
+            continue
+        call.succeeded()
+        return result
+
+
+def call_llm_sync(task: str, model, prompt):
+    """``call_llm`` for synchronous handlers; no hedging."""
+    call = _Call(task)
+    while True:
+        try:
+            with llm_slot_sync(call.priority, deadline_s=call.admission_wait()):
+                timeout = call.attempt_timeout()
+                started = time.monotonic()
+                result = model.invoke(prompt, timeout=timeout, max_retries=1)
+            llm_call_stats.attempt(task, time.monotonic() - started)
+        except Exception as exc:
+            delay = call.backoff(exc)
+            if delay is None:
+                raise call.failed(exc) from exc
+            time.sleep(delay)
+            continue
+        call.succeeded()
+        return result
@@ -0,0 +1,74 @@
+import os
+import random
+
+BASE_INTERVAL_MS = int(os.getenv("PROCTORING_CHECK_INTERVAL_MS", "1800"))
+MIN_INTERVAL_MS = int(os.getenv("PROCTORING_MIN_INTERVAL_MS", "1000"))
+MAX_INTERVAL_MS = int(os.getenv("PROCTORING_MAX_INTERVAL_MS", "6000"))
+# Each consecutive clean verdict stretches the interval by STABLE_STEP of the
+# base, up to STABLE_STEPS steps.
+STABLE_STEP = 0.25
+STABLE_STEPS = 8
+# Below this share of busy workers, with nothing queued, the server counts as
+# idle and every candidate gets the base interval and the dense capture.
+IDLE_UTILISATION = 0.25
+JITTER = 0.1
+
+CAPTURE_PROFILES = {
+    "dense": {"width": 640, "height": 480, "quality": 0.8},
+    "normal": {"width": 480, "height": 360, "quality": 0.8},
+    "light": {"width": 320, "height": 240, "quality": 0.7},
+}
+
+
+def _is_clean(result: dict) -> bool:
+    quality = result.get("quality") or {}
+    gaze = result.get("gaze") or {}
+    return (
+        result.get("status") == "single_face"
+        and not quality.get("low_light")
+        and not quality.get("blurry")
+        and not gaze.get("looking_away")
+    )
+
+
+def next_cadence_state(state: dict | None, result: dict) -> dict:
+    """Fold one verdict into the per-user cadence history."""
+    streak = int((state or {}).get("clean_streak", 0))
+    return {"clean_streak": streak + 1 if _is_clean(result) else 0}
+
+
+def plan_next_check(cadence_state: dict, result: dict, pool_stats: dict) -> dict:
+    """When and how the client should capture its next frame.
+
+    An anomalous verdict (no face, several faces, low light, blur, looking
+    away) asks for the minimum interval and the dense capture. An idle
+    detector pool has capacity to spare, so clean verdicts get the base
+    interval and the dense capture too. Only under load does the interval
+    grow with the run of clean verdicts and with any backlog in the pool,
+    with smaller captures for stable candidates or while work is queued.
+    """
+    streak = int(cadence_state.get("clean_streak", 0))
+    workers = max(1, int(pool_stats.get("workers", 1)))
+    queue_depth = int(pool_stats.get("queue_depth", 0))
+    utilisation = int(pool_stats.get("in_flight", 0)) / workers
+
+    if not _is_clean(result):
+        interval = MIN_INTERVAL_MS
+        profile = "dense"
+    elif utilisation < IDLE_UTILISATION and queue_depth == 0:
+        interval = BASE_INTERVAL_MS
+        profile = "dense"
+    else:
+        stretch = STABLE_STEP * min(streak, STABLE_STEPS)
+        interval = BASE_INTERVAL_MS * (1 + stretch) * (1 + queue_depth / workers)
+        if queue_depth > 0 or streak >= STABLE_STEPS // 2:
+            profile = "light"
+        else:
+            profile = "normal"
+
+    interval *= 1 + random.uniform(-JITTER, JITTER)
+    interval = int(min(MAX_INTERVAL_MS, max(MIN_INTERVAL_MS, interval)))
+    return {
+        "next_check_after_ms": interval,
+        "capture": dict(CAPTURE_PROFILES[profile], profile=profile),
+    }
@@ -0,0 +1,267 @@
+import os
+import threading
+import time
+from collections import deque
+
+from services.redis import async_redis_client, redis_client
+from services.round_flow import ROUND_ORDER, get_flow_state, get_flow_state_async
+
+# Verdicts kept per user and round; XADD trims approximately to this length.
+STREAM_MAXLEN = int(os.getenv("PROCTORING_TIMELINE_MAXLEN", "2000"))
+TIMELINE_TTL_SECONDS = 86400
+# Gaps longer than this (tab hidden, camera paused) count only up to the cap
+# towards the time attributed to a status.
+MAX_GAP_MS = int(os.getenv("PROCTORING_TIMELINE_MAX_GAP_MS", "10000"))
+VIOLATION_STATUSES = ("no_face", "multiple_faces")
+
+# Appends one verdict to the stream and folds it into the summary hash in a
+# single round trip. The interval since the previous verdict is attributed to
+# the previous verdict's status; an "event" is a transition into a violation.
+_RECORD_SCRIPT = """
+local now = tonumber(ARGV[1])
+local status = ARGV[2]
+local faces = tonumber(ARGV[3])
+local last_ts = tonumber(redis.call('HGET', KEYS[1], 'last_ts') or '')
+local last_status = redis.call('HGET', KEYS[1], 'last_status')
+if last_ts and last_status then
+  local gap = math.min(math.max(now - last_ts, 0), tonumber(ARGV[6]))
+  redis.call('HINCRBY', KEYS[1], 'ms:' .. last_status, gap)
+  redis.call('HINCRBY', KEYS[1], 'observed_ms', gap)
+end
+if status ~= 'single_face' and status ~= last_status then
+  redis.call('HINCRBY', KEYS[1], 'events:' .. status, 1)
+end
+redis.call('HINCRBY', KEYS[1], 'frames', 1)
+redis.call('HINCRBY', KEYS[1], 'count:' .. status, 1)
+redis.call('HINCRBY', KEYS[1], 'low_light', ARGV[4])
+redis.call('HINCRBY', KEYS[1], 'blurry', ARGV[5])
+redis.call('HINCRBY', KEYS[1], 'looking_away', ARGV[11])
+local peak = tonumber(redis.call('HGET', KEYS[1], 'peak_face_count') or '0')
+if faces > peak then
+  redis.call('HSET', KEYS[1], 'peak_face_count', faces)
+end
+redis.call('HSETNX', KEYS[1], 'first_ts', now)
+redis.call('HSET', KEYS[1], 'last_ts', now, 'last_status', status)
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[8], '*',
+  'ts', now, 'status', status, 'face_count', faces,
+  'brightness', ARGV[9], 'low_light', ARGV[4], 'blurry', ARGV[5], 'engine', ARGV[10],
+  'gaze', ARGV[12])
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+redis.call('EXPIRE', KEYS[2], ARGV[7])
+return 1
+"""
+
+_record_script = redis_client.register_script(_RECORD_SCRIPT)
+_record_script_async = async_redis_client.register_script(_RECORD_SCRIPT)
+
+# Used only while Redis is unreachable, mirroring the Redis layout in-process.
+_TIMELINE_FALLBACK: dict[str, dict] = {}
+_fallback_lock = threading.Lock()
+
+
+def _summary_key(user_id: str, round_name: str) -> str:
+    return f"proctoring:{user_id}:{round_name}:summary"
+
+
+def _stream_key(user_id: str, round_name: str) -> str:
+    return f"proctoring:{user_id}:{round_name}:events"
+
+
+def _round_in_progress(state: dict) -> str | None:
+    for round_name in ROUND_ORDER:
+        if state.get(round_name) == "in_progress":
+            return round_name
+    return None
+
+
+def active_round(user_id: str) -> str | None:
+    return _round_in_progress(get_flow_state(user_id))
+
+
+async def active_round_async(user_id: str) -> str | None:
+    return _round_in_progress(await get_flow_state_async(user_id))
+
+
+def _event_fields(result: dict, ts_ms: int) -> dict:
+    quality = result.get("quality") or {}
+    gaze = result.get("gaze") or {}
+    return {
+        "ts": ts_ms,
+        "status": result["status"],
+        "face_count": int(result["face_count"]),
+        "brightness": quality.get("brightness", 0),
+        "low_light": 1 if quality.get("low_light") else 0,
+        "blurry": 1 if quality.get("blurry") else 0,
+        "engine": result.get("engine", ""),
+        "looking_away": 1 if gaze.get("looking_away") else 0,
+        "gaze": gaze.get("direction", "unknown"),
+    }
+
+
+def _script_args(event: dict) -> list:
+    return [
+        event["ts"], event["status"], event["face_count"], event["low_light"], event["blurry"],
+        MAX_GAP_MS, TIMELINE_TTL_SECONDS, STREAM_MAXLEN, event["brightness"], event["engine"],
+        event["looking_away"], event["gaze"],
+    ]
+
+
+def _events(verdicts: list[tuple[dict, int | None]]) -> list[dict]:
+    now_ms = int(time.time() * 1000)
+    return [_event_fields(result, now_ms if ts_ms is None else int(ts_ms)) for result, ts_ms in verdicts]
+
+
+def _record_fallback(user_id: str, round_name: str, event: dict) -> None:
+    key = _summary_key(user_id, round_name)
+    with _fallback_lock:
+        entry = _TIMELINE_FALLBACK.setdefault(key, {"summary": {}, "events": deque(maxlen=STREAM_MAXLEN)})
+        summary = entry["summary"]
+        status = event["status"]
+        last_ts = summary.get("last_ts")
+        last_status = summary.get("last_status")
+        if last_ts is not None and last_status:
+            gap = min(max(event["ts"] - last_ts, 0), MAX_GAP_MS)
+            summary[f"ms:{last_status}"] = summary.get(f"ms:{last_status}", 0) + gap
+            summary["observed_ms"] = summary.get("observed_ms", 0) + gap
+        if status != "single_face" and status != last_status:
+            summary[f"events:{status}"] = summary.get(f"events:{status}", 0) + 1
+        summary["frames"] = summary.get("frames", 0) + 1
+        summary[f"count:{status}"] = summary.get(f"count:{status}", 0) + 1
+        summary["low_light"] = summary.get("low_light", 0) + event["low_light"]
+        summary["blurry"] = summary.get("blurry", 0) + event["blurry"]
+        summary["looking_away"] = summary.get("looking_away", 0) + event["looking_away"]
+        summary["peak_face_count"] = max(summary.get("peak_face_count", 0), event["face_count"])
+        summary.setdefault("first_ts", event["ts"])
+        summary["last_ts"] = event["ts"]
+        summary["last_status"] = status
+        entry["events"].append(event)
+
+
+def record_verdicts(user_id: str, verdicts: list[tuple[dict, int | None]], round_name: str | None = None) -> None:
+    """Append face-check verdicts to the user's timeline for the active round.
+
+    ``verdicts`` holds ``(result, ts_ms)`` pairs in capture order; a ``None``
+    timestamp means "now". Nothing is recorded outside a round.
+    """
+    if not verdicts:
+        return
+    round_name = round_name or active_round(user_id)
+    if round_name is None:
+        return
+
+    events = _events(verdicts)
+    keys = [_summary_key(user_id, round_name), _stream_key(user_id, round_name)]
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for event in events:
+            _record_script(keys=keys, args=_script_args(event), client=pipe)
+        pipe.execute()
+    except Exception:
+        for event in events:
+            _record_fallback(user_id, round_name, event)
+
+
+async def record_verdicts_async(
+    user_id: str, verdicts: list[tuple[dict, int | None]], round_name: str | None = None
+) -> None:
+    if not verdicts:
+        return
+    round_name = round_name or await active_round_async(user_id)
+    if round_name is None:
+        return
+
+    events = _events(verdicts)
+    keys = [_summary_key(user_id, round_name), _stream_key(user_id, round_name)]
+
+    try:
+        pipe = async_redis_client.pipeline(transaction=False)
+        for event in events:
+            await _record_script_async(keys=keys, args=_script_args(event), client=pipe)
+        await pipe.execute()
+    except Exception:
+        for event in events:
+            _record_fallback(user_id, round_name, event)
+
+
+def clear_round_timeline(user_id: str, round_name: str) -> None:
+    _TIMELINE_FALLBACK.pop(_summary_key(user_id, round_name), None)
+    try:
+        redis_client.delete(_summary_key(user_id, round_name), _stream_key(user_id, round_name))
+    except Exception:
+        pass
+
+
+async def clear_round_timeline_async(user_id: str, round_name: str) -> None:
+    _TIMELINE_FALLBACK.pop(_summary_key(user_id, round_name), None)
+    try:
+        await async_redis_client.delete(_summary_key(user_id, round_name), _stream_key(user_id, round_name))
+    except Exception:
+        pass
+
+
+def _int(raw: dict, field: str) -> int:
+    try:
+        return int(raw.get(field) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _fallback_summary(user_id: str, round_name: str) -> dict:
+    entry = _TIMELINE_FALLBACK.get(_summary_key(user_id, round_name))
+    return dict(entry["summary"]) if entry else {}
+
+
+def round_summary(user_id: str, round_name: str) -> dict:
+    """Counters for one round, read from the summary hash without touching the stream."""
+    try:
+        raw = redis_client.hgetall(_summary_key(user_id, round_name))
+    except Exception:
+        raw = _fallback_summary(user_id, round_name)
+    return _summary_from_hash(round_name, raw)
+
+
+async def round_summary_async(user_id: str, round_name: str) -> dict:
+    try:
+        raw = await async_redis_client.hgetall(_summary_key(user_id, round_name))
+    except Exception:
+        raw = _fallback_summary(user_id, round_name)
+    return _summary_from_hash(round_name, raw)
+
+
+def _summary_from_hash(round_name: str, raw: dict) -> dict:
+    frames = _int(raw, "frames")
+    observed_ms = _int(raw, "observed_ms")
+    no_face_ms = _int(raw, "ms:no_face")
+    multiple_faces_ms = _int(raw, "ms:multiple_faces")
+    return {
+        "round": round_name,
+        "frames": frames,
+        "status_counts": {
+            status: _int(raw, f"count:{status}") for status in ("single_face", *VIOLATION_STATUSES)
+        },
+        "events": {status: _int(raw, f"events:{status}") for status in VIOLATION_STATUSES},
+        "observed_seconds": round(observed_ms / 1000, 1),
+        "no_face_seconds": round(no_face_ms / 1000, 1),
+        "multiple_faces_seconds": round(multiple_faces_ms / 1000, 1),
+        "no_face_time_ratio": round(no_face_ms / observed_ms, 3) if observed_ms else 0.0,
+        "peak_face_count": _int(raw, "peak_face_count"),
+        "low_light_ratio": round(_int(raw, "low_light") / frames, 3) if frames else 0.0,
+        "blurry_ratio": round(_int(raw, "blurry") / frames, 3) if frames else 0.0,
+        "looking_away_ratio": round(_int(raw, "looking_away") / frames, 3) if frames else 0.0,
+        "first_at": _int(raw, "first_ts") or None,
+        "last_at": _int(raw, "last_ts") or None,
+        "last_status": raw.get("last_status"),
+    }
+
+
+def recent_events(user_id: str, round_name: str, count: int) -> list[dict]:
+    """Newest ``count`` timeline entries, oldest first."""
+    if count <= 0:
+        return []
+    try:
+        entries = redis_client.xrevrange(_stream_key(user_id, round_name), count=count)
+        return [dict(fields, id=entry_id) for entry_id, fields in reversed(entries)]
+    except Exception:
+        entry = _TIMELINE_FALLBACK.get(_summary_key(user_id, round_name))
+        return list(entry["events"])[-count:] if entry else []
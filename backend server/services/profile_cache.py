@@ -0,0 +1,226 @@
+"""Read-through cache of ``get_full_candidate_profile``.
+
+A profile only changes when ``upsert_full_resume`` runs, yet it was fetched
+from Supabase on every round start, domain-switch call, ``/profile`` hit and
+once per user in ``/admin/users``. Reads now go through two tiers:
+
+- L1: a small in-process LRU per worker, keyed by user and profile version;
+- L2: Redis, ``profile:{user_id}:v{version}``, shared by all workers.
+
+The version is a per-user counter in Redis that ``invalidate_profile`` bumps
+after an upsert, so every worker's L1 and the old L2 entry stop matching at
+once; nothing has to be deleted. Reading the version costs one Redis GET,
+which is what keeps L1 safe across workers. Without Redis the version and L2
+fall back to this process (other workers then see a change only when their
+L1 entry expires).
+
+Counters (per worker, ``profile_cache_stats``): L1 and L2 hits, Supabase
+fetches, invalidations, and the Supabase calls saved.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable
+
+from services.db_client import get_async_supabase, supabase
+from services.redis import async_redis_client, redis_client
+
+L1_SIZE = 256
+L1_TTL_SECONDS = 300
+L2_TTL_SECONDS = 86400
+
+_VERSION_FALLBACK: dict[str, int] = {}
+_L2_FALLBACK: dict[str, str] = {}
+
+
+def _version_key(user_id: str) -> str:
+    return f"user:{user_id}:profile_version"
+
+
+def _profile_key(user_id: str, version: int) -> str:
+    return f"profile:{user_id}:v{version}"
+
+
+class ProfileCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.fetches = 0
+        self.invalidations = 0
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            l1, l2, fetches, invalidations = self.l1_hits, self.l2_hits, self.fetches, self.invalidations
+        lookups = l1 + l2 + fetches
+        return {
+            "l1_hits": l1,
+            "l2_hits": l2,
+            "supabase_fetches": fetches,
+            "supabase_calls_saved": l1 + l2,
+            "hit_ratio": round((l1 + l2) / lookups, 3) if lookups else None,
+            "invalidations": invalidations,
+            "l1_entries": len(_l1),
+        }
+
+
+profile_cache_stats = ProfileCacheStats()
+
+
+class _L1:
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, int], tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, version: int):
+        key = (user_id, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, user_id: str, version: int, profile) -> None:
+        with self._lock:
+            self._entries[(user_id, version)] = (time.monotonic() + self.ttl, profile)
+            self._entries.move_to_end((user_id, version))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def drop_user(self, user_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_l1 = _L1(L1_SIZE, L1_TTL_SECONDS)
+
+
+def _parse_version(raw) -> int:
+    return int(raw) if raw else 0
+
+
+def _store_l2_fallback(user_id: str, version: int, payload: str) -> None:
+    _L2_FALLBACK[_profile_key(user_id, version)] = payload
+
+
+def _lookup(user_id: str, version: int, raw_l2):
+    """L1, then the given L2 value; ``None`` when both miss."""
+    profile = _l1.get(user_id, version)
+    if profile is not None:
+        profile_cache_stats.record("l1_hits")
+        return profile
+    raw_l2 = raw_l2 or _L2_FALLBACK.get(_profile_key(user_id, version))
+    if raw_l2:
+        profile = json.loads(raw_l2)
+        _l1.put(user_id, version, profile)
+        profile_cache_stats.record("l2_hits")
+        return profile
+    return None
+
+
+def _fetched(user_id: str, version: int, data):
+    profile_cache_stats.record("fetches")
+    if data:
+        _l1.put(user_id, version, data)
+    return data
+
+
+def get_profile(user_id) -> Any:
+    """The user's full candidate profile (``None``/empty if there is none)."""
+    return get_profiles([user_id]).get(str(user_id))
+
+
+def get_profiles(user_ids: Iterable) -> dict[str, Any]:
+    """Profiles of several users with two Redis round trips in total."""
+    user_ids = [str(user_id) for user_id in user_ids]
+    try:
+        versions = [_parse_version(raw) for raw in redis_client.mget([_version_key(u) for u in user_ids])]
+    except Exception:
+        versions = [_VERSION_FALLBACK.get(u, 0) for u in user_ids]
+
+    need_l2 = [i for i, u in enumerate(user_ids) if _l1.get(u, versions[i]) is None]
+    raw_l2: dict[int, str] = {}
+    if need_l2:
+        try:
+            values = redis_client.mget([_profile_key(user_ids[i], versions[i]) for i in need_l2])
+            raw_l2 = dict(zip(need_l2, values))
+        except Exception:
+            pass
+
+    profiles: dict[str, Any] = {}
+    for i, user_id in enumerate(user_ids):
+        profile = _lookup(user_id, versions[i], raw_l2.get(i))
+        if profile is None:
+            data = supabase.rpc("get_full_candidate_profile", {"p_user_id": int(user_id)}).execute().data
+            profile = _fetched(user_id, versions[i], data)
+            if data:
+                payload = json.dumps(data)
+                try:
+                    redis_client.set(_profile_key(user_id, versions[i]), payload, ex=L2_TTL_SECONDS)
+                except Exception:
+                    _store_l2_fallback(user_id, versions[i], payload)
+        profiles[user_id] = profile
+    return profiles
+
+
+async def profile_version_async(user_id) -> int:
+    """The user's current profile version; it changes on every ``invalidate_profile``."""
+    user_id = str(user_id)
+    try:
+        return _parse_version(await async_redis_client.get(_version_key(user_id)))
+    except Exception:
+        return _VERSION_FALLBACK.get(user_id, 0)
+
+
+async def get_profile_async(user_id) -> Any:
+    """``get_profile`` for handlers running on the event loop."""
+    user_id = str(user_id)
+    version = await profile_version_async(user_id)
+
+    raw_l2 = None
+    if _l1.get(user_id, version) is None:
+        try:
+            raw_l2 = await async_redis_client.get(_profile_key(user_id, version))
+        except Exception:
+            pass
+    profile = _lookup(user_id, version, raw_l2)
+    if profile is not None:
+        return profile
+
+    db = await get_async_supabase()
+    data = (await db.rpc("get_full_candidate_profile", {"p_user_id": int(user_id)}).execute()).data
+    profile = _fetched(user_id, version, data)
+    if data:
+        payload = json.dumps(data)
+        try:
+            await async_redis_client.set(_profile_key(user_id, version), payload, ex=L2_TTL_SECONDS)
+        except Exception:
+            _store_l2_fallback(user_id, version, payload)
+    return profile
+
+
+def invalidate_profile(user_id) -> None:
+    """Call after ``upsert_full_resume``: later reads fetch the new profile."""
+    user_id = str(user_id)
+    _l1.drop_user(user_id)
+    _VERSION_FALLBACK[user_id] = _VERSION_FALLBACK.get(user_id, 0) + 1
+    try:
+        redis_client.incr(_version_key(user_id))
+    except Exception:
+        pass
+    profile_cache_stats.record("invalidations")
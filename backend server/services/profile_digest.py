@@ -0,0 +1,210 @@
+"""Compact text rendering of a candidate profile for LLM prompts.
+
+``get_full_candidate_profile`` returns the candidate row with its nested
+``resume_json`` (a second copy of the skills, projects and education), row
+ids, timestamps and empty fields. Pasted into a prompt as a Python repr, most
+of that is noise that is paid for on every turn. ``profile_digest`` renders
+the same information once, in a fixed order:
+
+- ids, timestamps, contact details, the stored resume critique and empty
+  values are dropped;
+- ``resume_json`` only fills sections the profile tables do not have;
+- duplicate list entries (e.g. skills differing in case) are merged;
+- strings, lists and the whole digest are capped (``PROFILE_DIGEST_MAX_CHARS``).
+
+Digests are cached per user and profile version (a hash of the payload), so
+an unchanged profile is rendered once per worker. Token counts are estimated
+at four characters per token -- no Gemini tokenizer runs offline -- which is
+enough to compare before and after.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+MAX_DIGEST_CHARS = int(os.getenv("PROFILE_DIGEST_MAX_CHARS", "4000"))
+MAX_TEXT_CHARS = 400
+MAX_LIST_ITEMS = 12
+CACHE_SIZE = 1024
+
+_DROPPED_KEYS = {"id", "user_id", "created_at", "updated_at", "password", "email", "phone", "mobile"}
+# The resume critique stored with the profile; not facts about the candidate.
+_DROPPED_KEYS |= {"analysis", "resume_score", "skill_analysis", "suggested_projects"}
+# Fixed order of the top-level sections; anything else follows alphabetically.
+_SECTIONS = [
+    ("name", "Name"),
+    ("domain", "Domain"),
+    ("bio", "Bio"),
+    ("skills", "Skills"),
+    ("projects", "Projects"),
+    ("placements", "Experience"),
+    ("education", "Education"),
+    ("certificates", "Certificates"),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _as_object(value):
+    if isinstance(value, str) and value[:1] in ("{", "["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _clip(text: str) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= MAX_TEXT_CHARS else text[: MAX_TEXT_CHARS - 1] + "…"
+
+
+def _clean(value):
+    """Drop ids, timestamps, contact details and empty values, recursively."""
+    value = _as_object(value)
+    if isinstance(value, dict):
+        cleaned = {}
+        for key, item in value.items():
+            if key in _DROPPED_KEYS or key.endswith("_id"):
+                continue
+            item = _clean(item)
+            if not _is_empty(item):
+                cleaned[key] = item
+        return cleaned
+    if isinstance(value, list):
+        items, seen = [], set()
+        for item in value:
+            item = _clean(item)
+            marker = json.dumps(item, sort_keys=True, default=str).lower()
+            if _is_empty(item) or marker in seen:
+                continue
+            seen.add(marker)
+            items.append(item)
+        return items
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _flatten(profile: dict) -> dict:
+    """One level of sections: the profile tables first, ``resume_json`` for gaps."""
+    def section(source, key) -> dict:
+        value = _as_object(source.get(key))
+        return value if isinstance(value, dict) else {}
+
+    candidates = section(profile, "candidates")
+    resume = section(candidates, "resume_json") or section(profile, "resume_json")
+    basic = section(resume, "basic")
+
+    merged: dict = {}
+    for source in (profile, candidates, resume, basic):
+        for key, value in source.items():
+            if key not in ("candidates", "resume_json", "basic") and _is_empty(merged.get(key)):
+                merged[key] = value
+    return merged
+
+
+def _render_item(item) -> str:
+    if isinstance(item, dict):
+        if len(item) == 1:
+            return _clip(next(iter(item.values())))
+        return "; ".join(f"{key.replace('_', ' ')}: {_render_item(value)}" for key, value in item.items())
+    if isinstance(item, list):
+        return ", ".join(_render_item(entry) for entry in item[:MAX_LIST_ITEMS])
+    return _clip(item)
+
+
+def _render_section(label: str, value) -> str:
+    if isinstance(value, list):
+        if all(not isinstance(item, (dict, list)) or len(item) == 1 for item in value):
+            # Flat lists (skills) on one line, case-insensitively deduplicated.
+            names, seen = [], set()
+            for item in value:
+                name = _render_item(item)
+                if name.lower() not in seen:
+                    seen.add(name.lower())
+                    names.append(name)
+            return f"{label}: {', '.join(names[:MAX_LIST_ITEMS])}"
+        lines = [f"- {_render_item(item)}" for item in value[:MAX_LIST_ITEMS]]
+        return "\n".join([f"{label}:", *lines])
+    return f"{label}: {_render_item(value)}"
+
+
+def build_profile_digest(profile) -> str:
+    """Canonical, deduplicated, size-bounded text of a candidate profile."""
+    profile = _as_object(profile)
+    if isinstance(profile, list):
+        profile = profile[0] if profile else {}
+    if not isinstance(profile, dict):
+        return _clip(profile or "")
+
+    sections = _clean(_flatten(profile))
+    known = [(key, label) for key, label in _SECTIONS if key in sections]
+    rest = [(key, key.replace("_", " ").capitalize()) for key in sorted(sections) if key not in dict(_SECTIONS)]
+    digest = "\n".join(_render_section(label, sections[key]) for key, label in known + rest)
+    if len(digest) > MAX_DIGEST_CHARS:
+        digest = digest[: MAX_DIGEST_CHARS - 1] + "…"
+    return digest
+
+
+def profile_version(profile) -> str:
+    payload = json.dumps(profile, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ProfileDigestCache:
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.raw_tokens = 0
+        self.digest_tokens = 0
+
+    def get(self, user_id: str, profile) -> str:
+        key = (str(user_id), profile_version(profile))
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return digest
+
+        digest = build_profile_digest(profile)
+        # What the prompts used to receive: the payload's repr.
+        raw_tokens = estimate_tokens(str(profile))
+        with self._lock:
+            self.misses += 1
+            self.raw_tokens += raw_tokens
+            self.digest_tokens += estimate_tokens(digest)
+            self._entries[key] = digest
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return digest
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "raw_tokens": self.raw_tokens,
+                "digest_tokens": self.digest_tokens,
+                "token_ratio": round(self.digest_tokens / self.raw_tokens, 3) if self.raw_tokens else None,
+            }
+
+
+profile_digest_cache = ProfileDigestCache(CACHE_SIZE)
+
+
+def profile_digest(user_id: str, profile) -> str:
+    """Prompt text for this user's profile, cached per profile version."""
+    return profile_digest_cache.get(user_id, profile)
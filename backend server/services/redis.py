@@ -1,3 +1,6 @@
 import redis
+import redis.asyncio
 import json
-redis_client = redis.Redis(host='localhost', port=6379, decode_responses=True)
\ No newline at end of file
+redis_client = redis.Redis(host='localhost', port=6379, decode_responses=True)
+# For handlers running on the event loop; same server, non-blocking calls.
+async_redis_client = redis.asyncio.Redis(host='localhost', port=6379, decode_responses=True)
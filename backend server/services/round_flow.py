@@ -1,5 +1,5 @@
 from fastapi import HTTPException
-from services.redis import redis_client
+from services.redis import async_redis_client, redis_client
 import json
 
 ROUND_ORDER = ["coding", "technical", "manager", "hr"]
@@ -18,15 +18,18 @@ def _default_state() -> dict:
     }
 
 
+def _parse_state(raw) -> dict:
+    if not raw:
+        return _default_state()
+    parsed = json.loads(raw)
+    state = _default_state()
+    state.update({k: v for k, v in parsed.items() if k in state})
+    return state
+
+
 def get_flow_state(user_id: str) -> dict:
     try:
-        raw = redis_client.get(_key(user_id))
-        if not raw:
-            return _default_state()
-        parsed = json.loads(raw)
-        state = _default_state()
-        state.update({k: v for k, v in parsed.items() if k in state})
-        return state
+        return _parse_state(redis_client.get(_key(user_id)))
     except Exception:
         return _default_state()
 
@@ -48,11 +51,7 @@ def reset_flow_state(user_id: str) -> dict:
     return state
 
 
-def ensure_round_start_allowed(user_id: str, round_name: str) -> dict:
-    if round_name not in ROUND_ORDER:
-        raise HTTPException(status_code=400, detail="Invalid round")
-
-    state = get_flow_state(user_id)
+def _check_round_start(state: dict, round_name: str) -> dict:
     idx = ROUND_ORDER.index(round_name)
 
     for required in ROUND_ORDER[:idx]:
@@ -71,8 +70,7 @@ def ensure_round_start_allowed(user_id: str, round_name: str) -> dict:
     return state
 
 
-def ensure_round_answer_allowed(user_id: str, round_name: str) -> dict:
-    state = get_flow_state(user_id)
+def _check_round_answer(state: dict, round_name: str) -> dict:
     status = state.get(round_name)
     if status not in ("in_progress", "completed"):
         raise HTTPException(
@@ -80,3 +78,50 @@ def ensure_round_answer_allowed(user_id: str, round_name: str) -> dict:
             detail=f"Start {round_name} round first.",
         )
     return state
+
+
+def ensure_round_start_allowed(user_id: str, round_name: str) -> dict:
+    if round_name not in ROUND_ORDER:
+        raise HTTPException(status_code=400, detail="Invalid round")
+    return _check_round_start(get_flow_state(user_id), round_name)
+
+
+def ensure_round_answer_allowed(user_id: str, round_name: str) -> dict:
+    return _check_round_answer(get_flow_state(user_id), round_name)
+
+
+# ── async variants for handlers running on the event loop ──────────────────
+
+
+async def get_flow_state_async(user_id: str) -> dict:
+    try:
+        return _parse_state(await async_redis_client.get(_key(user_id)))
+    except Exception:
+        return _default_state()
+
+
+async def save_flow_state_async(user_id: str, state: dict) -> None:
+    await async_redis_client.set(_key(user_id), json.dumps(state), ex=86400)
+
+
+async def set_round_state_async(user_id: str, round_name: str, value: str) -> dict:
+    state = await get_flow_state_async(user_id)
+    state[round_name] = value
+    await save_flow_state_async(user_id, state)
+    return state
+
+
+async def reset_flow_state_async(user_id: str) -> dict:
+    state = _default_state()
+    await save_flow_state_async(user_id, state)
+    return state
+
+
+async def ensure_round_start_allowed_async(user_id: str, round_name: str) -> dict:
+    if round_name not in ROUND_ORDER:
+        raise HTTPException(status_code=400, detail="Invalid round")
+    return _check_round_start(await get_flow_state_async(user_id), round_name)
+
+
+async def ensure_round_answer_allowed_async(user_id: str, round_name: str) -> dict:
+    return _check_round_answer(await get_flow_state_async(user_id), round_name)
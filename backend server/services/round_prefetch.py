@@ -0,0 +1,200 @@
+"""Speculative generation of the next round's opening question.
+
+The first question of a round depends only on the candidate profile, so as
+soon as a round is completed the next round in ROUND_ORDER is opened in the
+background and its first graph state is cached under the user's key.
+``/start`` then takes the cached state instead of calling the model, and
+falls back to live generation when there is none (expired, still running in
+another worker, or generation failed).
+
+Each interview round registers an *opener*: an async ``user_id -> state``
+function doing what its ``/start`` would do before persisting. Rounds whose
+router is not loaded in this worker are simply not prefetched.
+
+Counters (per worker, see ``prefetch_stats``):
+
+- ``hits`` / ``misses``: ``/start`` calls served from the cache or not;
+  ``joined`` hits waited for a generation still running in this worker.
+- ``generated`` / ``failed``: background generations.
+- ``wasted``: generated openings thrown away unused -- the round was started
+  before the generation finished, the profile changed (openings carry the
+  profile version they were built from, see services.profile_cache), or a
+  newer opening replaced it. Openings that expire unused are not seen individually; they
+  are ``generated - hits - wasted`` minus the ones still waiting.
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Awaitable, Callable
+
+from fastapi.encoders import jsonable_encoder
+
+from services.llm_admission import REPORT, llm_priority
+from services.profile_cache import profile_version_async
+from services.redis import async_redis_client, redis_client
+from services.round_flow import ROUND_ORDER, get_flow_state_async
+
+PREFETCH_ENABLED = os.getenv("ROUND_PREFETCH", "1").strip().lower() not in ("0", "false", "no")
+# A cached opening is only as fresh as the profile it was generated from.
+OPENING_TTL_SECONDS = int(os.getenv("ROUND_PREFETCH_TTL", "7200"))
+
+Opener = Callable[[str], Awaitable[dict]]
+
+_OPENERS: dict[str, Opener] = {}
+_FALLBACK: dict[str, str] = {}
+_IN_FLIGHT: dict[str, asyncio.Task] = {}
+# create_task keeps only a weak reference to its task.
+_BACKGROUND: set[asyncio.Task] = set()
+
+
+class PrefetchStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "joined": 0, "misses": 0, "generated": 0, "failed": 0, "wasted": 0}
+
+    def record(self, outcome: str, count: int = 1) -> None:
+        with self._lock:
+            self.counts[outcome] += count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            "enabled": PREFETCH_ENABLED,
+            **counts,
+            "in_flight": len(_IN_FLIGHT),
+            "hit_rate": round(counts["hits"] / lookups, 3) if lookups else None,
+            "waste_rate": round(counts["wasted"] / counts["generated"], 3) if counts["generated"] else None,
+        }
+
+
+prefetch_stats = PrefetchStats()
+
+
+def _key(user_id: str, round_name: str) -> str:
+    return f"user:{user_id}:opening:{round_name}"
+
+
+def register_opener(round_name: str, opener: Opener) -> None:
+    if round_name not in ROUND_ORDER:
+        raise ValueError(f"Unknown round: {round_name}")
+    _OPENERS[round_name] = opener
+
+
+def next_round(round_name: str) -> str | None:
+    idx = ROUND_ORDER.index(round_name)
+    return ROUND_ORDER[idx + 1] if idx + 1 < len(ROUND_ORDER) else None
+
+
+async def _store(user_id: str, round_name: str, state: dict, profile_version: int) -> None:
+    key = _key(user_id, round_name)
+    payload = json.dumps({"profile_version": profile_version, "state": jsonable_encoder(state)})
+    try:
+        replaced = await async_redis_client.set(key, payload, ex=OPENING_TTL_SECONDS, get=True)
+    except Exception:
+        replaced = _FALLBACK.get(key)
+        _FALLBACK[key] = payload
+    if replaced:
+        prefetch_stats.record("wasted")
+
+
+async def prefetch_opening(user_id: str, round_name: str) -> None:
+    """Generate and cache the opening state of ``round_name`` for this user."""
+    opener = _OPENERS.get(round_name)
+    if opener is None:
+        return
+    key = _key(user_id, round_name)
+    task = asyncio.current_task()
+    # Kept until the opening is stored, so take_opening joins this task
+    # rather than missing and generating a second opening live.
+    _IN_FLIGHT[key] = task
+    try:
+        profile_version = await profile_version_async(user_id)
+        try:
+            # Speculative: never take model capacity from live interviews.
+            with llm_priority(REPORT):
+                state = await opener(user_id)
+        except Exception:
+            prefetch_stats.record("failed")
+            return
+        prefetch_stats.record("generated")
+
+        # Started meanwhile (e.g. in another worker), or built from a profile
+        # that has since been replaced: nobody should take it.
+        if (
+            (await get_flow_state_async(user_id)).get(round_name) != "not_started"
+            or await profile_version_async(user_id) != profile_version
+        ):
+            prefetch_stats.record("wasted")
+            return
+        await _store(user_id, round_name, state, profile_version)
+    finally:
+        if _IN_FLIGHT.get(key) is task:
+            _IN_FLIGHT.pop(key)
+
+
+async def prefetch_next_opening(user_id: str, completed_round: str) -> None:
+    """Background-task entry point once ``completed_round`` is completed."""
+    upcoming = next_round(completed_round)
+    if PREFETCH_ENABLED and upcoming is not None:
+        await prefetch_opening(user_id, upcoming)
+
+
+def schedule_next_opening(user_id: str, completed_round: str) -> None:
+    """Start ``prefetch_next_opening`` on the running loop without awaiting it."""
+    task = asyncio.get_running_loop().create_task(prefetch_next_opening(user_id, completed_round))
+    _BACKGROUND.add(task)
+    task.add_done_callback(_BACKGROUND.discard)
+
+
+async def take_opening(user_id: str, round_name: str) -> dict[str, Any] | None:
+    """The cached opening state of ``round_name``, removed from the cache.
+
+    Waits for a generation still running in this worker rather than starting
+    a second one. Returns ``None`` on a miss; the caller generates live.
+    """
+    key = _key(user_id, round_name)
+    task = _IN_FLIGHT.get(key)
+    if task is not None:
+        # shield: a client disconnect must not cancel the shared generation.
+        await asyncio.shield(task)
+
+    raw = None
+    try:
+        raw = await async_redis_client.getdel(key)
+    except Exception:
+        pass
+    fallback = _FALLBACK.pop(key, None)
+    raw = raw or fallback
+
+    if not raw:
+        prefetch_stats.record("misses")
+        return None
+    opening = json.loads(raw)
+    # Stored before a profile change that raced the prefetch's own check.
+    if opening.get("profile_version") != await profile_version_async(user_id):
+        prefetch_stats.record("wasted")
+        prefetch_stats.record("misses")
+        return None
+    prefetch_stats.record("hits")
+    if task is not None:
+        prefetch_stats.record("joined")
+    return opening["state"]
+
+
+def discard_openings(user_id: str) -> None:
+    """Drop every cached opening of this user, e.g. after a profile change.
+
+    Call after ``invalidate_profile``: generations still running then see the
+    new profile version and do not store their opening.
+    """
+    keys = [_key(user_id, round_name) for round_name in ROUND_ORDER]
+    dropped = sum(1 for key in keys if _FALLBACK.pop(key, None))
+    try:
+        dropped += redis_client.delete(*keys)
+    except Exception:
+        pass
+    if dropped:
+        prefetch_stats.record("wasted", dropped)
@@ -0,0 +1,113 @@
+"""Vectorised box suppression vs the original pure-Python loop.
+
+Checks that services.face_detection.suppress_overlapping_boxes keeps exactly
+the boxes the previous O(n^2) ``_deduplicate_boxes`` loop kept, over random
+clustered box sets, then times both for 1..500 candidate boxes.
+
+Run from the backend directory:
+    python test/bench_box_suppression.py [--trials 300]
+
+Exits with status 1 if any trial disagrees.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.face_detection import suppress_overlapping_boxes  # noqa: E402
+
+BOX_COUNTS = [1, 2, 5, 10, 25, 50, 100, 200, 500]
+
+
+def reference_deduplicate(boxes: list, iou_threshold: float = 0.3) -> list:
+    """The loop face_check used before vectorisation, kept verbatim for comparison."""
+    if not boxes:
+        return []
+
+    boxes = sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)
+    kept = []
+
+    for box in boxes:
+        x1, y1, w1, h1 = box
+        merged = False
+        for kx, ky, kw, kh in kept:
+            ix = max(x1, kx)
+            iy = max(y1, ky)
+            ix2 = min(x1 + w1, kx + kw)
+            iy2 = min(y1 + h1, ky + kh)
+            inter = max(0, ix2 - ix) * max(0, iy2 - iy)
+            union = w1 * h1 + kw * kh - inter
+            if union > 0 and inter / union > iou_threshold:
+                merged = True
+                break
+        if not merged:
+            kept.append(box)
+
+    return kept
+
+
+def random_boxes(rng: np.random.Generator, count: int, width: int = 640, height: int = 480) -> np.ndarray:
+    # Haar passes return clusters of near-duplicate boxes around each face,
+    # plus scattered false positives; mimic both.
+    centers = rng.integers(0, [width, height], size=(max(1, count // 8), 2))
+    picks = centers[rng.integers(0, len(centers), size=count)]
+    sizes = rng.integers(25, 160, size=count)
+    jitter = rng.integers(-12, 13, size=(count, 2))
+    xy = np.clip(picks + jitter - sizes[:, None] // 2, 0, None)
+    return np.column_stack([xy, sizes, sizes + rng.integers(-4, 5, size=count)]).astype(np.int64)
+
+
+def check_parity(trials: int) -> int:
+    rng = np.random.default_rng(42)
+    failures = 0
+    for trial in range(trials):
+        count = int(rng.choice(BOX_COUNTS))
+        boxes = random_boxes(rng, count)
+        expected = reference_deduplicate(boxes.tolist())
+        actual = suppress_overlapping_boxes(boxes).tolist()
+        if len(expected) != len(actual) or sorted(map(tuple, expected)) != sorted(map(tuple, actual)):
+            failures += 1
+            print(f"trial {trial}: n={count} reference kept {len(expected)}, vectorised kept {len(actual)}")
+    print(f"parity: {trials - failures}/{trials} trials identical")
+    return failures
+
+
+def _median_ms(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def benchmark() -> None:
+    rng = np.random.default_rng(7)
+    print(f"{'boxes':>6} {'kept':>5} {'python ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for count in BOX_COUNTS:
+        boxes = random_boxes(rng, count)
+        as_list = boxes.tolist()
+        repeats = 200 if count <= 100 else 20
+        python_ms = _median_ms(lambda: reference_deduplicate(as_list), repeats)
+        numpy_ms = _median_ms(lambda: suppress_overlapping_boxes(boxes), repeats)
+        kept = len(suppress_overlapping_boxes(boxes))
+        print(f"{count:>6} {kept:>5} {python_ms:>10.3f} {numpy_ms:>10.3f} {python_ms / numpy_ms:>7.1f}x")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=300)
+    args = parser.parse_args()
+
+    failures = check_parity(args.trials)
+    benchmark()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
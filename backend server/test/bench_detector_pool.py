@@ -0,0 +1,69 @@
+"""Throughput of the proctoring detector pool for different worker counts.
+
+Submits a burst of frames to services.detector_pool.DetectorPool and reports
+frames per second, so thread vs process mode and the worker count can be
+sized against the cores of a proctoring node.
+
+Run from the backend directory:
+    python test/bench_detector_pool.py --frame path/to/frame.jpg --mode thread --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.detector_pool import DetectorPool  # noqa: E402
+
+
+def _load_frame(path: str | None) -> bytes:
+    if path:
+        with open(path, "rb") as handle:
+            return handle.read()
+    rng = np.random.default_rng(3)
+    frame = rng.integers(60, 200, (360, 480, 3), dtype=np.uint8)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def _run(mode: str, workers: int, frame: bytes, frames: int) -> None:
+    pool = DetectorPool(mode=mode, workers=workers)
+    try:
+        # Warm every worker so detector construction is not timed.
+        for future in [pool.submit(frame) for _ in range(workers)]:
+            future.result()
+
+        start = time.perf_counter()
+        futures = [pool.submit(frame) for _ in range(frames)]
+        peak_queue = pool.queue_depth
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+    print(
+        f"{mode:<8} workers={workers:<3} frames={frames:<5} "
+        f"{frames / elapsed:8.1f} fps  {elapsed / frames * 1000:7.2f} ms/frame  peak_queue={peak_queue}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frame", help="JPEG to replay; a synthetic frame is used if omitted")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    frame = _load_frame(args.frame)
+    print(f"cpu_count={os.cpu_count()}")
+    for workers in sorted(set(args.workers)):
+        _run(args.mode, workers, frame, args.frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""Per-stage benchmark of the proctoring face-check pipeline.
+
+Feeds a frame corpus through every stage behind /proctoring/face-check --
+decode, resize, colour conversions, analyze_frame_quality, the MediaPipe
+lenient/strict passes, the Haar lenient pass, the Haar frontal, profile
+and flipped-profile passes and the keypoint gaze estimate -- and through the
+whole staged and exhaustive pipelines. For every resolution and stage it
+reports p50/p95 latency, frames per second per core (from process CPU time, so detector-internal threads are
+counted) and the peak memory allocated while the stage runs.
+
+The corpus is generated (blank, low light, blurred, one face, several pasted
+faces) and, with --recorded, extended with recorded JPEGs rescaled to each
+resolution. Faces for the generated frames are cropped from the recorded
+frames; without recordings a drawn face is used, which keeps the timings
+meaningful but not the verdicts.
+
+Run from the backend directory:
+    python test/bench_proctoring.py [--recorded path/to/frames] [--resolutions 480 720 1080]
+        [--repeats 3] [--json result.json] [--baseline previous.json --tolerance 0.25]
+
+Exits with status 1 when the gaze stage's p95 exceeds its per-frame budget
+(services.head_pose.GAZE_BUDGET_MS) at any resolution, and with --baseline
+also when a stage's p95 grew by more than the tolerance or a corpus
+category's verdicts changed.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.face_detection import (  # noqa: E402
+    HAAR_STRICT_PARAMS,
+    MIN_FACE_AREA_RATIO_LENIENT,
+    MIN_FACE_AREA_RATIO_STRICT,
+    MIN_FACE_CONFIDENCE_LENIENT,
+    MIN_FACE_CONFIDENCE_STRICT,
+    FaceDetectors,
+    analyse_frame,
+    analyze_frame_quality,
+    build_frame_context,
+    decode_bytes_to_image,
+    decode_frame_context,
+    detect_mediapipe_faces,
+    detect_mediapipe_faces_with_keypoints,
+    detect_opencv_faces_lenient,
+)
+from services.head_pose import GAZE_BUDGET_MS, estimate_gaze  # noqa: E402
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+JPEG_QUALITY = 85
+
+
+def _preprocess(ctx):
+    return ctx.rgb, ctx.gray, ctx.equalized, ctx.equalized_flipped
+
+
+# Stage name -> callable(raw_bytes, frame, ctx, detectors, keypoints).
+# ``frame`` is the decoded image, ``ctx`` an already preprocessed FrameContext
+# and ``keypoints`` the first lenient MediaPipe face's keypoints (or None), so
+# each stage is timed on its own; the pipeline_* paths start from the raw bytes.
+STAGES = {
+    "decode": lambda raw, frame, ctx, d, kp: decode_bytes_to_image(raw),
+    "resize": lambda raw, frame, ctx, d, kp: build_frame_context(frame),
+    "preprocess": lambda raw, frame, ctx, d, kp: _preprocess(build_frame_context(frame)),
+    "quality": lambda raw, frame, ctx, d, kp: analyze_frame_quality(ctx),
+    "mediapipe_lenient": lambda raw, frame, ctx, d, kp: detect_mediapipe_faces(
+        ctx, d.face_detector, MIN_FACE_CONFIDENCE_LENIENT, MIN_FACE_AREA_RATIO_LENIENT
+    ),
+    "mediapipe_strict": lambda raw, frame, ctx, d, kp: detect_mediapipe_faces(
+        ctx, d.face_detector_strict, MIN_FACE_CONFIDENCE_STRICT, MIN_FACE_AREA_RATIO_STRICT
+    ),
+    "haar_lenient": lambda raw, frame, ctx, d, kp: detect_opencv_faces_lenient(ctx, d),
+    "haar_frontal": lambda raw, frame, ctx, d, kp: d.face_cascade.detectMultiScale(ctx.equalized, **HAAR_STRICT_PARAMS),
+    "haar_profile": lambda raw, frame, ctx, d, kp: d.face_cascade_profile.detectMultiScale(
+        ctx.equalized, **HAAR_STRICT_PARAMS
+    ),
+    "haar_profile_flipped": lambda raw, frame, ctx, d, kp: d.face_cascade_profile.detectMultiScale(
+        ctx.equalized_flipped, **HAAR_STRICT_PARAMS
+    ),
+    "gaze": lambda raw, frame, ctx, d, kp: estimate_gaze(kp),
+    "pipeline_staged": lambda raw, frame, ctx, d, kp: analyse_frame(decode_frame_context(raw), d, exhaustive=False),
+    "pipeline_exhaustive": lambda raw, frame, ctx, d, kp: analyse_frame(decode_frame_context(raw), d, exhaustive=True),
+}
+
+
+# ── corpus ──────────────────────────────────────────────────────────────────
+
+
+def _encode(image: np.ndarray) -> bytes:
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1].tobytes()
+
+
+def _scale_to_height(image: np.ndarray, height: int) -> np.ndarray:
+    h, w = image.shape[:2]
+    width = max(1, round(w * height / h))
+    interpolation = cv2.INTER_AREA if height < h else cv2.INTER_CUBIC
+    return cv2.resize(image, (width, height), interpolation=interpolation)
+
+
+def _load_recorded(root: str | None) -> list[tuple[str, np.ndarray]]:
+    if not root:
+        return []
+    images = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                image = cv2.imread(os.path.join(dirpath, name), cv2.IMREAD_COLOR)
+                if image is not None:
+                    images.append((name, image))
+    return images
+
+
+def _face_crops(recorded: list[tuple[str, np.ndarray]], detectors: FaceDetectors, limit: int = 8) -> list:
+    crops = []
+    for _, image in recorded:
+        boxes, _ = detect_mediapipe_faces(
+            build_frame_context(image, max_width=0), detectors.face_detector, 0.6, MIN_FACE_AREA_RATIO_LENIENT
+        )
+        for x, y, w, h in boxes:
+            # Widen the box so the paste includes hair and chin like a real head.
+            pad_w, pad_h = int(w * 0.3), int(h * 0.4)
+            crop = image[max(0, y - pad_h): y + h + pad_h // 2, max(0, x - pad_w): x + w + pad_w]
+            if crop.size:
+                crops.append(crop)
+            if len(crops) >= limit:
+                return crops
+    return crops
+
+
+def _drawn_face(size: int) -> np.ndarray:
+    face = np.full((size, int(size * 0.8), 3), (40, 40, 40), dtype=np.uint8)
+    h, w = face.shape[:2]
+    cv2.ellipse(face, (w // 2, h // 2), (int(w * 0.42), int(h * 0.46)), 0, 0, 360, (150, 180, 220), -1)
+    for ex in (0.33, 0.67):
+        cv2.ellipse(face, (int(w * ex), int(h * 0.42)), (int(w * 0.08), int(h * 0.04)), 0, 0, 360, (40, 30, 30), -1)
+    cv2.ellipse(face, (w // 2, int(h * 0.72)), (int(w * 0.16), int(h * 0.05)), 0, 0, 180, (60, 50, 140), 3)
+    return face
+
+
+def _background(rng: np.random.Generator, height: int) -> np.ndarray:
+    width = height * 16 // 9
+    ramp = np.linspace(70, 170, width, dtype=np.float32)[None, :, None]
+    noise = rng.normal(0, 12, (height, width, 3)).astype(np.float32)
+    return np.clip(ramp + noise, 0, 255).astype(np.uint8)
+
+
+def _paste_faces(background: np.ndarray, faces: list, count: int, rng: np.random.Generator) -> tuple[np.ndarray, list]:
+    canvas = background.copy()
+    boxes = []
+    height, width = canvas.shape[:2]
+    slot_width = width // count
+    for index in range(count):
+        face = faces[int(rng.integers(len(faces)))]
+        target_h = int(height * (0.55 if count == 1 else 0.4))
+        target_w = max(1, min(slot_width - 8, round(face.shape[1] * target_h / face.shape[0])))
+        resized = cv2.resize(face, (target_w, target_h), interpolation=cv2.INTER_AREA)
+        x = index * slot_width + (slot_width - target_w) // 2
+        y = (height - target_h) // 2
+        canvas[y: y + target_h, x: x + target_w] = resized
+        boxes.append([x, y, target_w, target_h])
+    return canvas, boxes
+
+
+def build_corpus(resolutions: list[int], recorded, faces, per_category: int) -> list[dict]:
+    """Encoded frames with their category and, for generated frames, the pasted face boxes.
+
+    ``faces`` is ``None`` for recorded frames, whose ground truth is unknown.
+    """
+    rng = np.random.default_rng(12)
+    frames = []
+    for height in resolutions:
+        for index in range(per_category):
+            background = _background(rng, height)
+            single, single_boxes = _paste_faces(background, faces, 1, rng)
+            multiple, multiple_boxes = _paste_faces(background, faces, 2 + index % 2, rng)
+            blur_kernel = max(3, (height // 24) | 1)
+            generated = {
+                "blank": (np.zeros_like(background), []),
+                "low_light": ((single.astype(np.float32) * 0.15).astype(np.uint8), single_boxes),
+                "blurred": (cv2.GaussianBlur(single, (blur_kernel, blur_kernel), 0), single_boxes),
+                "single_face": (single, single_boxes),
+                "multiple_faces": (multiple, multiple_boxes),
+            }
+            for category, (image, boxes) in generated.items():
+                frames.append({
+                    "category": category,
+                    "resolution": height,
+                    "jpeg": _encode(image),
+                    "size": [image.shape[1], image.shape[0]],
+                    "faces": boxes,
+                })
+
+        for _, image in recorded:
+            scaled = _scale_to_height(image, height)
+            frames.append({
+                "category": "recorded",
+                "resolution": height,
+                "jpeg": _encode(scaled),
+                "size": [scaled.shape[1], scaled.shape[0]],
+                "faces": None,
+            })
+    return frames
+
+
+# ── measurement ─────────────────────────────────────────────────────────────
+
+
+def _percentile(samples: list, q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+def _prepare(raw: bytes, detectors: FaceDetectors):
+    frame = decode_bytes_to_image(raw)
+    ctx = build_frame_context(frame)
+    _preprocess(ctx)
+    _, _, keypoints = detect_mediapipe_faces_with_keypoints(
+        ctx, detectors.face_detector, MIN_FACE_CONFIDENCE_LENIENT, MIN_FACE_AREA_RATIO_LENIENT
+    )
+    return frame, ctx, keypoints[0] if keypoints else None
+
+
+def time_stages(frames: list[dict], detectors: FaceDetectors, repeats: int) -> dict:
+    wall = defaultdict(list)
+    cpu = defaultdict(float)
+    calls = Counter()
+    for item in frames:
+        frame, ctx, keypoints = _prepare(item["jpeg"], detectors)
+        for name, stage in STAGES.items():
+            key = (item["resolution"], name)
+            for _ in range(repeats):
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+                stage(item["jpeg"], frame, ctx, detectors, keypoints)
+                wall[key].append((time.perf_counter() - wall_start) * 1000)
+                cpu[key] += time.process_time() - cpu_start
+                calls[key] += 1
+    return {
+        key: {
+            "p50_ms": round(_percentile(samples, 50), 3),
+            "p95_ms": round(_percentile(samples, 95), 3),
+            "cpu_ms": round(cpu[key] / calls[key] * 1000, 3),
+            "fps_per_core": round(calls[key] / cpu[key], 1) if cpu[key] > 0 else None,
+        }
+        for key, samples in wall.items()
+    }
+
+
+def measure_memory(frames: list[dict], detectors: FaceDetectors) -> dict:
+    # A separate pass: tracemalloc slows Python code down and would skew the
+    # timings. NumPy and OpenCV output arrays are traced; memory MediaPipe
+    # keeps inside its native graph is not.
+    peaks = defaultdict(int)
+    tracemalloc.start()
+    try:
+        for item in frames:
+            frame, ctx, keypoints = _prepare(item["jpeg"], detectors)
+            for name, stage in STAGES.items():
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                stage(item["jpeg"], frame, ctx, detectors, keypoints)
+                _, peak = tracemalloc.get_traced_memory()
+                key = (item["resolution"], name)
+                peaks[key] = max(peaks[key], peak - baseline)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def collect_verdicts(frames: list[dict], detectors: FaceDetectors) -> dict:
+    verdicts = defaultdict(Counter)
+    exits = defaultdict(Counter)
+    for item in frames:
+        result, _ = analyse_frame(decode_frame_context(item["jpeg"]), detectors, exhaustive=False)
+        key = f"{item['category']}@{item['resolution']}p"
+        verdicts[key][result["status"]] += 1
+        exits[key][result["debug"]["early_exit"] or "none"] += 1
+    return {key: {"status": dict(verdicts[key]), "early_exit": dict(exits[key])} for key in sorted(verdicts)}
+
+
+# ── reporting ───────────────────────────────────────────────────────────────
+
+
+def print_report(stats: dict, peaks: dict, verdicts: dict, resolutions: list[int]) -> None:
+    for height in resolutions:
+        print(f"\n{height}p")
+        print(f"  {'stage':<22} {'p50 ms':>9} {'p95 ms':>9} {'cpu ms':>9} {'fps/core':>9} {'peak KiB':>9}")
+        for name in STAGES:
+            row = stats.get((height, name))
+            if row is None:
+                continue
+            fps = f"{row['fps_per_core']:.1f}" if row["fps_per_core"] else "-"
+            print(
+                f"  {name:<22} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['cpu_ms']:>9.2f} "
+                f"{fps:>9} {peaks.get((height, name), 0) / 1024:>9.0f}"
+            )
+
+    print("\nverdicts (staged pipeline)")
+    for key, row in verdicts.items():
+        status = ", ".join(f"{k}={v}" for k, v in sorted(row["status"].items()))
+        exits = ", ".join(f"{k}={v}" for k, v in sorted(row["early_exit"].items()))
+        print(f"  {key:<24} {status:<40} exits: {exits}")
+
+    peak_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nprocess peak RSS: {peak_rss_mib:.0f} MiB (detectors, corpus and all paths)")
+
+
+def to_json(stats: dict, peaks: dict, verdicts: dict, args) -> dict:
+    return {
+        "cpu_count": os.cpu_count(),
+        "repeats": args.repeats,
+        "stages": {
+            f"{height}p/{name}": dict(row, peak_kib=round(peaks.get((height, name), 0) / 1024, 1))
+            for (height, name), row in sorted(stats.items())
+        },
+        "verdicts": verdicts,
+    }
+
+
+def check_gaze_budget(stats: dict, resolutions: list[int]) -> int:
+    problems = 0
+    for height in resolutions:
+        row = stats.get((height, "gaze"))
+        if row and row["p95_ms"] > GAZE_BUDGET_MS:
+            problems += 1
+            print(f"OVER BUDGET {height}p/gaze: p95 {row['p95_ms']:.3f} ms > {GAZE_BUDGET_MS} ms")
+    return problems
+
+
+def compare_baseline(current: dict, baseline_path: str, tolerance: float) -> int:
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+
+    problems = 0
+    for key, old in baseline.get("stages", {}).items():
+        new = current["stages"].get(key)
+        if new and old.get("p95_ms") and new["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            problems += 1
+            print(f"REGRESSION {key}: p95 {old['p95_ms']:.2f} -> {new['p95_ms']:.2f} ms")
+    for key, old in baseline.get("verdicts", {}).items():
+        new = current["verdicts"].get(key)
+        if new and new["status"] != old["status"]:
+            problems += 1
+            print(f"VERDICT CHANGE {key}: {old['status']} -> {new['status']}")
+    print(f"baseline comparison: {problems} problem(s)")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recorded", help="directory of recorded frames (also the source of pasted faces)")
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[480, 720, 1080])
+    parser.add_argument("--per-category", type=int, default=4, help="generated frames per category and resolution")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="previous --json output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 growth")
+    args = parser.parse_args()
+
+    detectors = FaceDetectors()
+    recorded = _load_recorded(args.recorded)
+    faces = _face_crops(recorded, detectors) if detectors.face_detector is not None else []
+    if not faces:
+        print("no recorded faces available; generated frames use a drawn face (verdicts not meaningful)")
+        faces = [_drawn_face(240)]
+
+    corpus = build_corpus(args.resolutions, recorded, faces, args.per_category)
+    print(f"corpus: {len(corpus)} frames ({len(recorded)} recorded x {len(args.resolutions)} resolutions), "
+          f"cpu_count={os.cpu_count()}")
+
+    # Warm the detectors so graph start-up is not timed.
+    for item in corpus[:3]:
+        analyse_frame(decode_frame_context(item["jpeg"]), detectors, exhaustive=True)
+
+    stats = time_stages(corpus, detectors, args.repeats)
+    peaks = measure_memory(corpus, detectors)
+    verdicts = collect_verdicts(corpus, detectors)
+    print_report(stats, peaks, verdicts, args.resolutions)
+
+    result = to_json(stats, peaks, verdicts, args)
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(result, handle, indent=2)
+    problems = check_gaze_budget(stats, args.resolutions)
+    if args.baseline:
+        problems += compare_baseline(result, args.baseline, args.tolerance)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Microbenchmark: JSON data-URL frames vs raw JPEG frames for face-check.
+
+Compares bytes on the wire and server-side decode cost of
+  - POST /proctoring/face-check        (JSON body with a base64 data URL)
+  - POST /proctoring/face-check/frame  (raw image/jpeg body)
+
+Run from the backend directory:
+    python test/bench_proctoring_decode.py [--width 480 --height 360 --quality 80 --runs 500]
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes.proctoring import FaceCheckPayload, _data_url_to_bytes  # noqa: E402
+from services.face_detection import decode_bytes_to_image  # noqa: E402
+
+
+def _synthetic_jpeg(width: int, height: int, quality: int) -> bytes:
+    rng = np.random.default_rng(7)
+    gradient = np.linspace(40, 200, width, dtype=np.float32)
+    frame = np.tile(gradient, (height, 1))
+    frame = np.stack([frame, np.flipud(frame), frame * 0.8], axis=-1)
+    frame += rng.normal(0, 12, frame.shape)
+    cv2.ellipse(frame, (width // 2, height // 2), (width // 8, height // 5), 0, 0, 360, (180, 160, 150), -1)
+    ok, encoded = cv2.imencode(".jpg", np.clip(frame, 0, 255).astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("Unable to encode synthetic frame")
+    return encoded.tobytes()
+
+
+def _json_path(body: bytes) -> np.ndarray:
+    payload = FaceCheckPayload.model_validate(json.loads(body))
+    return decode_bytes_to_image(_data_url_to_bytes(payload.image))
+
+
+def _binary_path(body: bytes) -> np.ndarray:
+    return decode_bytes_to_image(body)
+
+
+def _time(fn, body: bytes, runs: int) -> list[float]:
+    fn(body)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(body)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(name: str, wire_bytes: int, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{name:<8} wire={wire_bytes:>8} B  "
+        f"p50={statistics.median(samples):.3f} ms  p95={p95:.3f} ms  mean={statistics.fmean(samples):.3f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=480)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    jpeg = _synthetic_jpeg(args.width, args.height, args.quality)
+    data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+    json_body = json.dumps({"image": data_url}).encode("utf-8")
+
+    print(f"frame {args.width}x{args.height} q={args.quality}, {args.runs} runs")
+    json_samples = _time(_json_path, json_body, args.runs)
+    binary_samples = _time(_binary_path, jpeg, args.runs)
+    _report("json", len(json_body), json_samples)
+    _report("binary", len(jpeg), binary_samples)
+
+    overhead = (len(json_body) - len(jpeg)) / len(jpeg) * 100
+    speedup = statistics.median(json_samples) / statistics.median(binary_samples)
+    print(f"json wire overhead: +{overhead:.1f}%  binary decode speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Startup time and memory of ``import server`` per deployment role.
+
+Imports the app in a fresh interpreter for every scenario and reports the
+import wall time, the peak RSS afterwards and which heavy libraries were
+loaded. Scenarios are each router group from server.ROUTER_GROUPS alone,
+``all`` (every group, lazy), and ``all+preload``: every group followed by
+each router's warm_up(), i.e. what PRELOAD_ON_STARTUP=1 does at startup and
+roughly what every worker paid before models were built lazily.
+
+The app needs the same environment as a real start (SUPABASE_URL,
+SUPABASE_KEY, ...); no request is sent, so nothing is contacted.
+
+Run from the backend directory:
+    python test/bench_startup.py [--repeats 5] [--scenarios auth proctoring all all+preload] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+HEAVY_MODULES = ("langchain_google_genai", "langchain_community", "langgraph", "mediapipe", "cv2")
+
+# Runs in the child interpreter; prints one JSON line.
+_CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import server
+imported = time.perf_counter()
+if {preload!r}:
+    for module in server.router_modules:
+        if hasattr(module, "warm_up"):
+            module.warm_up()
+ready = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "ready_s": ready - start,
+    "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def _group_list() -> list[str]:
+    # Parsed rather than imported so this process stays cold.
+    import ast
+
+    with open(os.path.join(BACKEND_DIR, "server.py")) as handle:
+        tree = ast.parse(handle.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", "") == "ROUTER_GROUPS":
+            return [key.value for key in node.value.keys]
+    raise RuntimeError("ROUTER_GROUPS not found in server.py")
+
+
+def run_once(scenario: str) -> dict:
+    groups, _, preload = scenario.partition("+")
+    env = dict(os.environ, ROUTER_GROUPS=groups, PRELOAD_ON_STARTUP="0")
+    code = _CHILD.format(preload=preload == "preload", heavy=HEAVY_MODULES)
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=False
+    )
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f"{scenario}: {completed.stderr.strip().splitlines()[-1:]}")
+    return json.loads(lines[-1])
+
+
+def measure(scenario: str, repeats: int) -> dict:
+    runs = [run_once(scenario) for _ in range(repeats)]
+    return {
+        "scenario": scenario,
+        "import_s": round(statistics.median(r["import_s"] for r in runs), 3),
+        "ready_s": round(statistics.median(r["ready_s"] for r in runs), 3),
+        "rss_mib": round(statistics.median(r["rss_mib"] for r in runs), 1),
+        "heavy": runs[-1]["heavy"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--scenarios", nargs="+", help="router groups, 'all', or '<groups>+preload'")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios or [*_group_list(), "all", "all+preload"]
+    results = []
+    print(f"{'scenario':<16} {'import s':>9} {'ready s':>8} {'RSS MiB':>8}  heavy modules")
+    for scenario in scenarios:
+        row = measure(scenario, args.repeats)
+        results.append(row)
+        print(
+            f"{row['scenario']:<16} {row['import_s']:>9.2f} {row['ready_s']:>8.2f} {row['rss_mib']:>8.0f}  "
+            f"{', '.join(row['heavy']) or '-'}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"repeats": args.repeats, "results": results}, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
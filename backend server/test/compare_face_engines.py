@@ -0,0 +1,211 @@
+"""Accuracy and latency of each proctoring face-detector engine on the benchmark corpus.
+
+Runs the staged ``cascade`` pipeline and every single engine from
+services.face_engines over the corpus test/bench_proctoring.py builds, and
+reports for each:
+
+- status accuracy on generated frames (blank -> no_face, one pasted face ->
+  single_face, several -> multiple_faces) and exact face-count accuracy,
+- agreement with the cascade pipeline on recorded frames,
+- p50/p95 latency and frames per second per core.
+
+Engines whose model files are missing are listed and skipped. The last line
+recommends the fastest engine within --accuracy-margin of the most accurate.
+
+--fit-calibration PATH refits each engine's raw-score -> confidence table
+from the generated frames (a detection is a true face when its centre falls
+inside a pasted face) and writes JSON for PROCTORING_ENGINE_CALIBRATION.
+
+Run from the backend directory:
+    python test/compare_face_engines.py [--recorded path/to/frames] [--engines cascade mediapipe haar yunet res10]
+        [--fit-calibration calibration.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_proctoring import _drawn_face, _face_crops, _load_recorded, build_corpus  # noqa: E402
+from services.face_detection import FaceDetectors, analyse_frame, decode_frame_context  # noqa: E402
+from services.face_engines import DEFAULT_CALIBRATION, ENGINES, analyse_frame_with_engine  # noqa: E402
+
+EXPECTED_STATUS = {0: "no_face", 1: "single_face"}
+CALIBRATION_BINS = 8
+
+
+def _expected_status(face_count: int) -> str:
+    return EXPECTED_STATUS.get(face_count, "multiple_faces")
+
+
+def _build(name: str):
+    if name == "cascade":
+        return None
+    return ENGINES[name]()
+
+
+def _analyse(engine, detectors: FaceDetectors, raw: bytes) -> dict:
+    ctx = decode_frame_context(raw)
+    if engine is None:
+        result, _ = analyse_frame(ctx, detectors, exhaustive=False)
+    else:
+        result, _ = analyse_frame_with_engine(ctx, engine)
+    return result
+
+
+def evaluate(name: str, engine, detectors: FaceDetectors, corpus: list[dict], reference: dict | None) -> dict:
+    wall = []
+    cpu = 0.0
+    correct = exact = labelled = 0
+    agree = recorded = 0
+    statuses = {}
+    for index, item in enumerate(corpus):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = _analyse(engine, detectors, item["jpeg"])
+        wall.append((time.perf_counter() - wall_start) * 1000)
+        cpu += time.process_time() - cpu_start
+        statuses[index] = result["status"]
+
+        if item["faces"] is not None:
+            labelled += 1
+            expected = len(item["faces"])
+            correct += result["status"] == _expected_status(expected)
+            exact += result["face_count"] == expected
+        elif reference is not None:
+            recorded += 1
+            agree += result["status"] == reference[index]
+
+    return {
+        "engine": name,
+        "status_accuracy": correct / labelled if labelled else None,
+        "count_accuracy": exact / labelled if labelled else None,
+        "recorded_agreement": agree / recorded if recorded else None,
+        "p50_ms": float(np.percentile(wall, 50)),
+        "p95_ms": float(np.percentile(wall, 95)),
+        "fps_per_core": len(corpus) / cpu if cpu > 0 else None,
+        "statuses": statuses,
+    }
+
+
+def _centre_inside(box, faces: list) -> bool:
+    cx, cy = box[0] + box[2] / 2, box[1] + box[3] / 2
+    return any(x <= cx <= x + w and y <= cy <= y + h for x, y, w, h in faces)
+
+
+def fit_calibration(engine, corpus: list[dict]) -> list:
+    """Piecewise-linear raw -> precision table from quantile bins of raw scores."""
+    scores = []
+    labels = []
+    for item in corpus:
+        if item["faces"] is None:
+            continue
+        ctx = decode_frame_context(item["jpeg"])
+        scale = ctx.width / item["size"][0]
+        faces = [[v * scale for v in face] for face in item["faces"]]
+        boxes, raw, _ = engine.detect_raw(ctx)
+        for box, score in zip(np.asarray(boxes).reshape(-1, 4).tolist(), np.asarray(raw).tolist()):
+            scores.append(score)
+            labels.append(1.0 if _centre_inside(box, faces) else 0.0)
+
+    if len(scores) < CALIBRATION_BINS:
+        return []
+    scores = np.asarray(scores)
+    labels = np.asarray(labels)
+    order = np.argsort(scores)
+    knots = []
+    for chunk in np.array_split(order, CALIBRATION_BINS):
+        if len(chunk):
+            knots.append([round(float(scores[chunk].mean()), 4), float(labels[chunk].mean())])
+    # Precision should not fall as the raw score rises; flatten any dips.
+    running = 0.0
+    for knot in knots:
+        running = max(running, knot[1])
+        knot[1] = round(running, 3)
+    # Scores below anything observed must not inherit the lowest bin's
+    # precision, so anchor the table at the engine's score floor.
+    floor = DEFAULT_CALIBRATION[engine.name][0][0]
+    if knots[0][0] > floor:
+        knots.insert(0, [floor, 0.0])
+    return knots
+
+
+def _fmt(value, pattern: str) -> str:
+    return "-" if value is None else pattern.format(value)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recorded", help="directory of recorded frames")
+    parser.add_argument("--engines", nargs="+", default=["cascade", *ENGINES])
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[480, 720, 1080])
+    parser.add_argument("--per-category", type=int, default=4)
+    parser.add_argument("--accuracy-margin", type=float, default=0.01)
+    parser.add_argument("--fit-calibration", help="write refitted calibration tables to this JSON file")
+    args = parser.parse_args()
+
+    detectors = FaceDetectors()
+    recorded = _load_recorded(args.recorded)
+    faces = _face_crops(recorded, detectors) if detectors.face_detector is not None else []
+    if not faces:
+        print("no recorded faces available; generated frames use a drawn face (accuracy not meaningful)")
+        faces = [_drawn_face(240)]
+    corpus = build_corpus(args.resolutions, recorded, faces, args.per_category)
+    print(f"corpus: {len(corpus)} frames, cpu_count={os.cpu_count()}")
+
+    reports = []
+    reference = None
+    calibration = {}
+    for name in args.engines:
+        try:
+            engine = _build(name)
+        except Exception as exc:
+            print(f"skip {name}: {exc}")
+            continue
+        # Warm-up so graph and network initialisation are not timed.
+        _analyse(engine, detectors, corpus[0]["jpeg"])
+        report = evaluate(name, engine, detectors, corpus, reference)
+        if name == "cascade":
+            reference = report["statuses"]
+        reports.append(report)
+        if args.fit_calibration and engine is not None:
+            calibration[name] = fit_calibration(engine, corpus)
+
+    print(f"\n{'engine':<10} {'status acc':>10} {'count acc':>10} {'recorded':>9} {'p50 ms':>8} {'p95 ms':>8} {'fps/core':>9}")
+    for r in reports:
+        print(
+            f"{r['engine']:<10} {_fmt(r['status_accuracy'], '{:.1%}'):>10} {_fmt(r['count_accuracy'], '{:.1%}'):>10} "
+            f"{_fmt(r['recorded_agreement'], '{:.1%}'):>9} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+            f"{_fmt(r['fps_per_core'], '{:.1f}'):>9}"
+        )
+        wrong = Counter(
+            f"{item['category']}->{r['statuses'][i]}"
+            for i, item in enumerate(corpus)
+            if item["faces"] is not None and r["statuses"][i] != _expected_status(len(item["faces"]))
+        )
+        if wrong:
+            print(f"{'':<10} misses: " + ", ".join(f"{k}={v}" for k, v in wrong.most_common()))
+
+    scored = [r for r in reports if r["status_accuracy"] is not None]
+    if scored:
+        best = max(r["status_accuracy"] for r in scored)
+        eligible = [r for r in scored if r["status_accuracy"] >= best - args.accuracy_margin]
+        choice = min(eligible, key=lambda r: r["p95_ms"])
+        print(f"\nrecommended PROCTORING_ENGINE={choice['engine']} "
+              f"(accuracy {choice['status_accuracy']:.1%}, p95 {choice['p95_ms']:.1f} ms)")
+
+    if args.fit_calibration:
+        tables = [f"  {json.dumps(name)}: {json.dumps(knots)}" for name, knots in calibration.items() if knots]
+        with open(args.fit_calibration, "w") as handle:
+            handle.write("{\n" + ",\n".join(tables) + "\n}\n")
+        print(f"calibration written to {args.fit_calibration}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
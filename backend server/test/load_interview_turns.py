@@ -0,0 +1,194 @@
+"""How many interview turns one worker serves concurrently.
+
+Drives complete technical rounds (start + every answer until the round ends)
+for N simulated candidates at once against the app in this process -- one
+event loop, i.e. one uvicorn worker -- and reports turns per second and
+p50/p95 turn latency for each concurrency level.
+
+Gemini, Supabase and Redis are replaced by in-process fakes so the numbers
+measure the server, not the network: every LLM call takes --llm-latency
+seconds. Two modes are compared:
+
+- ``async``: the fake model awaits, like ChatGoogleGenerativeAI.ainvoke.
+- ``blocking``: the fake model sleeps on the event loop, like the
+  synchronous model.invoke the rounds used to call from async handlers.
+
+With the async pipeline throughput should grow roughly linearly with
+concurrency; in blocking mode it stays flat at about 1 / llm-latency.
+
+Run from the backend directory (fakeredis is used when installed, otherwise
+the routers' in-process fallbacks):
+    python test/load_interview_turns.py [--concurrency 1 4 16 64] [--llm-latency 0.2] [--modes async blocking]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SUPABASE_URL", "http://supabase.invalid")
+os.environ.setdefault("SUPABASE_KEY", "load-test")
+os.environ.setdefault("RESUME_API", "load-test")
+os.environ["ROUTER_GROUPS"] = "interview"
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from routes import hr_round, manager_round, technical_round  # noqa: E402
+from services import analysis_jobs, llm_admission, proctoring_timeline, profile_cache, round_flow, round_prefetch  # noqa: E402
+
+PROFILE = {"name": "Load Test", "skills": ["Python", "SQL"], "projects": [{"title": "Demo"}]}
+
+
+def _fake_value(annotation):
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Literal:
+        return args[0]
+    if origin is typing.Union:
+        return _fake_value(next(a for a in args if a is not type(None)))
+    if origin is list:
+        return []
+    if annotation is bool:
+        return False
+    if annotation in (int, float):
+        return 5
+    return "What is a fake answer?"
+
+
+def _fake_instance(schema):
+    return schema(**{name: _fake_value(field.annotation) for name, field in schema.model_fields.items()})
+
+
+class _Message:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeChatModel:
+    def __init__(self, latency: float, blocking: bool, schema=None):
+        self.latency = latency
+        self.blocking = blocking
+        self.schema = schema
+        self.calls = 0
+
+    def with_structured_output(self, schema):
+        return FakeChatModel(self.latency, self.blocking, schema)
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return _fake_instance(self.schema) if self.schema else _Message("Explain a fake concept?")
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _FakeQuery:
+    async def execute(self):
+        return _Response(PROFILE)
+
+
+class FakeSupabase:
+    def rpc(self, name: str, params: dict):
+        return _FakeQuery()
+
+
+def install_fakes(latency: float, blocking: bool) -> None:
+    model = FakeChatModel(latency, blocking)
+    # All rounds: finishing one prefetches the next round's opening.
+    for round_module in (technical_round, manager_round, hr_round):
+        round_module.get_task_model = lambda task: model
+        round_module.get_task_structured_model = lambda task, schema: model.with_structured_output(schema)
+
+    fake_db = FakeSupabase()
+
+    async def get_async_supabase():
+        return fake_db
+
+    profile_cache.get_async_supabase = get_async_supabase
+
+    try:
+        from fakeredis import aioredis
+    except ImportError:
+        return
+    fake_redis = aioredis.FakeRedis(decode_responses=True)
+    for module in (technical_round, round_flow, round_prefetch, analysis_jobs, profile_cache, llm_admission, proctoring_timeline):
+        module.async_redis_client = fake_redis
+
+
+async def _candidate(app, user_id: str, latencies: list) -> int:
+    # The technical round requires a completed coding round.
+    await round_flow.set_round_state_async(user_id, "coding", "completed")
+    turns = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", cookies={"user_id": user_id}) as client:
+        started = time.perf_counter()
+        response = await client.get("/interview/start")
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+        turns += 1
+        while True:
+            started = time.perf_counter()
+            response = await client.post("/interview/answer", json={"answer": "A fake answer."})
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+            turns += 1
+            if response.json().get("should_end"):
+                return turns
+
+
+async def run_level(concurrency: int, offset: int) -> dict:
+    latencies: list[float] = []
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(_candidate(server.app, str(offset + i), latencies) for i in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started
+    # Final analyses run in the background; let them finish inside this loop.
+    await analysis_jobs.analysis_queue.drain()
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "turns": sum(results),
+        "turns_per_s": sum(results) / elapsed,
+        "p50_s": statistics.median(latencies),
+        "p95_s": latencies[max(0, int(len(latencies) * 0.95) - 1)],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--modes", nargs="+", choices=["async", "blocking"], default=["async", "blocking"])
+    args = parser.parse_args()
+
+    # Import LangGraph and compile the graph before anything is timed.
+    technical_round.get_interview_graph()
+    offset = 100000
+    for mode in args.modes:
+        install_fakes(args.llm_latency, blocking=mode == "blocking")
+        print(f"\nmode={mode} llm_latency={args.llm_latency}s")
+        print(f"  {'concurrent':>10} {'turns':>6} {'turns/s':>8} {'p50 s':>7} {'p95 s':>7}")
+        for concurrency in args.concurrency:
+            row = asyncio.run(run_level(concurrency, offset))
+            offset += concurrency
+            print(
+                f"  {row['concurrency']:>10} {row['turns']:>6} {row['turns_per_s']:>8.1f} "
+                f"{row['p50_s']:>7.2f} {row['p95_s']:>7.2f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,582 @@
+"""Full candidate sessions against the app with every external service faked.
+
+Boots ``server.py`` in this process (one event loop, i.e. one uvicorn
+worker) with local stand-ins, so it costs no Gemini quota and never touches
+Supabase:
+
+- Gemini: a fake model per LLM task that returns instances of the schema it
+  is asked for (``model_result``, ``final_analysis``, ``resume_upload``, ...)
+  after a latency drawn from a configurable distribution. It honours the
+  call-time timeout like the real client, and can fail with a 503 at a given
+  rate to exercise the retries.
+- Supabase: an in-memory adapter for the tables (``users``) and RPCs
+  (``get_full_candidate_profile``, ``upsert_full_resume``) the session uses,
+  sync and async.
+- Redis: fakeredis, shared by the sync and async clients (the services'
+  in-process fallbacks when fakeredis is not installed).
+
+Each simulated candidate runs one whole session: register, login, resume,
+coding round, then the technical, manager and HR rounds answered until they
+end, polling each round's background analysis. N candidates run at once;
+503s are retried after their ``Retry-After`` like the frontend does. The
+report gives throughput, latency percentiles and error rates per endpoint,
+and the server's own LLM, admission and cache counters.
+
+Latency distributions (seconds): ``fixed:S``, ``uniform:LO:HI``,
+``exp:MEAN`` or ``lognormal:MEDIAN:SIGMA``. ``--llm-latency`` sets all
+tasks, ``--task-latency evaluation=lognormal:2:0.4`` one of them.
+
+Run from the backend directory:
+    python test/load_sessions.py [--candidates 1 8 32] [--llm-latency fixed:0.2]
+        [--task-latency TASK=SPEC ...] [--llm-error-rate 0.02]
+        [--resume build|upload|none] [--stream] [--json report.json]
+
+``--resume upload`` goes through the PDF parser and needs pypdf.
+"""
+import argparse
+import asyncio
+import copy
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import types
+import typing
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SUPABASE_URL", "http://supabase.invalid")
+os.environ.setdefault("SUPABASE_KEY", "load-test")
+os.environ.setdefault("RESUME_API", "load-test")
+# Proctoring is left out: it needs a camera feed, not an LLM.
+os.environ.setdefault("ROUTER_GROUPS", "auth,profile,interview")
+
+import httpx  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+ROUNDS = [
+    ("technical", "/interview"),
+    ("manager", "/manager_round"),
+    ("hr", "/hr_round"),
+]
+# Typical Gemini 2.5 Flash latencies per task.
+DEFAULT_LATENCY = {
+    "question_generation": "lognormal:0.8:0.3",
+    "evaluation": "lognormal:2.0:0.35",
+    "final_analysis": "lognormal:6:0.3",
+    "resume_parsing": "lognormal:5:0.3",
+    "domain_switch": "lognormal:4:0.3",
+    "code_review": "lognormal:4:0.3",
+}
+
+
+# ── Gemini ──────────────────────────────────────────────────────────────────
+
+
+def parse_latency(spec: str) -> typing.Callable[[], float]:
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(*values)
+    if kind == "exp" and len(values) == 1:
+        return lambda: random.expovariate(1 / values[0])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Bad latency distribution: {spec}")
+
+
+def _fake_value(annotation):
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Literal:
+        return "keep_difficulty" if "keep_difficulty" in args else args[0]
+    if origin in (typing.Union, types.UnionType):
+        return _fake_value(next(a for a in args if a is not type(None)))
+    if origin is list:
+        return [_fake_value(args[0])] if args else []
+    if origin is dict or annotation is dict:
+        return {}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return fake_instance(annotation)
+    if annotation is bool:
+        return False
+    if annotation in (int, float):
+        return 5
+    return "What is a fake answer?"
+
+
+def fake_instance(schema):
+    """An instance of a pydantic schema with plausible placeholder values."""
+    return schema(**{name: _fake_value(field.annotation) for name, field in schema.model_fields.items()})
+
+
+class _Message:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class ServiceUnavailable(Exception):
+    """What the Google SDK raises on a 503."""
+
+    code = 503
+
+
+class FakeGemini:
+    def __init__(self, task: str, latency: typing.Callable[[], float], error_rate: float, schema=None):
+        self.task = task
+        self.latency = latency
+        self.error_rate = error_rate
+        self.schema = schema
+
+    def with_structured_output(self, schema):
+        return FakeGemini(self.task, self.latency, self.error_rate, schema)
+
+    def _plan(self, timeout) -> tuple[float, Exception | None]:
+        delay = self.latency()
+        if timeout is not None and delay > timeout:
+            return timeout, TimeoutError(f"fake {self.task} call timed out")
+        if random.random() < self.error_rate:
+            return delay / 2, ServiceUnavailable(f"fake {self.task} 503")
+        return delay, None
+
+    def _result(self):
+        return fake_instance(self.schema) if self.schema else _Message("Can you explain a fake concept?")
+
+    async def ainvoke(self, prompt, timeout=None, **kwargs):
+        delay, error = self._plan(timeout)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return self._result()
+
+    def invoke(self, prompt, timeout=None, **kwargs):
+        delay, error = self._plan(timeout)
+        time.sleep(delay)
+        if error:
+            raise error
+        return self._result()
+
+
+# ── Supabase ────────────────────────────────────────────────────────────────
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class InMemoryDatabase:
+    """The tables and RPCs of a session, in process."""
+
+    def __init__(self, seed_profiles: bool = False):
+        self._lock = threading.Lock()
+        self.tables: dict[str, list[dict]] = defaultdict(list)
+        self.resumes: dict[int, dict] = {}
+        # Give every user a parsed resume without a resume step.
+        self.seed_profiles = seed_profiles
+        self._ids = itertools.count(1)
+
+    def select(self, table: str, filters: list, limit: int | None) -> list[dict]:
+        with self._lock:
+            rows = [row for row in self.tables[table] if all(row.get(col) == val for col, val in filters)]
+        return copy.deepcopy(rows[:limit] if limit is not None else rows)
+
+    def insert(self, table: str, rows: list[dict]) -> list[dict]:
+        with self._lock:
+            stored = [{"id": next(self._ids), **row} for row in rows]
+            self.tables[table].extend(stored)
+        return copy.deepcopy(stored)
+
+    def rpc(self, name: str, params: dict):
+        user_id = int(params["p_user_id"])
+        with self._lock:
+            if name == "upsert_full_resume":
+                self.resumes[user_id] = copy.deepcopy(params["data"])
+                return None
+            if name == "get_full_candidate_profile":
+                if self.seed_profiles and user_id not in self.resumes:
+                    from models.upload_resume import resume_upload
+
+                    self.resumes[user_id] = fake_instance(resume_upload).model_dump()
+                resume = self.resumes.get(user_id)
+                if resume is None:
+                    return None
+                user = next((row for row in self.tables["users"] if row["id"] == user_id), {})
+                return {"user": {"id": user_id, "name": user.get("name"), "email": user.get("email")}, **copy.deepcopy(resume)}
+        raise ValueError(f"Unknown RPC: {name}")
+
+
+class _Query:
+    def __init__(self, db: InMemoryDatabase, table: str):
+        self.db = db
+        self.table = table
+        self.filters: list = []
+        self.rows: list[dict] | None = None
+        self.max_rows: int | None = None
+
+    def select(self, *columns):
+        return self
+
+    def eq(self, column: str, value):
+        self.filters.append((column, value))
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, count: int):
+        self.max_rows = count
+        return self
+
+    def insert(self, rows):
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def _run(self) -> _Result:
+        if self.rows is not None:
+            return _Result(self.db.insert(self.table, self.rows))
+        return _Result(self.db.select(self.table, self.filters, self.max_rows))
+
+    def execute(self) -> _Result:
+        return self._run()
+
+
+class _RpcCall:
+    def __init__(self, db: InMemoryDatabase, name: str, params: dict):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    def execute(self) -> _Result:
+        return _Result(self.db.rpc(self.name, self.params))
+
+
+class FakeSupabase:
+    """The subset of ``supabase.Client`` the app uses."""
+
+    def __init__(self, db: InMemoryDatabase):
+        self.db = db
+
+    def table(self, name: str) -> _Query:
+        return _Query(self.db, name)
+
+    def rpc(self, name: str, params: dict) -> _RpcCall:
+        return _RpcCall(self.db, name, params)
+
+
+class _AsyncQuery(_Query):
+    async def execute(self) -> _Result:
+        return self._run()
+
+
+class _AsyncRpcCall(_RpcCall):
+    async def execute(self) -> _Result:
+        return _Result(self.db.rpc(self.name, self.params))
+
+
+class FakeAsyncSupabase(FakeSupabase):
+    def table(self, name: str) -> _AsyncQuery:
+        return _AsyncQuery(self.db, name)
+
+    def rpc(self, name: str, params: dict) -> _AsyncRpcCall:
+        return _AsyncRpcCall(self.db, name, params)
+
+
+# ── wiring ──────────────────────────────────────────────────────────────────
+
+
+def install_stand_ins(latencies: dict[str, str], error_rate: float, seed_profiles: bool) -> InMemoryDatabase:
+    """Replace Redis, Supabase and Gemini before ``server`` imports the routers."""
+    from services import db_client, llm
+    from services import redis as redis_module
+
+    try:
+        import fakeredis
+    except ImportError:
+        print("fakeredis not installed: using the services' in-process fallbacks")
+    else:
+        server = fakeredis.FakeServer()
+        redis_module.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+        redis_module.async_redis_client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+    db = InMemoryDatabase(seed_profiles)
+    db_client.supabase = FakeSupabase(db)
+    async_db = FakeAsyncSupabase(db)
+
+    async def get_async_supabase():
+        return async_db
+
+    db_client.get_async_supabase = get_async_supabase
+
+    models = {task: FakeGemini(task, parse_latency(spec), error_rate) for task, spec in latencies.items()}
+    llm.get_task_model = lambda task: models[task]
+    llm.get_task_structured_model = lambda task, schema: models[task].with_structured_output(schema)
+    return db
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.statuses: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, seconds: float, status: str, ok: bool) -> None:
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+
+
+class SessionFailed(Exception):
+    pass
+
+
+class Candidate:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, args, number: int):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.number = number
+
+    async def call(self, method: str, path: str, endpoint: str | None = None, **kwargs) -> dict:
+        """One request; 503s are retried after Retry-After, other errors end the session."""
+        endpoint = endpoint or f"{method} {path.split('?')[0]}"
+        for attempt in range(self.args.retries + 1):
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except Exception as exc:
+                self.recorder.record(endpoint, time.perf_counter() - started, type(exc).__name__, False)
+                raise SessionFailed(f"{endpoint}: {exc!r}") from exc
+            elapsed = time.perf_counter() - started
+            body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+            # /resume/ reports failures in a 200 body.
+            ok = response.is_success and not (isinstance(body, dict) and body.get("error"))
+            self.recorder.record(endpoint, elapsed, str(response.status_code) if ok or not response.is_success else "error-body", ok)
+            if ok:
+                return body
+            if response.status_code == 503 and attempt < self.args.retries:
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+                continue
+            raise SessionFailed(f"{endpoint}: {response.status_code} {response.text[:200]}")
+
+    async def stream_answer(self, base: str, answer: str) -> dict:
+        endpoint = f"POST {base}/answer/stream"
+        started = time.perf_counter()
+        event = data = None
+        async with self.client.stream("POST", f"{base}/answer/stream", json={"answer": answer}) as response:
+            status = response.status_code
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:") and event in ("done", "error"):
+                    data = json.loads(line[len("data:"):])
+        ok = status == 200 and event == "done"
+        label = str(status) if status != 200 or ok else f"sse-{data.get('status_code') if data else 'eof'}"
+        self.recorder.record(endpoint, time.perf_counter() - started, label, ok)
+        if not ok:
+            raise SessionFailed(f"{endpoint}: {label} {data}")
+        return data
+
+    async def resume(self) -> None:
+        if self.args.resume == "build":
+            await self.call("POST", "/resume/build", json={
+                "basic": {"phone": "0000000000", "bio": "Load test candidate", "domain": "Software"},
+                "skills": ["Python", "SQL", "React"],
+                "education": {"degree": "B.Tech", "college_name": "Test College"},
+                "projects": [{"project_name": "Demo", "project_description": "A demo project"}],
+            })
+        elif self.args.resume == "upload":
+            await self.call("POST", "/resume/", files={"file": ("resume.pdf", RESUME_PDF, "application/pdf")})
+
+    async def interview_round(self, round_name: str, base: str) -> None:
+        body = await self.call("GET", f"{base}/start")
+        while not body.get("should_end"):
+            if self.args.stream:
+                body = await self.stream_answer(base, "A fake but reasonable answer.")
+            else:
+                body = await self.call("POST", f"{base}/answer", json={"answer": "A fake but reasonable answer."})
+        status = body.get("analysis_status")
+        while status == "pending":
+            await asyncio.sleep(self.args.poll_interval)
+            status = (await self.call("GET", f"/interview_flow/analysis?round={round_name}"))["status"]
+        if status != "done":
+            raise SessionFailed(f"{round_name} analysis {status}")
+
+    async def run(self) -> None:
+        email = f"candidate{self.number}@example.com"
+        await self.call("POST", "/register/", json={"name": f"Candidate {self.number}", "email": email, "password": "load-test"})
+        await self.call("POST", "/login/", json={"email": email, "password": "load-test"})
+        await self.resume()
+
+        await self.call("GET", "/coding_round/get_question")
+        await self.call("POST", "/coding_round/submit_solution", json={
+            "code": "def solve(xs):\n    return sorted(xs)\n", "time_taken": 120, "language": "python",
+        })
+        for round_name, base in ROUNDS:
+            await self.interview_round(round_name, base)
+
+
+def _pdf(text: str) -> bytes:
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+RESUME_PDF = _pdf("Load Test Candidate - Python, SQL, React - B.Tech, Test College")
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+async def run_level(app, candidates: int, offset: int, args) -> dict:
+    import services.analysis_jobs as analysis_jobs
+
+    recorder = Recorder()
+    failures: list[str] = []
+    durations: list[float] = []
+
+    async def session(number: int) -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+            started = time.perf_counter()
+            try:
+                await Candidate(client, recorder, args, number).run()
+            except SessionFailed as exc:
+                failures.append(str(exc))
+                return
+            durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(offset + i) for i in range(candidates)))
+    elapsed = time.perf_counter() - started
+    # Let background analyses and prefetches finish inside this loop.
+    await analysis_jobs.analysis_queue.drain()
+
+    requests = sum(len(samples) for samples in recorder.latencies.values())
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        server_metrics = {
+            name: (await client.get(path)).json()
+            for name, path in [
+                ("llm_calls", "/interview_flow/llm-call-metrics"),
+                ("llm_admission", "/interview_flow/llm-admission-metrics"),
+                ("prefetch", "/interview_flow/prefetch-metrics"),
+                ("profile_cache", "/profile/cache-metrics"),
+            ]
+        }
+    return {
+        "candidates": candidates,
+        "elapsed_s": round(elapsed, 3),
+        "sessions_ok": len(durations),
+        "sessions_failed": len(failures),
+        "sessions_per_min": round(60 * len(durations) / elapsed, 2),
+        "requests_per_s": round(requests / elapsed, 2),
+        "session_s": {"p50": _percentile(durations, 0.5), "p95": _percentile(durations, 0.95)} if durations else None,
+        "endpoints": {
+            endpoint: {
+                "count": len(samples),
+                "error_rate": round(recorder.errors[endpoint] / len(samples), 4),
+                "statuses": dict(recorder.statuses[endpoint]),
+                "p50_s": round(_percentile(samples, 0.5), 4),
+                "p90_s": round(_percentile(samples, 0.9), 4),
+                "p99_s": round(_percentile(samples, 0.99), 4),
+            }
+            for endpoint, samples in recorder.latencies.items()
+        },
+        "failures": failures[:10],
+        "server": server_metrics,
+    }
+
+
+def print_level(row: dict) -> None:
+    print(
+        f"\ncandidates={row['candidates']}  sessions ok/failed={row['sessions_ok']}/{row['sessions_failed']}  "
+        f"{row['sessions_per_min']} sessions/min  {row['requests_per_s']} req/s  elapsed {row['elapsed_s']}s"
+    )
+    if row["session_s"]:
+        print(f"  session duration p50 {row['session_s']['p50']:.2f}s  p95 {row['session_s']['p95']:.2f}s")
+    print(f"  {'endpoint':<38} {'count':>6} {'err %':>6} {'p50 s':>7} {'p90 s':>7} {'p99 s':>7}  statuses")
+    for endpoint, entry in row["endpoints"].items():
+        print(
+            f"  {endpoint:<38} {entry['count']:>6} {100 * entry['error_rate']:>6.1f} {entry['p50_s']:>7.3f} "
+            f"{entry['p90_s']:>7.3f} {entry['p99_s']:>7.3f}  {entry['statuses']}"
+        )
+    print(f"  {'llm task':<22} {'calls':>6} {'ok':>5} {'timeout':>7} {'error':>5} {'reject':>6} {'retry':>5} {'p90 s':>7}")
+    for task, entry in row["server"]["llm_calls"]["tasks"].items():
+        if entry["calls"]:
+            print(
+                f"  {task:<22} {entry['calls']:>6} {entry['ok']:>5} {entry['timeouts']:>7} {entry['errors']:>5} "
+                f"{entry['rejected']:>6} {entry['retries']:>5} {entry['call_s']['p90'] or 0:>7.2f}"
+            )
+    prefetch = row["server"]["prefetch"]
+    print(f"  prefetch hit rate {prefetch['hit_rate']}  profile cache hit ratio {row['server']['profile_cache']['hit_ratio']}")
+    for line in row["failures"]:
+        print(f"  failed: {line}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, nargs="+", default=[1, 8, 32], help="concurrent sessions per level")
+    parser.add_argument("--llm-latency", help="latency distribution for every LLM task")
+    parser.add_argument("--task-latency", nargs="*", default=[], metavar="TASK=SPEC")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of LLM calls failing with 503")
+    parser.add_argument("--resume", choices=["build", "upload", "none"], default="build")
+    parser.add_argument("--stream", action="store_true", help="answer through /answer/stream")
+    parser.add_argument("--retries", type=int, default=3, help="retries of a 503 per request")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between analysis polls")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    latencies = {task: args.llm_latency or spec for task, spec in DEFAULT_LATENCY.items()}
+    for item in args.task_latency:
+        task, spec = item.split("=", 1)
+        if task not in latencies:
+            parser.error(f"unknown LLM task: {task}")
+        latencies[task] = spec
+    for spec in latencies.values():
+        parse_latency(spec)
+
+    install_stand_ins(latencies, args.llm_error_rate, seed_profiles=args.resume == "none")
+    import server
+
+    print(f"llm latency: {latencies}  error rate: {args.llm_error_rate}")
+    report = []
+    offset = 0
+    for candidates in args.candidates:
+        row = asyncio.run(run_level(server.app, candidates, offset, args))
+        offset += candidates
+        print_level(row)
+        report.append(row)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"llm_latency": latencies, "error_rate": args.llm_error_rate, "levels": report}, fh, indent=2)
+    return 0 if all(row["sessions_failed"] == 0 for row in report) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Offline parity check for the staged face-check pipeline.
+
+Replays recorded frames through services.face_detection.analyse_frame twice,
+once exhaustively (every stage, the original behaviour) and once with the
+early-exit rules, and reports where the verdicts differ plus the time saved.
+
+``--reference-width 0`` runs the exhaustive reference on the frames at full
+resolution instead of at PROCTORING_ANALYSIS_WIDTH, which shows what the
+downscale itself changes on large recorded frames.
+
+Run from the backend directory:
+    python test/proctoring_parity.py path/to/recorded/frames [--show-all] [--reference-width 0]
+
+Exits with status 1 if a frame breaks what analyse_frame promises: the same
+``status`` and ``multiple_faces``, and the same ``face_count`` unless both
+verdicts are ``multiple_faces`` (the staged count is then MediaPipe's alone
+and may only be lower).
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.face_detection import (  # noqa: E402
+    ANALYSIS_MAX_WIDTH,
+    FaceDetectors,
+    analyse_frame,
+    build_frame_context,
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def _iter_frames(root: str):
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def _differences(reference: dict, staged: dict) -> list[str]:
+    """Promised fields on which the staged verdict differs from the exhaustive one."""
+    fields = [field for field in ("status", "multiple_faces") if reference[field] != staged[field]]
+    if fields:
+        return fields
+    if reference["status"] == "multiple_faces":
+        return [] if staged["face_count"] <= reference["face_count"] else ["face_count"]
+    return [] if reference["face_count"] == staged["face_count"] else ["face_count"]
+
+
+def _timed(frame, detectors, exhaustive: bool, max_width: int = ANALYSIS_MAX_WIDTH):
+    start = time.perf_counter()
+    result, _ = analyse_frame(build_frame_context(frame, max_width), detectors, exhaustive=exhaustive)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("frames_dir")
+    parser.add_argument("--show-all", action="store_true", help="print every frame, not only mismatches")
+    parser.add_argument(
+        "--reference-width", type=int, default=ANALYSIS_MAX_WIDTH,
+        help="analysis width for the exhaustive reference (0 = full resolution)",
+    )
+    args = parser.parse_args()
+
+    detectors = FaceDetectors()
+    total = 0
+    mismatches = 0
+    count_mismatches = 0
+    exhaustive_ms = 0.0
+    staged_ms = 0.0
+    exits = Counter()
+
+    for path in _iter_frames(args.frames_dir):
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            print(f"skip (unreadable): {path}")
+            continue
+
+        reference, ref_ms = _timed(frame, detectors, exhaustive=True, max_width=args.reference_width)
+        staged, staged_frame_ms = _timed(frame, detectors, exhaustive=False)
+        total += 1
+        exhaustive_ms += ref_ms
+        staged_ms += staged_frame_ms
+        exits[staged["debug"]["early_exit"] or "none"] += 1
+
+        differences = _differences(reference, staged)
+        mismatches += 1 if differences else 0
+        # Informational: multiple-face frames where the staged count is lower.
+        count_mismatches += 0 if reference["face_count"] == staged["face_count"] else 1
+
+        if args.show_all or differences:
+            marker = "ok  " if not differences else "DIFF"
+            print(
+                f"{marker} {path}: exhaustive={reference['status']}({reference['face_count']}) "
+                f"staged={staged['status']}({staged['face_count']}) "
+                f"stages={','.join(staged['debug']['stages'])} exit={staged['debug']['early_exit']}"
+                + (f" differs={','.join(differences)}" if differences else "")
+            )
+
+    if not total:
+        print("no frames found")
+        return 1
+
+    print()
+    print(f"frames:            {total}")
+    print(f"agreement:         {(total - mismatches) / total * 100:.2f}% ({mismatches} break the promise)")
+    print(f"face_count differ: {count_mismatches} (including lower staged counts on multiple-face frames)")
+    print(f"mean latency:      exhaustive {exhaustive_ms / total:.1f} ms, staged {staged_ms / total:.1f} ms")
+    print("early exits:       " + ", ".join(f"{k}={v}" for k, v in exits.most_common()))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
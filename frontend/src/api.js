@@ -15,3 +15,49 @@ export const apiError = (error, fallback = 'Something went wrong') => {
   if (error?.response?.data?.error) return error.response.data.error;
   return fallback;
 };
+
+// POST a JSON body to an endpoint that answers with server-sent events and
+// call onEvent(event, data) for each one. Resolves with the `done` payload;
+// rejects (in the same shape as an axios error, so apiError works) on an
+// HTTP error or an `error` event.
+export const postEventStream = async (path, body, onEvent = () => {}) => {
+  const response = await fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    credentials: 'include',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok || !response.body) {
+    const data = await response.json().catch(() => ({}));
+    throw { response: { status: response.status, data } };
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      let data = '';
+      block.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      const parsed = data ? JSON.parse(data) : null;
+      if (event === 'error') throw { response: { status: parsed?.status_code, data: parsed } };
+      if (event === 'done') result = parsed;
+      onEvent(event, parsed);
+    }
+  }
+  if (!result) throw { response: { data: { detail: 'The answer stream ended early' } } };
+  return result;
+};
@@ -1,10 +1,29 @@
 import { useCallback, useEffect, useMemo, useRef, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { api, apiError } from '../api';
+import { api, apiError, postEventStream } from '../api';
 import SpeechControls from './SpeechControls';
 import { setRoundStatus } from '../roundStatus';
 import { stopAllAudioPlayback } from '../audioControl';
 
+const streamStageLabels = {
+  evaluating: 'Evaluating answer...',
+  saving: 'Saving...',
+};
+
+const ANALYSIS_POLL_MS = 2000;
+// Failed polls (network errors, 429 and 5xx) are retried with exponential
+// backoff; after this many in a row the analysis is reported as failed.
+const ANALYSIS_MAX_POLL_ERRORS = 5;
+const ANALYSIS_MAX_BACKOFF_MS = 30000;
+// Overall cap on polling, a little past the server's own pending deadline
+// (ANALYSIS_DEADLINE_SECONDS, 10 minutes by default).
+const ANALYSIS_MAX_POLL_MS = 11 * 60 * 1000;
+
+const isTransientError = (err) => {
+  const status = err?.response?.status;
+  return !status || status === 408 || status === 429 || status >= 500;
+};
+
 const nextRoundRouteByKey = {
   technical: '/interview/manager',
   manager: '/interview/hr',
@@ -97,10 +116,12 @@ export default function InterviewConsole({ title, basePath, roundKey }) {
   const [isStarted, setIsStarted] = useState(false);
   const [isEnded, setIsEnded] = useState(false);
   const [analysis, setAnalysis] = useState(null);
+  const [analysisStatus, setAnalysisStatus] = useState('');
   const [closingNote, setClosingNote] = useState('');
   const [difficulty, setDifficulty] = useState('keep_difficulty');
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(false);
+  const [streamStage, setStreamStage] = useState('');
   const [autoReadQuestion, setAutoReadQuestion] = useState(true);
   const [voices, setVoices] = useState([]);
   const [voiceName, setVoiceName] = useState('');
@@ -276,6 +297,49 @@ export default function InterviewConsole({ title, basePath, roundKey }) {
     stopAllAudioPlayback();
   }, []);
 
+  // The final analysis is computed in the background once a round ends.
+  useEffect(() => {
+    if (analysisStatus !== 'pending' || !roundKey) return undefined;
+
+    let cancelled = false;
+    let timer = null;
+    let errors = 0;
+    const giveUpAt = Date.now() + ANALYSIS_MAX_POLL_MS;
+
+    const poll = async () => {
+      let delayMs = ANALYSIS_POLL_MS;
+      try {
+        const { data } = await api.get('/interview_flow/analysis', { params: { round: roundKey } });
+        if (cancelled) return;
+        errors = 0;
+        if (data.status !== 'pending') {
+          setAnalysis(data.analysis || null);
+          setAnalysisStatus(data.status);
+          return;
+        }
+      } catch (err) {
+        if (cancelled) return;
+        errors += 1;
+        if (!isTransientError(err) || errors >= ANALYSIS_MAX_POLL_ERRORS) {
+          setAnalysisStatus('failed');
+          return;
+        }
+        delayMs = Math.min(ANALYSIS_POLL_MS * 2 ** errors, ANALYSIS_MAX_BACKOFF_MS);
+      }
+      if (Date.now() + delayMs > giveUpAt) {
+        setAnalysisStatus('failed');
+        return;
+      }
+      timer = setTimeout(poll, delayMs);
+    };
+
+    timer = setTimeout(poll, ANALYSIS_POLL_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [analysisStatus, roundKey]);
+
   const onStart = async () => {
     setLoading(true);
     setError('');
@@ -284,6 +348,7 @@ export default function InterviewConsole({ title, basePath, roundKey }) {
       setIsStarted(true);
       setIsEnded(false);
       setAnalysis(null);
+      setAnalysisStatus('');
       setClosingNote('');
       setHistory([]);
       const nextQuestion = data.question || '';
@@ -308,20 +373,36 @@ export default function InterviewConsole({ title, basePath, roundKey }) {
     if (!canSubmit) return;
 
     const submittedAnswer = answer.trim();
+    const answeredQuestion = question || `Question ${questionNumber}`;
     setLoading(true);
     setError('');
 
     try {
-      const { data } = await api.post(`${basePath}/answer`, { answer: submittedAnswer });
+      // Stream the turn so the next question appears as it is generated;
+      // the `done` event carries the same body as POST /answer.
+      let preview = '';
+      const data = await postEventStream(`${basePath}/answer/stream`, { answer: submittedAnswer }, (event, payload) => {
+        if (event === 'token') {
+          preview += payload.text;
+          resetQuestionDisplay(preview);
+        } else if (event === 'status') {
+          if (payload.stage === 'reset') {
+            preview = '';
+            resetQuestionDisplay('');
+          }
+          setStreamStage(payload.stage);
+        }
+      });
       setHistory((prev) => [
         ...prev,
-        { question: question || `Question ${questionNumber}`, answer: submittedAnswer },
+        { question: answeredQuestion, answer: submittedAnswer },
       ]);
       setAnswer('');
 
       if (data.should_end) {
         setIsEnded(true);
         setAnalysis(data.analysis || null);
+        setAnalysisStatus(data.analysis_status || 'done');
         setClosingNote(data.closing_note || 'Interview completed.');
         if (roundKey === 'hr' && data.flow_reset) {
           localStorage.setItem('interview_cycle_closed', 'true');
@@ -338,8 +419,10 @@ export default function InterviewConsole({ title, basePath, roundKey }) {
       }
     } catch (err) {
       setError(apiError(err, 'Unable to submit answer'));
+      resetQuestionDisplay(question);
     } finally {
       setLoading(false);
+      setStreamStage('');
       setSpeechResetToken((prev) => prev + 1);
     }
   };
@@ -441,7 +524,7 @@ export default function InterviewConsole({ title, basePath, roundKey }) {
               />
               <SpeechControls onTranscript={onTranscript} language={sttLanguage} resetToken={speechResetToken} />
               <button className="btn" type="submit" disabled={!canSubmit}>
-                {loading ? 'Submitting...' : 'Submit Answer'}
+                {loading ? streamStageLabels[streamStage] || 'Submitting...' : 'Submit Answer'}
               </button>
             </form>
           )}
@@ -450,6 +533,8 @@ export default function InterviewConsole({ title, basePath, roundKey }) {
             <div className="result-card">
               <h3>Round Completed</h3>
               <p>{closingNote}</p>
+              {analysisStatus === 'pending' && <p>Preparing final analysis...</p>}
+              {analysisStatus === 'failed' && <p>The final analysis could not be generated.</p>}
               {analysis && (
                 <div className="analysis-grid">
                   <div>
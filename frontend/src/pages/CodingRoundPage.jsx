@@ -5,6 +5,7 @@ import { api, apiError } from '../api';
 import { setRoundStatus } from '../roundStatus';
 import { fetchInterviewFlowStatus, getNextAllowedRound, ROUND_ROUTES } from '../interviewFlow';
 import { stopAllAudioPlayback } from '../audioControl';
+import { captureVideoFrame, createCheckCadence, createFaceChecker } from '../proctoring';
 
 const languageTemplates = {
   python: '# Write your Python solution here\n',
@@ -86,7 +87,7 @@ export default function CodingRoundPage() {
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
   const streamRef = useRef(null);
-  const faceIntervalRef = useRef(null);
+  const faceTimerRef = useRef(null);
   const forcingResetRef = useRef(false);
   const faceCheckInFlightRef = useRef(false);
   const proctorViolationCountRef = useRef(0);
@@ -289,6 +290,8 @@ export default function CodingRoundPage() {
         setCameraReady(true);
         setCameraError('');
 
+        const checkFrame = createFaceChecker();
+        const cadence = createCheckCadence();
         const checkFaces = async () => {
           if (cancelled || forcingResetRef.current || faceCheckInFlightRef.current) return;
           const video = videoRef.current;
@@ -297,15 +300,11 @@ export default function CodingRoundPage() {
           faceCheckInFlightRef.current = true;
 
           try {
-            canvas.width = 480;
-            canvas.height = 360;
-            const context = canvas.getContext('2d');
-            if (!context) return;
+            const frame = await captureVideoFrame(video, canvas, cadence.capture);
+            if (!frame) return;
 
-            context.drawImage(video, 0, 0, canvas.width, canvas.height);
-            const image = canvas.toDataURL('image/jpeg', 0.8);
-
-            const { data } = await api.post('/proctoring/face-check', { image });
+            const data = await checkFrame(frame);
+            cadence.update(data);
             const count = Number(data?.face_count ?? 0);
             const status = String(data?.status || 'single_face');
             const engine = String(data?.engine || '');
@@ -316,6 +315,7 @@ export default function CodingRoundPage() {
             const qualityWarnings = [];
             if (quality.low_light) qualityWarnings.push('Low light');
             if (quality.blurry) qualityWarnings.push('Blurry frame');
+            if (data?.gaze?.looking_away) qualityWarnings.push('Looking away from screen');
             setQualityHint(qualityWarnings.join(' • '));
 
             const hasMultipleFaces = status === 'multiple_faces' || count > 1;
@@ -364,8 +364,15 @@ export default function CodingRoundPage() {
           }
         };
 
+        const scheduleFaceCheck = () => {
+          faceTimerRef.current = window.setTimeout(async () => {
+            await checkFaces();
+            if (!cancelled) scheduleFaceCheck();
+          }, cadence.delayMs);
+        };
+
         await checkFaces();
-        faceIntervalRef.current = window.setInterval(checkFaces, 1800);
+        scheduleFaceCheck();
       } catch (cameraInitError) {
         const reason = cameraInitError?.name || cameraInitError?.message || 'unknown error';
         setCameraError(`Unable to access webcam. Please allow camera permission. (${reason})`);
@@ -377,9 +384,9 @@ export default function CodingRoundPage() {
     return () => {
       cancelled = true;
 
-      if (faceIntervalRef.current) {
-        window.clearInterval(faceIntervalRef.current);
-        faceIntervalRef.current = null;
+      if (faceTimerRef.current) {
+        window.clearTimeout(faceTimerRef.current);
+        faceTimerRef.current = null;
       }
 
       if (streamRef.current) {
@@ -4,6 +4,7 @@ import { Link, useNavigate } from 'react-router-dom';
 import { api, apiError } from '../api';
 import { fetchInterviewFlowStatus, getNextAllowedRound, isRoundLocked, ROUND_ROUTES } from '../interviewFlow';
 import { stopAllAudioPlayback } from '../audioControl';
+import { captureVideoFrame, createCheckCadence, createFaceChecker } from '../proctoring';
 
 export default function InterviewPage({ title, basePath, roundKey }) {
   const navigate = useNavigate();
@@ -26,7 +27,7 @@ export default function InterviewPage({ title, basePath, roundKey }) {
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
   const streamRef = useRef(null);
-  const faceIntervalRef = useRef(null);
+  const faceTimerRef = useRef(null);
   const forcingResetRef = useRef(false);
   const faceCheckInFlightRef = useRef(false);
   const proctorViolationCountRef = useRef(0);
@@ -183,6 +184,8 @@ export default function InterviewPage({ title, basePath, roundKey }) {
         setCameraReady(true);
         setCameraError('');
 
+        const checkFrame = createFaceChecker();
+        const cadence = createCheckCadence();
         const checkFaces = async () => {
           if (cancelled || forcingResetRef.current || faceCheckInFlightRef.current) return;
           const video = videoRef.current;
@@ -191,15 +194,11 @@ export default function InterviewPage({ title, basePath, roundKey }) {
           faceCheckInFlightRef.current = true;
 
           try {
-            canvas.width = 480;
-            canvas.height = 360;
-            const context = canvas.getContext('2d');
-            if (!context) return;
+            const frame = await captureVideoFrame(video, canvas, cadence.capture);
+            if (!frame) return;
 
-            context.drawImage(video, 0, 0, canvas.width, canvas.height);
-            const image = canvas.toDataURL('image/jpeg', 0.8);
-
-            const { data } = await api.post('/proctoring/face-check', { image });
+            const data = await checkFrame(frame);
+            cadence.update(data);
             const count = Number(data?.face_count ?? 0);
             const status = String(data?.status || 'single_face');
             const engine = String(data?.engine || '');
@@ -210,6 +209,7 @@ export default function InterviewPage({ title, basePath, roundKey }) {
             const qualityWarnings = [];
             if (quality.low_light) qualityWarnings.push('Low light');
             if (quality.blurry) qualityWarnings.push('Blurry frame');
+            if (data?.gaze?.looking_away) qualityWarnings.push('Looking away from screen');
             setQualityHint(qualityWarnings.join(' • '));
 
             const hasMultipleFaces = status === 'multiple_faces' || count > 1;
@@ -253,8 +253,15 @@ export default function InterviewPage({ title, basePath, roundKey }) {
           }
         };
 
+        const scheduleFaceCheck = () => {
+          faceTimerRef.current = window.setTimeout(async () => {
+            await checkFaces();
+            if (!cancelled) scheduleFaceCheck();
+          }, cadence.delayMs);
+        };
+
         await checkFaces();
-        faceIntervalRef.current = window.setInterval(checkFaces, 1800);
+        scheduleFaceCheck();
       } catch (cameraInitError) {
         const reason = cameraInitError?.name || cameraInitError?.message || 'unknown error';
         setCameraError(`Unable to access webcam. Please allow camera permission. (${reason})`);
@@ -266,9 +273,9 @@ export default function InterviewPage({ title, basePath, roundKey }) {
     return () => {
       cancelled = true;
 
-      if (faceIntervalRef.current) {
-        window.clearInterval(faceIntervalRef.current);
-        faceIntervalRef.current = null;
+      if (faceTimerRef.current) {
+        window.clearTimeout(faceTimerRef.current);
+        faceTimerRef.current = null;
       }
 
       if (streamRef.current) {
@@ -0,0 +1,92 @@
+import { api } from './api';
+
+const canvasToJpegBlob = (canvas, quality) =>
+  new Promise((resolve, reject) => {
+    canvas.toBlob(
+      (blob) => (blob ? resolve(blob) : reject(new Error('Unable to encode frame'))),
+      'image/jpeg',
+      quality
+    );
+  });
+
+export const captureVideoFrame = async (video, canvas, { width = 480, height = 360, quality = 0.8 } = {}) => {
+  canvas.width = width;
+  canvas.height = height;
+  const context = canvas.getContext('2d');
+  if (!context) return null;
+
+  context.drawImage(video, 0, 0, canvas.width, canvas.height);
+  return canvasToJpegBlob(canvas, quality);
+};
+
+export const DEFAULT_CHECK_INTERVAL_MS = 1800;
+
+// Follows the cadence the server suggests with each verdict: how long to wait
+// before the next check and the size/quality to capture it at.
+export const createCheckCadence = () => {
+  let delayMs = DEFAULT_CHECK_INTERVAL_MS;
+  let capture = {};
+
+  return {
+    get delayMs() {
+      return delayMs;
+    },
+    get capture() {
+      return capture;
+    },
+    update(data) {
+      const next = Number(data?.next_check_after_ms);
+      if (Number.isFinite(next) && next > 0) delayMs = next;
+      const { width, height, quality } = data?.capture || {};
+      if (width && height && quality) capture = { width, height, quality };
+    },
+  };
+};
+
+export const postFaceCheck = async (frameBlob) => {
+  const { data } = await api.post('/proctoring/face-check/frame', frameBlob, {
+    headers: { 'Content-Type': 'image/jpeg' },
+  });
+  return data;
+};
+
+export const MAX_BUFFERED_FRAMES = 8;
+
+export const postFaceCheckBatch = async (frames) => {
+  const form = new FormData();
+  frames.forEach(({ blob, capturedAt }, index) => {
+    form.append('frames', blob, `frame-${index}.jpg`);
+    form.append('captured_at', String(capturedAt));
+  });
+  const { data } = await api.post('/proctoring/face-check/batch', form, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  });
+  return data;
+};
+
+// Sends one frame per call while the network is healthy. Frames whose upload
+// fails without a server response are buffered and go out with the next
+// frame as a single batch; the batch's aggregate verdict is returned, which
+// has the same shape as a single face-check response.
+export const createFaceChecker = ({ maxBuffered = MAX_BUFFERED_FRAMES } = {}) => {
+  let buffered = [];
+
+  return async (frameBlob) => {
+    const frame = { blob: frameBlob, capturedAt: Date.now() };
+    const pending = [...buffered, frame].slice(-maxBuffered);
+
+    try {
+      if (pending.length === 1) {
+        const data = await postFaceCheck(frameBlob);
+        buffered = [];
+        return data;
+      }
+      const data = await postFaceCheckBatch(pending);
+      buffered = [];
+      return data?.aggregate;
+    } catch (error) {
+      buffered = error?.response ? [] : pending;
+      throw error;
+    }
+  };
+};